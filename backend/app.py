@@ -70,8 +70,8 @@ def create_app(config_name=None):
         r"/*": {
             "origins": allowed_origins,
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-            "allow_headers": ["Content-Type", "Authorization", "Accept"],
-            "expose_headers": ["Content-Type", "Authorization"],
+            "allow_headers": ["Content-Type", "Authorization", "Accept", "If-None-Match", "If-Modified-Since"],
+            "expose_headers": ["Content-Type", "Authorization", "ETag", "Last-Modified"],
             "supports_credentials": True,
             "max_age": 3600
         }
@@ -79,7 +79,26 @@ def create_app(config_name=None):
     
     jwt.init_app(app)
     bcrypt.init_app(app)
-    socketio.init_app(app, cors_allowed_origins=allowed_origins)
+    
+    # Import websocket handlers before init_app so that every SocketIO server
+    # created by the factory gets them registered
+    import websockets.handlers
+    from websockets.broker import create_client_manager
+    from websockets.aggregator import case_updates
+    case_updates.window = app.config['CASE_UPDATE_WINDOW']
+    from services.activity_service import activity_log
+    activity_log.init_app(app)
+    from utils.passwords import passwords, HashingBusy
+    passwords.init_app(app)
+    socketio.init_app(
+        app,
+        cors_allowed_origins=allowed_origins,
+        transports=app.config['SOCKETIO_TRANSPORTS'],
+        client_manager=create_client_manager(
+            app.config['SOCKETIO_MESSAGE_QUEUE'],
+            channel=app.config['SOCKETIO_CHANNEL']
+        )
+    )
     
     # JWT error handlers
     @jwt.expired_token_loader
@@ -103,6 +122,17 @@ def create_app(config_name=None):
             "error": "authorization_required"
         }), 401
     
+    # Tokens stop working once they are revoked (logout) or their user's
+    # token version moves on
+    from services.auth_service import AuthService, token_versions
+    from services.revocation_service import token_blocklist
+    token_versions.ttl = app.config['TOKEN_VERSION_TTL']
+    token_blocklist.init_app(app)
+
+    @jwt.token_in_blocklist_loader
+    def check_token_revoked(jwt_header, jwt_payload):
+        return token_blocklist.is_revoked(jwt_payload['jti']) or not AuthService.is_token_current(jwt_payload)
+    
     @jwt.revoked_token_loader
     def revoked_token_callback(jwt_header, jwt_payload):
         return jsonify({
@@ -110,8 +140,15 @@ def create_app(config_name=None):
             "error": "token_revoked"
         }), 401
     
+    @app.errorhandler(HashingBusy)
+    def hashing_busy_callback(error):
+        return jsonify({
+            "msg": "Server is busy, please try again",
+            "error": "server_busy"
+        }), 503, {"Retry-After": "1"}
+    
     # Register blueprints
-    from routes import auth_bp, case_bp, notes_bp, messages_bp, appointments_bp
+    from routes import auth_bp, case_bp, notes_bp, messages_bp, appointments_bp, search_bp
     from routes.admin import admin_bp
     app.register_blueprint(auth_bp)
     app.register_blueprint(case_bp)
@@ -119,6 +156,7 @@ def create_app(config_name=None):
     app.register_blueprint(admin_bp)
     app.register_blueprint(messages_bp)
     app.register_blueprint(appointments_bp)
+    app.register_blueprint(search_bp)
     
     # CORS preflight handler
     @app.after_request
@@ -137,9 +175,6 @@ def create_app(config_name=None):
         Deadline, Service, TeamMember, BlogPost
     )
     
-    # Import websocket handlers
-    import websockets.handlers
-    
     # Register base routes
     @app.route('/')
     def index():
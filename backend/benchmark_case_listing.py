@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark case list serialization.
+
+Seeds a throwaway database with N cases and compares the three ways of
+serializing the full admin case list:
+
+- lazy:   select(Case) + case_to_dict, loading client/assignee per case
+- eager:  CaseService.get_all_cases() (selectinload) + case_to_dict
+- rows:   CaseService.list_case_rows() + case_row_to_dict
+
+Usage:
+    python benchmark_case_listing.py                # 10,000 cases, in-memory SQLite
+    python benchmark_case_listing.py --cases 50000
+    python benchmark_case_listing.py --database postgresql://.../bench_db
+
+The database is dropped and recreated, so never point it at real data.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import event, insert, select
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cases', type=int, default=10000, help='number of cases to seed')
+    parser.add_argument('--database', default='sqlite://', help='throwaway database URL')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per strategy; the best is reported')
+    return parser.parse_args()
+
+
+def seed(db, count):
+    from models import User, Case, Role, CaseCategory, CaseStatus, Priority
+
+    clients = max(count // 50, 1)
+    managers = max(count // 500, 1)
+    db.session.execute(insert(User), [
+        {'email': f'client{n}@bench.test', 'password_hash': 'x', 'name': f'Client {n}', 'role': Role.CLIENT}
+        for n in range(clients)
+    ] + [
+        {'email': f'manager{n}@bench.test', 'password_hash': 'x', 'name': f'Manager {n}', 'role': Role.CASE_MANAGER}
+        for n in range(managers)
+    ])
+    statuses = list(CaseStatus)
+    db.session.execute(insert(Case), [
+        {
+            'case_id': f'1000HILLS-BENCH-{n:06d}',
+            'title': f'Case {n}',
+            'description': 'Lorem ipsum dolor sit amet. ' * 20,
+            'category': CaseCategory.OTHER,
+            'status': statuses[n % len(statuses)],
+            'priority': Priority.MEDIUM,
+            'client_id': 1 + n % clients,
+            'assigned_to_id': 1 + clients + n % managers if n % 10 else None,
+        }
+        for n in range(count)
+    ])
+    db.session.commit()
+
+
+def measure(db, run, repeat):
+    """
+    Best wall time, peak traced memory and statement count.
+
+    Timing runs without tracemalloc, whose overhead would dominate; memory
+    is traced in one extra run.
+    """
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    best = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    db.session.expunge_all()
+    event.listen(db.engine, 'before_cursor_execute', count)
+    tracemalloc.start()
+    items = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    event.remove(db.engine, 'before_cursor_execute', count)
+    return best, peak, len(statements), len(items)
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database
+    os.environ['TEST_DATABASE_URL'] = args.database
+
+    from app import create_app
+    from extensions import db
+    from models import Case
+    from services import CaseService
+    from utils import case_to_dict, case_row_to_dict
+
+    app = create_app('testing')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        print(f'Seeding {args.cases} cases...')
+        seed(db, args.cases)
+
+        strategies = [
+            ('lazy', lambda: [
+                case_to_dict(case)
+                for case in db.session.execute(select(Case).order_by(Case.created_at.desc())).scalars()
+            ]),
+            ('eager', lambda: [case_to_dict(case) for case in CaseService.get_all_cases()]),
+            ('rows', lambda: [case_row_to_dict(row) for row in CaseService.list_case_rows(limit=None)[0]]),
+        ]
+
+        print(f"\n{'strategy':<10}{'time (ms)':>12}{'peak (MB)':>12}{'queries':>10}{'cases':>10}")
+        for name, run in strategies:
+            elapsed, peak, queries, items = measure(db, run, args.repeat)
+            print(f'{name:<10}{elapsed * 1000:>12.1f}{peak / 1024 / 1024:>12.1f}{queries:>10}{items:>10}')
+
+        db.drop_all()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark chat latency during a login storm.
+
+Runs the app in-process and times a case manager posting messages (the
+chat path) while other users log in over and over:
+
+- quiet:   chat only
+- storm:   chat during the storm, hashing through utils.passwords
+- inline:  the same storm with bcrypt called directly on the request,
+           as before utils.passwords existed
+
+Usage:
+    python benchmark_login_storm.py                  # OS threads
+    python benchmark_login_storm.py --eventlet       # green threads, like the gunicorn worker
+    python benchmark_login_storm.py --logins 50 --seconds 10
+
+Under --eventlet the inline run shows the hub stalling for every hash;
+the storm run should stay close to quiet. A throwaway SQLite file is used.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--logins', type=int, default=20, help='users logging in concurrently')
+    parser.add_argument('--seconds', type=float, default=5, help='length of each run')
+    parser.add_argument('--rounds', type=int, default=12, help='bcrypt cost factor')
+    parser.add_argument('--eventlet', action='store_true', help='monkey patch with eventlet first')
+    return parser.parse_args()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def run(app, case_id, manager_id, args, storm):
+    """Chat latencies (seconds) and completed logins for one run."""
+    import threading
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        token = create_access_token(identity=str(manager_id), additional_claims={'role': 'CASE_MANAGER'})
+    headers = {'Authorization': f'Bearer {token}'}
+    deadline = time.monotonic() + args.seconds
+    latencies, logins = [], []
+
+    def chat():
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = client.post(f'/cases/{case_id}/messages', headers=headers, json={'recipient_id': 1, 'content': 'ping'})
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 201, response.get_json()
+            # A person typing, not a tight loop
+            time.sleep(0.02)
+
+    def login(n):
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            response = client.post('/auth/login', json={'email': f'storm{n}@bench.test', 'password': 'password'})
+            logins.append(response.status_code)
+
+    threads = [threading.Thread(target=chat)]
+    if storm:
+        threads += [threading.Thread(target=login, args=(n,)) for n in range(args.logins)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, logins
+
+
+def main():
+    args = parse_args()
+    if args.eventlet:
+        import eventlet
+        eventlet.monkey_patch()
+
+    database = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    os.environ['ACTIVITY_FLUSH_INTERVAL'] = '0'
+
+    from sqlalchemy import insert
+    from app import create_app
+    from extensions import db, bcrypt
+    from models import User, Case, Role, CaseCategory
+    from utils.passwords import passwords
+    from services.activity_service import activity_log
+
+    app = create_app('development')
+    bcrypt._log_rounds = args.rounds
+    with app.app_context():
+        db.create_all()
+        password_hash = passwords.hash('password')
+        db.session.execute(insert(User), [
+            {'email': f'storm{n}@bench.test', 'password_hash': password_hash, 'name': f'Storm {n}', 'role': Role.CLIENT}
+            for n in range(args.logins)
+        ])
+        manager = User(email='manager@bench.test', password_hash=password_hash, name='Manager', role=Role.CASE_MANAGER)
+        db.session.add(manager)
+        db.session.flush()
+        # storm0 (id 1) is the client the manager chats with
+        case = Case(case_id='1000HILLS-BENCH-000001', title='Bench', category=CaseCategory.OTHER,
+                    client_id=1, assigned_to_id=manager.id)
+        db.session.add(case)
+        db.session.commit()
+        case_id, manager_id = case.id, manager.id
+
+    print(f"\n{'run':<8}{'chats':>8}{'p50 (ms)':>10}{'p95 (ms)':>10}{'max (ms)':>10}{'logins':>8}{'503s':>6}")
+    pooled = passwords._run
+    for name, storm in (('quiet', False), ('storm', True), ('inline', True)):
+        if name == 'inline':
+            passwords._run = lambda kind, fn, *fn_args: fn(*fn_args)
+        latencies, logins = run(app, case_id, manager_id, args, storm)
+        print(f'{name:<8}{len(latencies):>8}{percentile(latencies, 0.5) * 1000:>10.1f}'
+              f'{percentile(latencies, 0.95) * 1000:>10.1f}{max(latencies, default=0) * 1000:>10.1f}'
+              f'{len(logins):>8}{logins.count(503):>6}')
+    passwords._run = pooled
+
+    print(f"\npassword_hashing: {passwords.get_metrics()}")
+    activity_log.discard()
+    os.remove(database)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -42,10 +42,50 @@ class Config:
     JWT_HEADER_TYPE = 'Bearer'
     JWT_CSRF_METHODS = []  # Disable CSRF protection for API
     JWT_ERROR_MESSAGE_KEY = 'msg'
+    # Role checks read the token's signed role claim instead of loading the
+    # user, and token versions are checked against a per-process cache kept
+    # for TOKEN_VERSION_TTL seconds (how long other workers may accept a
+    # token after its user's role changes or the user is deactivated)
+    JWT_TRUST_ROLE_CLAIM = os.environ.get('JWT_TRUST_ROLE_CLAIM', 'false').lower() in ('1', 'true', 'yes')
+    TOKEN_VERSION_TTL = int(os.environ.get('TOKEN_VERSION_TTL', '30'))
+    # Revoked tokens (logout) are checked against an in-process set that
+    # reads new revocations at most every REVOCATION_REFRESH_INTERVAL seconds
+    # (0 loads it once per process); expired rows are deleted every
+    # REVOCATION_PRUNE_INTERVAL seconds
+    REVOCATION_REFRESH_INTERVAL = float(os.environ.get('REVOCATION_REFRESH_INTERVAL', '5'))
+    REVOCATION_PRUNE_INTERVAL = int(os.environ.get('REVOCATION_PRUNE_INTERVAL', '3600'))
+    # bcrypt hashes allowed to run at once (default: half the CPU cores, so
+    # requests keep the rest) and how many more may wait before logins get a 503
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', max((os.cpu_count() or 2) // 2, 1)))
+    PASSWORD_HASH_MAX_WAITING = int(os.environ.get('PASSWORD_HASH_MAX_WAITING', '64'))
+    # Bulk user imports: rows per batch (one email check, one INSERT, one
+    # commit) and threads hashing each batch's passwords (no more than half
+    # of PASSWORD_HASH_CONCURRENCY hash at once, so logins keep working)
+    USER_IMPORT_BATCH_SIZE = int(os.environ.get('USER_IMPORT_BATCH_SIZE', '500'))
+    USER_IMPORT_HASH_WORKERS = int(os.environ.get('USER_IMPORT_HASH_WORKERS', os.cpu_count() or 2))
     
     # CORS Configuration
     cors_origins_env = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://127.0.0.1:3000')
     CORS_ORIGINS = [origin.strip() for origin in cors_origins_env.split(',')]
+    
+    # Socket.IO scale-out: a message queue URL (e.g. redis://host:6379/0) lets
+    # several workers share rooms and broadcasts; unset means one worker
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+    SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    # Comma separated Engine.IO transports; "websocket" alone removes the
+    # need for sticky sessions behind a load balancer
+    socketio_transports_env = os.environ.get('SOCKETIO_TRANSPORTS', 'polling,websocket')
+    SOCKETIO_TRANSPORTS = [transport.strip() for transport in socketio_transports_env.split(',')]
+    # Seconds case_update events are coalesced per room before sending; 0 sends at once
+    CASE_UPDATE_WINDOW = float(os.environ.get('CASE_UPDATE_WINDOW', '0.5'))
+    
+    # Activity log: seconds events are buffered before a batched write (0
+    # turns the background writer off), rows per INSERT, and how long events
+    # are kept before being rolled up into daily counts (0 keeps them forever)
+    ACTIVITY_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_FLUSH_INTERVAL', '2'))
+    ACTIVITY_BATCH_SIZE = int(os.environ.get('ACTIVITY_BATCH_SIZE', '500'))
+    ACTIVITY_RETENTION_DAYS = int(os.environ.get('ACTIVITY_RETENTION_DAYS', '365'))
+    ACTIVITY_PRUNE_INTERVAL = int(os.environ.get('ACTIVITY_PRUNE_INTERVAL', '21600'))
 
 
 class DevelopmentConfig(Config):
@@ -64,7 +104,13 @@ class TestingConfig(Config):
     """Testing configuration."""
     DEBUG = True
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///test.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite:///test.db')
+    # Tests write activity events with activity_log.flush()
+    ACTIVITY_FLUSH_INTERVAL = 0
+    # Tests refresh the token blocklist with token_blocklist.refresh()
+    REVOCATION_REFRESH_INTERVAL = 0
+    # Cheap hashes keep login tests fast
+    BCRYPT_LOG_ROUNDS = 4
 
 
 # Configuration dictionary
@@ -0,0 +1,48 @@
+"""
+Script to create users in bulk from a CSV or NDJSON file.
+Same import as POST /admin/users/import, without the upload:
+
+    python import_users.py clients.csv
+    python import_users.py clients.ndjson --batch-size 1000 --workers 8
+
+CSV files need a header row; columns are email, name, password (or an
+existing bcrypt password_hash), role and phone.
+"""
+import argparse
+import sys
+
+from app import app
+from services import UserImportService
+
+# Errors printed; the full count is always shown
+MAX_PRINTED_ERRORS = 20
+
+
+def import_users(path, fmt=None, batch_size=None, workers=None):
+    """Import users from a file and print the report."""
+    fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    with app.app_context(), open(path, 'rb') as stream:
+        print(f"\n=== Importing users from {path} ({fmt}) ===")
+        report, error = UserImportService.import_users(stream, fmt, batch_size=batch_size, workers=workers)
+        
+        if error:
+            print(f"✗ {error}")
+            return False
+        
+        print(f"✓ Created {report['created']} of {report['rows']} users in {report['seconds']}s "
+              f"({report['users_per_minute']} users/min)")
+        for item in report['errors'][:MAX_PRINTED_ERRORS]:
+            print(f"✗ Row {item['row']} ({item['email']}): {item['error']}")
+        if report['failed'] > MAX_PRINTED_ERRORS:
+            print(f"  ... and {report['failed'] - MAX_PRINTED_ERRORS} more rows failed")
+        return report['failed'] == 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create users in bulk from a CSV or NDJSON file.')
+    parser.add_argument('path', help='CSV or NDJSON file')
+    parser.add_argument('--format', choices=('csv', 'ndjson'), help='defaults to the file extension')
+    parser.add_argument('--batch-size', type=int, help='rows per batch (USER_IMPORT_BATCH_SIZE)')
+    parser.add_argument('--workers', type=int, help='password hashing threads (USER_IMPORT_HASH_WORKERS)')
+    args = parser.parse_args()
+    sys.exit(0 if import_users(args.path, args.format, args.batch_size, args.workers) else 1)
@@ -0,0 +1,34 @@
+"""Add composite index for paging case message threads
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # Fresh databases get the index from db.create_all()
+    if 'messages' not in inspector.get_table_names():
+        return
+    existing = {index['name'] for index in inspector.get_indexes('messages')}
+    if 'ix_messages_case_id_created_at' not in existing:
+        op.create_index(
+            'ix_messages_case_id_created_at',
+            'messages',
+            ['case_id', 'created_at', 'id']
+        )
+
+
+def downgrade():
+    op.drop_index('ix_messages_case_id_created_at', table_name='messages')
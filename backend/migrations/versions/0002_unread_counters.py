@@ -0,0 +1,41 @@
+"""Add materialized unread message counters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'unread_counters' not in tables:
+        op.create_table(
+            'unread_counters',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('case_id', sa.Integer(), sa.ForeignKey('cases.id'), primary_key=True),
+            sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+    # Backfill from existing messages (the table may come empty from create_all)
+    if 'messages' in tables:
+        op.execute('DELETE FROM unread_counters')
+        op.execute(
+            'INSERT INTO unread_counters (user_id, case_id, count) '
+            'SELECT recipient_id, case_id, COUNT(id) FROM messages '
+            'WHERE read = false GROUP BY recipient_id, case_id'
+        )
+
+
+def downgrade():
+    op.drop_table('unread_counters')
@@ -0,0 +1,32 @@
+"""Add per-case read watermarks
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'message_read_states' not in inspector.get_table_names():
+        op.create_table(
+            'message_read_states',
+            sa.Column('case_id', sa.Integer(), sa.ForeignKey('cases.id'), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('last_read_message_id', sa.Integer(), sa.ForeignKey('messages.id'), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now()),
+        )
+
+
+def downgrade():
+    op.drop_table('message_read_states')
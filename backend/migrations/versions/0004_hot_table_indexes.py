@@ -0,0 +1,43 @@
+"""Add secondary indexes for the hot message, case, note and appointment queries
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_messages_recipient_id_read', 'messages', ['recipient_id', 'read']),
+    ('ix_cases_client_id_created_at', 'cases', ['client_id', 'created_at']),
+    ('ix_cases_assigned_to_id_status', 'cases', ['assigned_to_id', 'status']),
+    ('ix_cases_status_created_at', 'cases', ['status', 'created_at']),
+    ('ix_case_notes_case_id_created_at', 'case_notes', ['case_id', 'created_at']),
+    ('ix_appointments_attorney_id_start_datetime', 'appointments', ['attorney_id', 'start_datetime']),
+    ('ix_appointments_client_id_start_datetime', 'appointments', ['client_id', 'start_datetime']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    for name, table, columns in INDEXES:
+        # Fresh databases get these from db.create_all()
+        if table not in tables:
+            continue
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
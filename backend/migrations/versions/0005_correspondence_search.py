@@ -0,0 +1,46 @@
+"""Add full-text search indexes for messages and case notes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from models.search import SEARCHABLE_TABLES, sqlite_fts_ddl, postgres_fts_ddl
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = sa.inspect(bind).get_table_names()
+    for table in SEARCHABLE_TABLES:
+        if table not in tables:
+            continue
+        if bind.dialect.name == 'sqlite':
+            for statement in sqlite_fts_ddl(table):
+                op.execute(statement)
+            # Index the rows that existed before the triggers
+            op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+        elif bind.dialect.name == 'postgresql':
+            for statement in postgres_fts_ddl(table):
+                op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table in SEARCHABLE_TABLES:
+        if bind.dialect.name == 'sqlite':
+            for suffix in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif bind.dialect.name == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{table}_search_vector')
+            op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,44 @@
+"""Record when cases are closed and index the columns behind the admin statistics
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_cases_created_at', 'cases', ['created_at']),
+    ('ix_cases_closed_at', 'cases', ['closed_at']),
+    ('ix_users_role', 'users', ['role']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'cases' not in inspector.get_table_names():
+        return
+
+    if 'closed_at' not in {column['name'] for column in inspector.get_columns('cases')}:
+        op.add_column('cases', sa.Column('closed_at', sa.DateTime(), nullable=True))
+        # Best estimate for cases closed before the column existed
+        op.execute("UPDATE cases SET closed_at = updated_at WHERE status = 'CLOSED'")
+
+    for name, table, columns in INDEXES:
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_column('cases', 'closed_at')
@@ -0,0 +1,60 @@
+"""Add per-year case reference counters
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+CASE_REFERENCE = re.compile(r'^1000HILLS-(\d{4})-(\d+)$')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'case_sequences' not in inspector.get_table_names():
+        op.create_table(
+            'case_sequences',
+            sa.Column('year', sa.Integer(), primary_key=True, autoincrement=False),
+            sa.Column('last_value', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+    if 'cases' not in inspector.get_table_names():
+        return
+
+    # Continue numbering after the references already handed out
+    bind = op.get_bind()
+    highest = {}
+    for (case_id,) in bind.execute(sa.text("SELECT case_id FROM cases WHERE case_id LIKE '1000HILLS-%'")):
+        match = CASE_REFERENCE.match(case_id)
+        if match:
+            year, value = int(match.group(1)), int(match.group(2))
+            highest[year] = max(highest.get(year, 0), value)
+
+    existing = {year for (year,) in bind.execute(sa.text('SELECT year FROM case_sequences'))}
+    for year, value in highest.items():
+        if year in existing:
+            bind.execute(
+                sa.text('UPDATE case_sequences SET last_value = :value WHERE year = :year AND last_value < :value'),
+                {'year': year, 'value': value}
+            )
+        else:
+            bind.execute(
+                sa.text('INSERT INTO case_sequences (year, last_value) VALUES (:year, :value)'),
+                {'year': year, 'value': value}
+            )
+
+
+def downgrade():
+    op.drop_table('case_sequences')
@@ -0,0 +1,29 @@
+"""Index cases.updated_at for the case list validators
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'cases' not in inspector.get_table_names():
+        return
+
+    if 'ix_cases_updated_at' not in {index['name'] for index in inspector.get_indexes('cases')}:
+        op.create_index('ix_cases_updated_at', 'cases', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_cases_updated_at', table_name='cases')
@@ -0,0 +1,53 @@
+"""Add the append-only activity log and its daily rollup
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'activity_events' not in tables:
+        op.create_table(
+            'activity_events',
+            sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True),
+            sa.Column('occurred_at', sa.DateTime(), nullable=False),
+            sa.Column('actor_id', sa.Integer(), nullable=True),
+            sa.Column('case_id', sa.Integer(), nullable=True),
+            sa.Column('action', sa.String(length=50), nullable=False),
+            sa.Column('subject_type', sa.String(length=30), nullable=True),
+            sa.Column('subject_id', sa.Integer(), nullable=True),
+            sa.Column('details', sa.JSON(), nullable=True),
+        )
+        op.create_index('ix_activity_events_actor_id_id', 'activity_events', ['actor_id', 'id'])
+        op.create_index('ix_activity_events_case_id_id', 'activity_events', ['case_id', 'id'])
+        op.create_index('ix_activity_events_occurred_at', 'activity_events', ['occurred_at'])
+
+    if 'activity_daily_counts' not in tables:
+        op.create_table(
+            'activity_daily_counts',
+            sa.Column('day', sa.Date(), primary_key=True),
+            sa.Column('action', sa.String(length=50), primary_key=True),
+            sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+
+def downgrade():
+    op.drop_table('activity_daily_counts')
+    op.drop_index('ix_activity_events_occurred_at', table_name='activity_events')
+    op.drop_index('ix_activity_events_case_id_id', table_name='activity_events')
+    op.drop_index('ix_activity_events_actor_id_id', table_name='activity_events')
+    op.drop_table('activity_events')
@@ -0,0 +1,46 @@
+"""Add search indexes for case lookups by reference, title, description and client
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from models.search import CASE_SEARCH_COLUMNS, case_search_ddl
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = sa.inspect(bind).get_table_names()
+    for table in CASE_SEARCH_COLUMNS:
+        if table not in tables:
+            continue
+        for statement in case_search_ddl(table, bind.dialect.name):
+            op.execute(statement)
+        if bind.dialect.name == 'sqlite':
+            # Index the rows that existed before the triggers
+            op.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    bind = op.get_bind()
+    for table, columns in CASE_SEARCH_COLUMNS.items():
+        if bind.dialect.name == 'sqlite':
+            for suffix in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER IF EXISTS {table}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        elif bind.dialect.name == 'postgresql':
+            for column in columns:
+                op.execute(f'DROP INDEX IF EXISTS ix_{table}_{column}_trgm')
+            if table == 'cases':
+                op.execute('DROP INDEX IF EXISTS ix_cases_search_vector')
+                op.execute('ALTER TABLE cases DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,38 @@
+"""Index deadlines, documents and appointments for case timelines
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_deadlines_case_id_due_date', 'deadlines', ['case_id', 'due_date', 'id']),
+    ('ix_documents_case_id_created_at', 'documents', ['case_id', 'created_at', 'id']),
+    ('ix_appointments_case_id_start_datetime', 'appointments', ['case_id', 'start_datetime', 'id']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    for name, table, columns in INDEXES:
+        if table not in tables:
+            continue
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,66 @@
+"""Index users by name and email for the admin user directory
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from models.search import case_search_ddl, sqlite_fts_ddl
+
+
+# revision identifiers, used by Alembic.
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_users_created_at', ['created_at']),
+    ('ix_users_lower_name', [sa.text('lower(name)')]),
+    ('ix_users_lower_email', [sa.text('lower(email)')]),
+]
+
+
+def _drop_sqlite_users_fts():
+    for suffix in ('insert', 'delete', 'update'):
+        op.execute(f'DROP TRIGGER IF EXISTS users_fts_{suffix}')
+    op.execute('DROP TABLE IF EXISTS users_fts')
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'users' not in inspector.get_table_names():
+        return
+
+    existing = {index['name'] for index in inspector.get_indexes('users')}
+    for name, columns in INDEXES:
+        if name not in existing:
+            op.create_index(name, 'users', columns)
+
+    if bind.dialect.name == 'sqlite':
+        # users_fts gains an email column: rebuild it from the users table
+        _drop_sqlite_users_fts()
+        for statement in case_search_ddl('users', 'sqlite'):
+            op.execute(statement)
+        op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+    elif bind.dialect.name == 'postgresql':
+        for statement in case_search_ddl('users', 'postgresql'):
+            op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        _drop_sqlite_users_fts()
+        for statement in sqlite_fts_ddl('users', ('name',), tokenize='trigram'):
+            op.execute(statement)
+        op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+    elif bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_users_email_trgm')
+    for name, columns in reversed(INDEXES):
+        op.drop_index(name, table_name='users')
@@ -0,0 +1,38 @@
+"""Add the revoked access token blocklist
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'revoked_tokens' not in tables:
+        op.create_table(
+            'revoked_tokens',
+            sa.Column('jti', sa.String(length=36), primary_key=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('revoked_at', sa.DateTime(), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+        )
+        op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens', ['revoked_at'])
+        op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    op.drop_index('ix_revoked_tokens_revoked_at', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
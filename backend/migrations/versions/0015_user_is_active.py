@@ -0,0 +1,32 @@
+"""Add users.is_active so deactivated users cannot log in
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'users' not in inspector.get_table_names():
+        return
+
+    # email_verified used to double as the active flag, but registration
+    # and imports leave it false, so it cannot tell deactivated users
+    # apart; every existing user starts out active
+    if 'is_active' not in {column['name'] for column in inspector.get_columns('users')}:
+        op.add_column('users', sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()))
+
+
+def downgrade():
+    op.drop_column('users', 'is_active')
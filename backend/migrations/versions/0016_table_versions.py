@@ -0,0 +1,35 @@
+"""Add table change counters for list ETags
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0016'
+down_revision = '0015'
+branch_labels = None
+depends_on = None
+
+TRACKED_TABLES = ('appointments', 'cases', 'users')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'table_versions' in inspector.get_table_names():
+        return
+
+    table_versions = op.create_table(
+        'table_versions',
+        sa.Column('table_name', sa.String(length=50), primary_key=True),
+        sa.Column('version', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    )
+    op.bulk_insert(table_versions, [{'table_name': name, 'version': 0} for name in TRACKED_TABLES])
+
+
+def downgrade():
+    op.drop_table('table_versions')
@@ -12,6 +12,13 @@ from .case_note import CaseNote
 from .deadline import Deadline
 from .cms import Service, TeamMember, BlogPost
 from .appointment import Appointment, AppointmentType, AppointmentStatus
+from .unread_counter import UnreadCounter
+from .read_state import MessageReadState
+from .case_sequence import CaseSequence
+from .activity import ActivityEvent, ActivityDailyCount
+from .revoked_token import RevokedToken
+from .table_version import TableVersion
+from . import search  # noqa: F401  (registers full-text search DDL)
 
 __all__ = [
     'Base',
@@ -31,4 +38,11 @@ __all__ = [
     'Appointment',
     'AppointmentType',
     'AppointmentStatus',
+    'UnreadCounter',
+    'MessageReadState',
+    'CaseSequence',
+    'ActivityEvent',
+    'ActivityDailyCount',
+    'RevokedToken',
+    'TableVersion',
 ]
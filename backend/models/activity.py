@@ -0,0 +1,51 @@
+"""
+Activity log model definitions.
+"""
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Date, JSON, Index
+from .base import Base
+
+# 64-bit ids on PostgreSQL; SQLite only autoincrements INTEGER primary keys
+EventId = BigInteger().with_variant(Integer, 'sqlite')
+
+
+class ActivityEvent(Base):
+    """
+    One entry in the append-only activity log.
+
+    Rows are only ever inserted (in batches, by ActivityService) and deleted
+    by the retention job. Actor and case ids are plain columns rather than
+    foreign keys so the log outlives deleted users and cases and inserts
+    skip the constraint checks.
+    """
+    __tablename__ = 'activity_events'
+    __table_args__ = (
+        # Keyset pages filtered by actor or case, newest first
+        Index('ix_activity_events_actor_id_id', 'actor_id', 'id'),
+        Index('ix_activity_events_case_id_id', 'case_id', 'id'),
+        # Time ranges and the retention cut-off
+        Index('ix_activity_events_occurred_at', 'occurred_at'),
+    )
+
+    id = Column(EventId, primary_key=True)
+    occurred_at = Column(DateTime, nullable=False)
+    actor_id = Column(Integer)
+    case_id = Column(Integer)
+    action = Column(String(50), nullable=False)  # e.g. case.created, note.updated
+    subject_type = Column(String(30))  # case, message, note, appointment
+    subject_id = Column(Integer)
+    details = Column(JSON)
+
+    def __repr__(self):
+        return f'<ActivityEvent {self.id} {self.action}>'
+
+
+class ActivityDailyCount(Base):
+    """Per-day event counts kept for events past the retention period."""
+    __tablename__ = 'activity_daily_counts'
+
+    day = Column(Date, primary_key=True)
+    action = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ActivityDailyCount {self.day} {self.action}={self.count}>'
@@ -2,7 +2,7 @@
 Appointment model for managing client-attorney meetings.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text, Index
 from sqlalchemy.orm import relationship
 import enum
 from .base import Base
@@ -28,6 +28,13 @@ class Appointment(Base):
     """Appointment model for client-attorney meetings."""
     
     __tablename__ = 'appointments'
+    __table_args__ = (
+        # Calendars per attorney and per client, ordered by start time
+        Index('ix_appointments_attorney_id_start_datetime', 'attorney_id', 'start_datetime'),
+        Index('ix_appointments_client_id_start_datetime', 'client_id', 'start_datetime'),
+        # Case timelines
+        Index('ix_appointments_case_id_start_datetime', 'case_id', 'start_datetime', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String(200), nullable=False)
@@ -1,7 +1,7 @@
 """
 Case model definition.
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -11,6 +11,19 @@ from .enums import CaseCategory, CaseStatus, Priority
 class Case(Base):
     """Case model for legal case management."""
     __tablename__ = 'cases'
+    __table_args__ = (
+        # Client case lists, newest first
+        Index('ix_cases_client_id_created_at', 'client_id', 'created_at'),
+        # Staff workloads and assignee/status filters
+        Index('ix_cases_assigned_to_id_status', 'assigned_to_id', 'status'),
+        # Status filters, newest first
+        Index('ix_cases_status_created_at', 'status', 'created_at'),
+        # Weekly opened/closed trends
+        Index('ix_cases_created_at', 'created_at'),
+        Index('ix_cases_closed_at', 'closed_at'),
+        # Conditional GET validators: newest change in a list
+        Index('ix_cases_updated_at', 'updated_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     case_id = Column(String, unique=True, nullable=False)  # Format: 1000HILLS-2024-001
@@ -35,6 +48,7 @@ class Case(Base):
     # Timestamps
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    closed_at = Column(DateTime)  # Set when the case moves to CLOSED
 
     def __repr__(self):
         return f'<Case {self.case_id}>'
@@ -1,7 +1,7 @@
 """
 Case Note model definition.
 """
-from sqlalchemy import Column, Integer, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -10,6 +10,9 @@ from .base import Base
 class CaseNote(Base):
     """Case Note model for internal case notes."""
     __tablename__ = 'case_notes'
+    __table_args__ = (
+        Index('ix_case_notes_case_id_created_at', 'case_id', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     content = Column(Text, nullable=False)
@@ -0,0 +1,22 @@
+"""
+Case reference sequence model definition.
+"""
+from sqlalchemy import Column, Integer
+from .base import Base
+
+
+class CaseSequence(Base):
+    """
+    Last case reference number handed out per year.
+    
+    Case references (1000HILLS-YYYY-NNN) are allocated by incrementing this
+    row inside the transaction that creates the case, so concurrent
+    submissions are serialized on the row instead of racing on a scan.
+    """
+    __tablename__ = 'case_sequences'
+    
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    last_value = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CaseSequence {self.year}={self.last_value}>'
@@ -1,7 +1,7 @@
 """
 Deadline model definition.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -10,6 +10,10 @@ from .base import Base
 class Deadline(Base):
     """Deadline model for case deadlines."""
     __tablename__ = 'deadlines'
+    __table_args__ = (
+        # Case timelines, ordered by due date
+        Index('ix_deadlines_case_id_due_date', 'case_id', 'due_date', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String, nullable=False)
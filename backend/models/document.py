@@ -1,7 +1,7 @@
 """
 Document model definition.
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -10,6 +10,10 @@ from .base import Base
 class Document(Base):
     """Document model for file attachments."""
     __tablename__ = 'documents'
+    __table_args__ = (
+        # Case timelines, newest first
+        Index('ix_documents_case_id_created_at', 'case_id', 'created_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     filename = Column(String, nullable=False)
@@ -1,7 +1,7 @@
 """
 Message model definition.
 """
-from sqlalchemy import Column, Integer, Text, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -10,6 +10,12 @@ from .base import Base
 class Message(Base):
     """Message model for case communication."""
     __tablename__ = 'messages'
+    __table_args__ = (
+        # Keyset pagination of case threads on (created_at, id)
+        Index('ix_messages_case_id_created_at', 'case_id', 'created_at', 'id'),
+        # Unread lookups per recipient
+        Index('ix_messages_recipient_id_read', 'recipient_id', 'read'),
+    )
     
     id = Column(Integer, primary_key=True)
     content = Column(Text, nullable=False)
@@ -0,0 +1,21 @@
+"""
+Message read state model definition.
+"""
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from .base import Base
+
+
+class MessageReadState(Base):
+    """Per-(case, user) watermark of the last message the user has read."""
+    __tablename__ = 'message_read_states'
+    
+    case_id = Column(Integer, ForeignKey('cases.id'), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    last_read_message_id = Column(Integer, ForeignKey('messages.id'), nullable=False)
+    
+    # Timestamps
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f'<MessageReadState case={self.case_id} user={self.user_id} up to {self.last_read_message_id}>'
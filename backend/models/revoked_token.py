@@ -0,0 +1,30 @@
+"""
+Revoked token model definition.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from .base import Base
+
+
+class RevokedToken(Base):
+    """
+    An access token revoked before it expired (e.g. by logging out).
+
+    Every worker keeps the live rows in memory (see TokenBlocklist) and
+    reads only the recently revoked ones on each refresh. A row is useless
+    once its token has expired, so expired rows are pruned.
+    """
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = (
+        # Incremental refreshes read the newest revocations
+        Index('ix_revoked_tokens_revoked_at', 'revoked_at'),
+        # Startup loads and pruning by expiry
+        Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    )
+
+    jti = Column(String(36), primary_key=True)
+    user_id = Column(Integer)
+    revoked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
@@ -0,0 +1,111 @@
+"""
+Full-text search index definitions.
+
+Message and CaseNote content is indexed outside the ORM:
+- PostgreSQL: a generated ``search_vector`` tsvector column with a GIN index.
+- SQLite: an FTS5 external-content table kept in sync by triggers.
+
+Cases are indexed for staff lookups by partial reference, title,
+description and client name, and users for the admin user directory by
+name and email:
+- PostgreSQL: trigram (pg_trgm) GIN indexes on cases.case_id, cases.title,
+  users.name and users.email, plus a tsvector over title and description.
+- SQLite: trigram-tokenized FTS5 tables over the case and user columns.
+
+The DDL runs whenever the tables are created (db.create_all) and from
+migrations 0005, 0010 and 0013 for existing databases.
+"""
+from sqlalchemy import DDL, event
+from .message import Message
+from .case_note import CaseNote
+from .case import Case
+from .user import User
+
+# Tables whose ``content`` column is searchable
+SEARCHABLE_TABLES = ('messages', 'case_notes')
+
+# Case and user search: columns indexed per table
+CASE_SEARCH_COLUMNS = {
+    'cases': ('case_id', 'title', 'description'),
+    'users': ('name', 'email'),
+}
+
+
+def sqlite_fts_ddl(table, columns=('content',), tokenize='porter unicode61'):
+    """FTS5 shadow table and sync triggers for some of a table's text columns."""
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{names}, content='{table}', content_rowid='id', tokenize='{tokenize}')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def postgres_fts_ddl(table, columns=('content',)):
+    """Generated tsvector column and GIN index over some of a table's text columns."""
+    document = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+    return [
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('english', {document})) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)",
+    ]
+
+
+def postgres_trigram_ddl(table, columns):
+    """pg_trgm GIN indexes, which serve ILIKE '%...%' and similarity() lookups."""
+    return ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm ON {table} USING GIN ({column} gin_trgm_ops)"
+        for column in columns
+    ]
+
+
+def case_search_ddl(table, dialect):
+    """Case search DDL for one of the CASE_SEARCH_COLUMNS tables."""
+    columns = CASE_SEARCH_COLUMNS[table]
+    if dialect == 'sqlite':
+        return sqlite_fts_ddl(table, columns, tokenize='trigram')
+    if dialect == 'postgresql':
+        if table == 'cases':
+            # Words in titles and descriptions; partial references and
+            # titles go through the trigram indexes
+            return postgres_fts_ddl(table, ('title', 'description')) + postgres_trigram_ddl(table, ('case_id', 'title'))
+        return postgres_trigram_ddl(table, columns)
+    return []
+
+
+def _listen(table, statements, dialect):
+    for statement in statements:
+        event.listen(table, 'after_create', DDL(statement).execute_if(dialect=dialect))
+    if dialect == 'sqlite':
+        event.listen(
+            table,
+            'before_drop',
+            DDL(f'DROP TABLE IF EXISTS {table.name}_fts').execute_if(dialect='sqlite')
+        )
+
+
+def _install(model):
+    table = model.__table__
+    _listen(table, sqlite_fts_ddl(table.name), 'sqlite')
+    _listen(table, postgres_fts_ddl(table.name), 'postgresql')
+
+
+def _install_case_search(model):
+    table = model.__table__
+    for dialect in ('sqlite', 'postgresql'):
+        _listen(table, case_search_ddl(table.name, dialect), dialect)
+
+
+_install(Message)
+_install(CaseNote)
+_install_case_search(Case)
+_install_case_search(User)
@@ -0,0 +1,83 @@
+"""
+Table change counters.
+
+Each tracked table has a row whose version goes up by one in every
+transaction that inserts, updates or deletes any of its rows, whether
+through the ORM or a bulk INSERT/UPDATE/DELETE run on the session. List
+endpoints put the counters of the tables they show into their ETags
+(see utils.conditional), which unlike timestamps cannot collide within a
+second and also move when only a joined table changed.
+
+The counters are bumped in one UPDATE just before commit, so their rows
+are locked only for the end of the transaction and always in the same
+order.
+"""
+import itertools
+
+from sqlalchemy import Column, String, BigInteger, Integer, event, update
+from sqlalchemy.orm import Session
+from .base import Base
+
+# Tables whose changes list validators need to see
+TRACKED_TABLES = ('appointments', 'cases', 'users')
+
+
+class TableVersion(Base):
+    """Change counter of one table."""
+    __tablename__ = 'table_versions'
+
+    table_name = Column(String(50), primary_key=True)
+    version = Column(BigInteger().with_variant(Integer(), 'sqlite'), nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<TableVersion {self.table_name}={self.version}>'
+
+
+@event.listens_for(TableVersion.__table__, 'after_create')
+def _seed_versions(target, connection, **kw):
+    connection.execute(target.insert(), [{'table_name': name, 'version': 0} for name in TRACKED_TABLES])
+
+
+def _changed_tables(session):
+    return session.info.setdefault('changed_tables', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_flush(session, flush_context):
+    objects = itertools.chain(
+        session.new,
+        session.deleted,
+        (obj for obj in session.dirty if session.is_modified(obj, include_collections=False)),
+    )
+    changed = {obj.__table__.name for obj in objects}
+    _changed_tables(session).update(changed.intersection(TRACKED_TABLES))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _record_statement(orm_execute_state):
+    state = orm_execute_state
+    if not (state.is_insert or state.is_update or state.is_delete) or state.bind_mapper is None:
+        return
+    table = state.bind_mapper.local_table.name
+    if table in TRACKED_TABLES:
+        _changed_tables(state.session).add(table)
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_versions(session):
+    # Flush now so changes still pending are counted too
+    session.flush()
+    changed = session.info.pop('changed_tables', None)
+    if changed:
+        session.execute(
+            update(TableVersion)
+            .where(TableVersion.table_name.in_(sorted(changed)))
+            .values(version=TableVersion.version + 1)
+        )
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_changes(session, previous_transaction):
+    # A savepoint rollback keeps the outer transaction's changes
+    if previous_transaction.parent is None:
+        session.info.pop('changed_tables', None)
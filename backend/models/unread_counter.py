@@ -0,0 +1,22 @@
+"""
+Unread message counter model definition.
+"""
+from sqlalchemy import Column, Integer, ForeignKey
+from .base import Base
+
+
+class UnreadCounter(Base):
+    """
+    Materialized count of unread messages per recipient and case.
+    
+    Kept in step with the messages table by UnreadCounterService in the same
+    transaction as message inserts and read-state changes.
+    """
+    __tablename__ = 'unread_counters'
+    
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    case_id = Column(Integer, ForeignKey('cases.id'), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<UnreadCounter user={self.user_id} case={self.case_id} count={self.count}>'
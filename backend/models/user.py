@@ -1,9 +1,9 @@
 """
 User model definition.
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, true
 from .base import Base
 from .enums import Role
 
@@ -11,6 +11,12 @@ from .enums import Role
 class User(Base):
     """User model for authentication and authorization."""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Users-by-role counts for the admin dashboard
+        Index('ix_users_role', 'role'),
+        # User directory sorted by sign-up date
+        Index('ix_users_created_at', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, nullable=False)
@@ -19,6 +25,10 @@ class User(Base):
     phone = Column(String)
     role = Column(Enum(Role), default=Role.CLIENT, nullable=False)
     email_verified = Column(Boolean, default=False)
+    # Deactivated users cannot log in (see toggle-status)
+    is_active = Column(Boolean, default=True, server_default=true(), nullable=False)
+    # Copied into every access token; bumping it revokes the user's tokens
+    token_version = Column(Integer, default=0, server_default='0', nullable=False)
     
     # Relationships
     cases_client = relationship("Case", back_populates="client", foreign_keys="[Case.client_id]")
@@ -40,8 +50,14 @@ class User(Base):
             'phone': self.phone,
             'role': self.role.value if self.role else None,
             'email_verified': self.email_verified,
+            'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
     
     def __repr__(self):
         return f'<User {self.email}>'
+
+
+# User directory: case-insensitive sorting, keyset pages and prefix searches
+Index('ix_users_lower_name', func.lower(User.name))
+Index('ix_users_lower_email', func.lower(User.email))
@@ -0,0 +1,27 @@
+"""
+Script to apply the activity log retention policy.
+Rolls events older than ACTIVITY_RETENTION_DAYS up into per-day counts and
+deletes them. The web workers also do this every ACTIVITY_PRUNE_INTERVAL
+seconds; run it from a scheduled job to prune on a fixed timetable.
+"""
+import sys
+
+from app import app
+from services.activity_service import ActivityService
+
+
+def prune_activity_log(retention_days=None):
+    """Roll up and delete expired activity events."""
+    with app.app_context():
+        retention_days = retention_days or app.config['ACTIVITY_RETENTION_DAYS']
+        print(f"\n=== Pruning Activity Log (keeping {retention_days} days) ===")
+        deleted, error = ActivityService.prune(retention_days)
+        
+        if error:
+            print(f"✗ Error pruning activity log after {deleted} events: {error}")
+        else:
+            print(f"✓ Rolled up and deleted {deleted} activity events")
+
+
+if __name__ == '__main__':
+    prune_activity_log(int(sys.argv[1]) if len(sys.argv) > 1 else None)
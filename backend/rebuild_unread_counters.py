@@ -0,0 +1,25 @@
+"""
+Script to rebuild the materialized unread message counters.
+Recomputes every (user, case) counter from the messages table, e.g. from a
+scheduled job or after editing messages by hand. New messages and reads
+wait while it runs (see UnreadCounterService.rebuild), so it can run
+with the app up, but is best scheduled for a quiet time.
+"""
+from app import app
+from services.unread_service import UnreadCounterService
+
+
+def rebuild_unread_counters():
+    """Rebuild all unread counters from scratch."""
+    with app.app_context():
+        print("\n=== Rebuilding Unread Counters ===")
+        rows, error = UnreadCounterService.rebuild()
+        
+        if error:
+            print(f"✗ Error rebuilding unread counters: {error}")
+        else:
+            print(f"✓ Rebuilt {rows} unread counters")
+
+
+if __name__ == '__main__':
+    rebuild_unread_counters()
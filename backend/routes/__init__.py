@@ -7,5 +7,6 @@ from .cases import case_bp
 from .notes import notes_bp
 from .messages import messages_bp
 from .appointments import appointments_bp
+from .search import search_bp
 
-__all__ = ['auth_bp', 'case_bp', 'notes_bp', 'messages_bp', 'appointments_bp']
+__all__ = ['auth_bp', 'case_bp', 'notes_bp', 'messages_bp', 'appointments_bp', 'search_bp']
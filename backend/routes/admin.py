@@ -5,11 +5,18 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from utils import role_required, user_to_dict, get_current_user
 from models import Role, User
+from services import AuthService
 from extensions import db
-from werkzeug.security import generate_password_hash
+from utils.passwords import passwords
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+MAX_TREND_WEEKS = 52
+USER_PAGE_SIZE = 50
+MAX_USER_PAGE_SIZE = 200
+ACTIVITY_PAGE_SIZE = 50
+MAX_ACTIVITY_PAGE_SIZE = 200
+
 
 @admin_bp.route('/case-managers', methods=['GET'])
 @role_required(Role.SUPER_ADMIN, Role.CASE_MANAGER)
@@ -22,28 +29,94 @@ def get_case_managers():
 @admin_bp.route('/users', methods=['GET'])
 @role_required(Role.SUPER_ADMIN)
 def get_all_users():
-    """Get all users with optional filtering."""
-    role_filter = request.args.get('role')
-    status_filter = request.args.get('status')
-    search = request.args.get('search', '').lower()
-    
-    query = User.query
-    
-    # Apply filters
-    if role_filter and role_filter != 'ALL':
-        try:
-            role_enum = Role[role_filter]
-            query = query.filter(User.role == role_enum)
-        except KeyError:
-            return jsonify({"msg": "Invalid role filter"}), 400
-    
-    users = query.all()
-    
-    # Apply search filter
-    if search:
-        users = [u for u in users if search in u.name.lower() or search in u.email.lower()]
+    """
+    Get users, filtered and searched in the database.
+    
+    Query parameters:
+        role: Role name, or ALL
+        status: active, inactive or ALL
+        search: text matched against names and emails
+        sort: name, email, created_at or id; prefix with - for descending
+        limit / cursor: keyset pagination; without them the full list is
+            returned as a bare array, as before
+        include_total: also count the matching users
+    """
+    from services.user_service import UserService, USER_SORT_COLUMNS
+    
+    filters = {
+        'role': request.args.get('role'),
+        'status': request.args.get('status', '').lower() or None,
+        'search': request.args.get('search', '').strip() or None,
+    }
+    filters = {key: value for key, value in filters.items() if value and value.upper() != 'ALL'}
+    
+    sort = request.args.get('sort', 'name')
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in USER_SORT_COLUMNS:
+        return jsonify({"msg": f"Cannot sort by {sort}. Use one of: {', '.join(USER_SORT_COLUMNS)}"}), 400
+    
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    limit = min(max(request.args.get('limit', USER_PAGE_SIZE, type=int), 1), MAX_USER_PAGE_SIZE)
+    cursor = request.args.get('cursor', type=int)
     
-    return jsonify([user_to_dict(user) for user in users]), 200
+    try:
+        users, has_more = UserService.list_users(
+            filters,
+            sort=sort,
+            descending=descending,
+            limit=limit if paginated else None,
+            cursor=cursor
+        )
+    except KeyError as e:
+        return jsonify({"msg": f"Invalid filter value: {e.args[0]}"}), 400
+    
+    items = [user_to_dict(user) for user in users]
+    if not paginated:
+        return jsonify(items), 200
+    
+    response = {
+        "users": items,
+        "has_more": has_more,
+        "next_cursor": users[-1].id if has_more else None,
+        "limit": limit,
+    }
+    if request.args.get('include_total', 'false').lower() == 'true':
+        response["total"] = UserService.count_users(filters)
+    return jsonify(response), 200
+
+
+@admin_bp.route('/users/import', methods=['POST'])
+@role_required(Role.SUPER_ADMIN)
+def import_users():
+    """
+    Create users in bulk from a CSV or NDJSON file.
+    
+    Send the file as the request body (Content-Type text/csv or
+    application/x-ndjson) or as the ``file`` field of a multipart form;
+    ``format`` overrides the type. Returns a report with per-row errors.
+    """
+    from services import UserImportService
+    
+    upload = request.files.get('file')
+    if upload is not None:
+        stream, name = upload.stream, upload.filename or ''
+    else:
+        stream, name = request.stream, ''
+    
+    fmt = request.args.get('format')
+    if not fmt:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl') or name.endswith(('.ndjson', '.jsonl')):
+            fmt = 'ndjson'
+        else:
+            fmt = 'csv'
+    
+    report, error = UserImportService.import_users(stream, fmt)
+    
+    if error:
+        return jsonify({"msg": error}), 400
+    
+    return jsonify(report), 200
 
 
 @admin_bp.route('/users/<int:user_id>', methods=['GET'])
@@ -86,7 +159,7 @@ def create_user():
         email=email,
         name=name,
         role=role_enum,
-        password_hash=generate_password_hash(password)
+        password_hash=passwords.hash(password)
     )
     
     db.session.add(new_user)
@@ -120,18 +193,26 @@ def update_user(user_id):
             return jsonify({"msg": "Email already in use"}), 409
         user.email = data['email']
     
+    # Tokens carry the role, so a new role or password revokes them
+    revoke = False
+    
     if 'role' in data:
         try:
             role_enum = Role[data['role']]
-            user.role = role_enum
         except KeyError:
             return jsonify({"msg": "Invalid role"}), 400
+        revoke = revoke or role_enum != user.role
+        user.role = role_enum
     
     if 'password' in data and data['password']:
-        user.password_hash = generate_password_hash(data['password'])
+        user.password_hash = passwords.hash(data['password'])
+        revoke = True
     
     db.session.commit()
     
+    if revoke:
+        AuthService.revoke_tokens(user)
+    
     return jsonify({
         "msg": "User updated successfully",
         "user": user_to_dict(user)
@@ -155,6 +236,7 @@ def delete_user(user_id):
     
     db.session.delete(user)
     db.session.commit()
+    AuthService.forget_token_version(user_id)
     
     return jsonify({"msg": "User deleted successfully"}), 200
 
@@ -162,30 +244,31 @@ def delete_user(user_id):
 @admin_bp.route('/stats', methods=['GET'])
 @role_required(Role.SUPER_ADMIN)
 def get_stats():
-    """Get system statistics."""
-    from models import Case
+    """Get system statistics with weekly opened/closed case trends."""
+    from services.statistics_service import StatisticsService
     
-    total_users = User.query.count()
-    total_cases = Case.query.count()
+    weeks = min(max(request.args.get('weeks', 12, type=int), 1), MAX_TREND_WEEKS)
+    stats, error = StatisticsService.get_system_stats(weeks=weeks)
     
-    # Count users by role
-    role_counts = {}
-    for role in Role:
-        count = User.query.filter_by(role=role).count()
-        role_counts[role.value] = count
+    if error:
+        return jsonify({"msg": error}), 500
     
-    # Count cases by status
-    from models import CaseStatus
-    status_counts = {}
-    for status in CaseStatus:
-        count = Case.query.filter_by(status=status).count()
-        status_counts[status.value] = count
+    return jsonify(stats), 200
+
+
+@admin_bp.route('/realtime-metrics', methods=['GET'])
+@role_required(Role.SUPER_ADMIN)
+def get_realtime_metrics():
+    """Get WebSocket broadcast counters, including coalesced case updates."""
+    from websockets.aggregator import case_updates
+    from services.activity_service import activity_log
+    from services.revocation_service import token_blocklist
     
     return jsonify({
-        "total_users": total_users,
-        "total_cases": total_cases,
-        "users_by_role": role_counts,
-        "cases_by_status": status_counts
+        "case_updates": case_updates.get_metrics(),
+        "activity_log": activity_log.get_metrics(),
+        "password_hashing": passwords.get_metrics(),
+        "token_blocklist": token_blocklist.get_metrics()
     }), 200
 
 
@@ -198,11 +281,14 @@ def toggle_user_status(user_id):
     if not user:
         return jsonify({"msg": "User not found"}), 404
     
-    # Toggle the email_verified field as a proxy for active status
-    user.email_verified = not user.email_verified
+    user.is_active = not user.is_active
     db.session.commit()
     
-    status = "active" if user.email_verified else "inactive"
+    if not user.is_active:
+        # Deactivated users lose their current tokens and cannot log in again
+        AuthService.revoke_tokens(user)
+    
+    status = "active" if user.is_active else "inactive"
     
     return jsonify({
         "msg": f"User status changed to {status}",
@@ -213,25 +299,71 @@ def toggle_user_status(user_id):
 @admin_bp.route('/activity-log', methods=['GET'])
 @role_required(Role.SUPER_ADMIN)
 def get_activity_log():
-    """Get recent system activity."""
-    # Placeholder for activity log functionality
-    # In a real implementation, this would query an activity log table
+    """
+    Get system activity, newest first.
     
-    activities = [
-        {
-            "id": 1,
-            "user": "John Smith",
-            "action": "Created new case",
-            "details": "Property Dispute",
-            "timestamp": "2025-12-19T10:30:00Z"
-        },
+    Filters: actor_id, case_id, action, since and until (ISO timestamps,
+    until is exclusive). Pages with limit and the previous page's
+    next_cursor.
+    """
+    from datetime import datetime
+    from services.activity_service import ActivityService
+    
+    try:
+        since = request.args.get('since')
+        until = request.args.get('until')
+        since = datetime.fromisoformat(since) if since else None
+        until = datetime.fromisoformat(until) if until else None
+    except ValueError:
+        return jsonify({"msg": "since and until must be ISO timestamps"}), 400
+    
+    limit = min(max(request.args.get('limit', ACTIVITY_PAGE_SIZE, type=int), 1), MAX_ACTIVITY_PAGE_SIZE)
+    rows, has_more = ActivityService.list_events(
+        actor_id=request.args.get('actor_id', type=int),
+        case_id=request.args.get('case_id', type=int),
+        action=request.args.get('action'),
+        since=since,
+        until=until,
+        cursor=request.args.get('cursor', type=int),
+        limit=limit
+    )
+    
+    events = [
         {
-            "id": 2,
-            "user": "Sarah Johnson",
-            "action": "Updated case status",
-            "details": "Contract Review",
-            "timestamp": "2025-12-19T10:25:00Z"
+            "id": event.id,
+            "user": actor_name,
+            "actor_id": event.actor_id,
+            "action": event.action,
+            "case_id": event.case_id,
+            "subject_type": event.subject_type,
+            "subject_id": event.subject_id,
+            "details": event.details or {},
+            "timestamp": event.occurred_at.isoformat() + 'Z'
         }
+        for event, actor_name in rows
     ]
+    return jsonify({
+        "events": events,
+        "has_more": has_more,
+        "next_cursor": events[-1]["id"] if has_more else None,
+        "limit": limit
+    }), 200
+
+
+@admin_bp.route('/activity-log/daily', methods=['GET'])
+@role_required(Role.SUPER_ADMIN)
+def get_activity_daily_counts():
+    """Get per-day event counts kept for events past the retention period."""
+    from datetime import date
+    from services.activity_service import ActivityService
     
-    return jsonify(activities), 200
+    since = request.args.get('since')
+    try:
+        since = date.fromisoformat(since) if since else None
+    except ValueError:
+        return jsonify({"msg": "since must be an ISO date"}), 400
+    
+    return jsonify([
+        {"day": rollup.day.isoformat(), "action": rollup.action, "count": rollup.count}
+        for rollup in ActivityService.get_daily_counts(since)
+    ]), 200
@@ -6,9 +6,12 @@ from datetime import datetime, timedelta
 from functools import wraps
 from extensions import db
 from models import Appointment, AppointmentType, AppointmentStatus, User, Case, Role
-from utils.decorators import role_required
+from utils.decorators import role_required, get_current_user
+from utils.conditional import list_etag, not_modified, set_validators, tables_version
 from utils.google_meet import google_meet_service
+from services.activity_service import ActivityService
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
 import uuid
 
 appointments_bp = Blueprint('appointments', __name__, url_prefix='/api/appointments')
@@ -76,7 +79,7 @@ def get_appointments():
     """Get all appointments for the current user."""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -118,13 +121,25 @@ def get_appointments():
             except ValueError:
                 pass
         
+        # Answer revalidations from one aggregate before loading any rows
+        last_modified, count, version = query.with_entities(
+            func.max(Appointment.updated_at), func.count(Appointment.id),
+            # Appointments show client, attorney and case details
+            tables_version('appointments', 'cases', 'users')
+        ).one()
+        etag = list_etag(last_modified, count, scope=f'{user.id}:{user.role.value}', version=version)
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+        
         # Order by date
         appointments = query.order_by(Appointment.start_datetime.desc()).all()
         
-        return jsonify({
+        response = jsonify({
             'appointments': [apt.to_dict() for apt in appointments],
             'count': len(appointments)
-        }), 200
+        })
+        return set_validators(response, etag, last_modified), 200
         
     except Exception as e:
         print(f"Error fetching appointments: {str(e)}")
@@ -137,7 +152,7 @@ def get_appointment(appointment_id):
     """Get a specific appointment."""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         appointment = Appointment.query.get(appointment_id)
         
@@ -165,7 +180,7 @@ def create_appointment():
     """Create a new appointment."""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         data = request.get_json()
         
         # Validate required fields
@@ -281,6 +296,11 @@ def create_appointment():
                 client.phone = data['client_phone']
         
         db.session.commit()
+        ActivityService.record(
+            'appointment.created', case_id=appointment.case_id, subject_type='appointment',
+            subject_id=appointment.id, status=appointment.status.value,
+            start_datetime=appointment.start_datetime.isoformat()
+        )
         
         # Send confirmation emails if appointment is confirmed
         if initial_status == AppointmentStatus.CONFIRMED:
@@ -306,7 +326,7 @@ def update_appointment(appointment_id):
     """Update an existing appointment."""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         data = request.get_json()
         
         appointment = Appointment.query.get(appointment_id)
@@ -403,6 +423,10 @@ def update_appointment(appointment_id):
         appointment.updated_at = datetime.utcnow()
         
         db.session.commit()
+        ActivityService.record(
+            'appointment.updated', case_id=appointment.case_id, subject_type='appointment',
+            subject_id=appointment.id, fields=sorted(data)
+        )
         
         # Send confirmation emails if status just changed to confirmed
         if status_changed_to_confirmed:
@@ -424,7 +448,6 @@ def update_appointment(appointment_id):
 
 
 @appointments_bp.route('/<int:appointment_id>', methods=['DELETE'])
-@jwt_required()
 @role_required([Role.SUPER_ADMIN, Role.CASE_MANAGER])
 def delete_appointment(appointment_id):
     """Delete an appointment."""
@@ -434,8 +457,12 @@ def delete_appointment(appointment_id):
         if not appointment:
             return jsonify({'error': 'Appointment not found'}), 404
         
+        case_id = appointment.case_id
         db.session.delete(appointment)
         db.session.commit()
+        ActivityService.record(
+            'appointment.deleted', case_id=case_id, subject_type='appointment', subject_id=appointment_id
+        )
         
         return jsonify({'message': 'Appointment deleted successfully'}), 200
         
@@ -451,7 +478,7 @@ def cancel_appointment(appointment_id):
     """Cancel an appointment."""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         appointment = Appointment.query.get(appointment_id)
         
@@ -466,6 +493,10 @@ def cancel_appointment(appointment_id):
         appointment.updated_at = datetime.utcnow()
         
         db.session.commit()
+        ActivityService.record(
+            'appointment.cancelled', case_id=appointment.case_id, subject_type='appointment',
+            subject_id=appointment.id
+        )
         
         return jsonify({
             'message': 'Appointment cancelled successfully',
@@ -484,7 +515,7 @@ def get_appointment_stats():
     """Get appointment statistics for the current user."""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         # Base query based on role
         if user.role == Role.CLIENT:
@@ -556,7 +587,6 @@ def get_available_attorneys():
 
 
 @appointments_bp.route('/<int:appointment_id>/regenerate-link', methods=['POST'])
-@jwt_required()
 @role_required([Role.SUPER_ADMIN, Role.CASE_MANAGER])
 def regenerate_meeting_link(appointment_id):
     """Regenerate Google Meet link for an appointment (Admin/Manager only)."""
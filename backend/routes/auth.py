@@ -2,7 +2,7 @@
 Authentication routes.
 """
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from services import AuthService
 from utils import user_to_dict, get_current_user
 
@@ -49,6 +49,15 @@ def login():
     return jsonify(result), 200
 
 
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """Revoke the token used for this request."""
+    AuthService.revoke_token(get_jwt())
+    
+    return jsonify({"msg": "Logged out successfully"}), 200
+
+
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user_info():
@@ -4,11 +4,105 @@ Case management routes.
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services import CaseService
-from utils import role_required, case_to_dict, get_current_user, validate_required_fields
+from services.search_service import SearchService
+from services.timeline_service import TimelineService, TIMELINE_KINDS
+from services.case_service import SORT_COLUMNS
+from utils import role_required, case_to_dict, case_row_to_dict, get_current_user, validate_required_fields
+from utils.serializers import CASE_FIELDS
+from utils.conditional import list_etag, not_modified, set_validators
 from models import Role, Priority
 
 case_bp = Blueprint('case', __name__, url_prefix='/cases')
 
+CASE_PAGE_SIZE = 50
+MAX_CASE_PAGE_SIZE = 200
+MAX_BULK_CASES = 1000
+CASE_SEARCH_PAGE_SIZE = 20
+MAX_CASE_SEARCH_PAGE_SIZE = 100
+TIMELINE_PAGE_SIZE = 50
+MAX_TIMELINE_PAGE_SIZE = 200
+
+
+def requested_fields():
+    """
+    Parse the ``fields`` query parameter.
+    
+    Returns:
+        (fields, error_response); fields is None when not given.
+    """
+    fields = request.args.get('fields')
+    if not fields:
+        return None, None
+    fields = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in CASE_FIELDS]
+    if unknown:
+        return None, (jsonify({"msg": f"Unknown fields: {', '.join(unknown)}"}), 400)
+    return fields, None
+
+
+def case_listing(filters):
+    """
+    Build a case list response from the listing query parameters.
+    
+    Supports ``sort`` (created_at, case_id or id; prefix with ``-`` for
+    descending, the default is ``-created_at``), ``fields`` (comma separated
+    sparse fieldset) and, when ``limit`` or ``cursor`` is given, keyset
+    pagination with an optional ``include_total``. Without them the full
+    list is returned as a bare array, as before.
+    
+    Responses carry ETag and Last-Modified validators; a client whose copy
+    is current gets a 304 before any rows are loaded.
+    """
+    sort = request.args.get('sort', '-created_at')
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in SORT_COLUMNS:
+        return jsonify({"msg": f"Cannot sort by {sort}. Use one of: {', '.join(SORT_COLUMNS)}"}), 400
+    
+    fields, error = requested_fields()
+    if error:
+        return error
+    
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    limit = min(max(request.args.get('limit', CASE_PAGE_SIZE, type=int), 1), MAX_CASE_PAGE_SIZE)
+    cursor = request.args.get('cursor', type=int)
+    
+    try:
+        last_modified, count, version = CaseService.case_list_version(filters)
+    except KeyError as e:
+        return jsonify({"msg": f"Invalid filter value: {e.args[0]}"}), 400
+    etag = list_etag(last_modified, count, scope=sorted(filters.items()), version=version)
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+    
+    try:
+        rows, has_more = CaseService.list_case_rows(
+            filters,
+            sort=sort,
+            descending=descending,
+            limit=limit if paginated else None,
+            cursor=cursor,
+            fields=fields
+        )
+    except KeyError as e:
+        return jsonify({"msg": f"Invalid filter value: {e.args[0]}"}), 400
+    
+    items = [case_row_to_dict(row, fields=fields) for row in rows]
+    if not paginated:
+        return set_validators(jsonify(items), etag, last_modified), 200
+    
+    response = {
+        "cases": items,
+        "has_more": has_more,
+        "next_cursor": rows[-1].id if has_more else None,
+        "limit": limit,
+    }
+    if request.args.get('include_total', 'false').lower() == 'true':
+        # The validator query already counted the matching cases
+        response["total"] = count
+    return set_validators(jsonify(response), etag, last_modified), 200
+
 
 # --- Client Routes ---
 
@@ -74,12 +168,9 @@ def submit_case():
 @jwt_required()
 def get_client_cases():
     """Client views their own cases."""
-    current_user_id = get_jwt_identity()
+    current_user_id = int(get_jwt_identity())
     print(f"[DEBUG] GET /cases/ - Current user ID: {current_user_id}")
-    cases = CaseService.get_cases_by_client(current_user_id)
-    print(f"[DEBUG] Found {len(cases)} cases for user {current_user_id}")
-    
-    return jsonify([case_to_dict(case) for case in cases]), 200
+    return case_listing({'client_id': current_user_id})
 
 
 @case_bp.route('/<int:case_id>', methods=['GET'])
@@ -100,20 +191,51 @@ def get_case_details(case_id):
     return jsonify(case_to_dict(case)), 200
 
 
+@case_bp.route('/<int:case_id>/timeline', methods=['GET'])
+@jwt_required()
+def get_case_timeline(case_id):
+    """
+    One feed of a case's messages, notes, deadlines, appointments and documents.
+    
+    Newest first; continue with the previous page's next_cursor. ``types``
+    limits the feed to some kinds (comma separated, e.g. message,note).
+    """
+    current_user = get_current_user()
+    case, error = CaseService.get_case_by_id(case_id, user_id=current_user.id, user_role=current_user.role)
+    if error:
+        return jsonify({"msg": error}), 404
+    
+    kinds = request.args.get('types')
+    if kinds:
+        kinds = {kind.strip() for kind in kinds.split(',') if kind.strip()}
+        unknown = kinds - set(TIMELINE_KINDS)
+        if unknown:
+            return jsonify({"msg": f"Unknown types: {', '.join(sorted(unknown))}"}), 400
+    
+    cursor = request.args.get('cursor')
+    try:
+        cursor = TimelineService.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"msg": "Invalid cursor"}), 400
+    
+    limit = min(max(request.args.get('limit', TIMELINE_PAGE_SIZE, type=int), 1), MAX_TIMELINE_PAGE_SIZE)
+    events, has_more = TimelineService.get_case_timeline(case.id, current_user, cursor=cursor, limit=limit, kinds=kinds)
+    
+    return jsonify({
+        "events": events,
+        "has_more": has_more,
+        "next_cursor": TimelineService.encode_cursor(events[-1]) if has_more else None,
+        "limit": limit
+    }), 200
+
+
 # --- Admin/Staff Routes ---
 
 @case_bp.route('/admin', methods=['GET'])
 @role_required(Role.CASE_MANAGER, Role.SUPER_ADMIN)
 def get_all_cases():
     """Staff views all cases."""
-    status = request.args.get('status')
-    
-    if status:
-        cases = CaseService.get_cases_by_status(status)
-    else:
-        cases = CaseService.get_all_cases()
-    
-    return jsonify([case_to_dict(case) for case in cases]), 200
+    return case_listing({'status': request.args.get('status')})
 
 
 @case_bp.route('/admin/<int:case_id>', methods=['GET'])
@@ -149,6 +271,52 @@ def update_case(case_id):
         "case": case_to_dict(case)
     }), 200
 
+@case_bp.route('/admin/bulk', methods=['POST'])
+@role_required(Role.CASE_MANAGER, Role.SUPER_ADMIN)
+def bulk_update_cases():
+    """
+    Staff updates many cases at once.
+    
+    Body: {"case_ids": [...]} or {"filter": {"status": ..., "assigned_to_id": ...}},
+    plus {"changes": {"status": ..., "priority": ..., "assigned_to_id": ...}}.
+    """
+    data = request.get_json() or {}
+    case_ids = data.get('case_ids')
+    filters = data.get('filter')
+    changes = data.get('changes') or {}
+    
+    if case_ids is not None:
+        if not isinstance(case_ids, list) or not all(isinstance(case_id, int) for case_id in case_ids):
+            return jsonify({"msg": "case_ids must be a list of integers"}), 400
+        if len(case_ids) > MAX_BULK_CASES:
+            return jsonify({"msg": f"At most {MAX_BULK_CASES} cases per request"}), 400
+    
+    if filters is not None:
+        allowed = {'status', 'category', 'priority', 'assigned_to_id', 'client_id'}
+        if not isinstance(filters, dict) or not filters or set(filters) - allowed:
+            return jsonify({"msg": f"filter must use: {', '.join(sorted(allowed))}"}), 400
+        # A null or empty value would drop out of the WHERE clause
+        if any(value is None or value == '' for value in filters.values()):
+            return jsonify({"msg": "filter values must not be null or empty"}), 400
+    
+    results, error = CaseService.bulk_update_cases(
+        case_ids=case_ids,
+        filters=filters,
+        status=changes.get('status'),
+        priority=changes.get('priority'),
+        assigned_to_id=changes.get('assigned_to_id'),
+        max_cases=MAX_BULK_CASES
+    )
+    
+    if error:
+        return jsonify({"msg": error}), 400
+    
+    return jsonify({
+        "msg": "Cases updated successfully",
+        "updated": sum(1 for result in results if result['result'] == 'updated'),
+        "results": results
+    }), 200
+
 @case_bp.route('/admin/<int:case_id>', methods=['DELETE'])
 @role_required(Role.SUPER_ADMIN)
 def delete_case(case_id):
@@ -185,27 +353,64 @@ def get_statistics():
 @role_required(Role.CASE_MANAGER, Role.SUPER_ADMIN)
 def filter_cases():
     """Filter cases by multiple criteria."""
-    status = request.args.get('status')
-    category = request.args.get('category')
-    priority = request.args.get('priority')
-    assigned_to_id = request.args.get('assigned_to_id', type=int)
-    
-    cases = CaseService.filter_cases(
-        status=status,
-        category=category,
-        priority=priority,
-        assigned_to_id=assigned_to_id
-    )
-    
-    return jsonify([case_to_dict(case) for case in cases]), 200
+    return case_listing({
+        'status': request.args.get('status'),
+        'category': request.args.get('category'),
+        'priority': request.args.get('priority'),
+        'assigned_to_id': request.args.get('assigned_to_id', type=int),
+    })
 
 
 @case_bp.route('/admin/assigned/<int:user_id>', methods=['GET'])
 @role_required(Role.CASE_MANAGER, Role.SUPER_ADMIN)
 def get_assigned_cases(user_id):
     """Get cases assigned to a specific user."""
-    cases = CaseService.get_cases_by_assignee(user_id)
-    return jsonify([case_to_dict(case) for case in cases]), 200
+    return case_listing({'assigned_to_id': user_id})
+
+
+@case_bp.route('/admin/search', methods=['GET'])
+@role_required(Role.CASE_MANAGER, Role.SUPER_ADMIN)
+def search_cases():
+    """
+    Staff search for cases, best matches first.
+    
+    Query parameters:
+        q: partial reference (e.g. 2024-07), client name, or words from the
+           title or description; at least 3 characters (required)
+        status / category / priority / assigned_to_id: optional filters
+        fields: sparse fieldset, as for the case listings
+        limit / offset: pagination (default 20 results)
+    """
+    fields, error = requested_fields()
+    if error:
+        return error
+    
+    limit = min(max(request.args.get('limit', CASE_SEARCH_PAGE_SIZE, type=int), 1), MAX_CASE_SEARCH_PAGE_SIZE)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    rows, has_more, error = SearchService.search_cases(
+        get_current_user(),
+        request.args.get('q'),
+        filters={
+            'status': request.args.get('status'),
+            'category': request.args.get('category'),
+            'priority': request.args.get('priority'),
+            'assigned_to_id': request.args.get('assigned_to_id', type=int),
+        },
+        fields=fields,
+        limit=limit,
+        offset=offset
+    )
+    
+    if error:
+        return jsonify({"msg": error}), 400
+    
+    return jsonify({
+        "cases": [{**case_row_to_dict(row, fields=fields), "score": float(row.score or 0)} for row in rows],
+        "has_more": has_more,
+        "limit": limit,
+        "offset": offset
+    }), 200
 
 # --- Service/CMS Routes (Placeholder) ---
 
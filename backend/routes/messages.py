@@ -8,11 +8,23 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import Message, Case, User
 from extensions import db
 from datetime import datetime
-from utils.decorators import role_required
+from utils.decorators import role_required, get_current_user
+from utils.serializers import thread_message_to_dict
 from models.enums import Role
+from services.message_service import MessageService
+from services.unread_service import UnreadCounterService
+from services.activity_service import ActivityService
+from websockets.handlers import emit_unread_count
 
 messages_bp = Blueprint('messages', __name__)
 
+# Upper bound for client-supplied page sizes
+MAX_PAGE_SIZE = 500
+
+# Default and maximum page sizes for case message threads
+THREAD_PAGE_SIZE = 50
+MAX_THREAD_PAGE_SIZE = 200
+
 @messages_bp.route('/cases/<int:case_id>/messages', methods=['POST', 'OPTIONS'])
 def send_message(case_id):
     """Send a message to a client about a case"""
@@ -26,7 +38,7 @@ def send_message(case_id):
     
     current_user_id = get_jwt_identity()
     from models import User
-    user = User.query.get(current_user_id)
+    user = get_current_user()
     
     if not user or user.role not in [Role.CASE_MANAGER, Role.SUPER_ADMIN]:
         return jsonify({'error': 'Access denied'}), 403
@@ -65,7 +77,15 @@ def send_message(case_id):
         )
         
         db.session.add(message)
+        db.session.flush()
+        UnreadCounterService.message_created(message)
         db.session.commit()
+        ActivityService.record(
+            'message.sent', case_id=case_id, subject_type='message', subject_id=message.id,
+            recipient_id=recipient_id
+        )
+        
+        emit_unread_count(recipient_id)
         
         return jsonify({
             'message': 'Message sent successfully',
@@ -87,7 +107,15 @@ def send_message(case_id):
 
 @messages_bp.route('/cases/<int:case_id>/messages', methods=['GET', 'OPTIONS'])
 def get_case_messages(case_id):
-    """Get all messages for a case"""
+    """
+    Get a page of messages for a case, newest first.
+    
+    Query parameters:
+        before: message id; return messages older than it
+        after: message id; return messages newer than it
+        limit: page size (default 50, capped at 200)
+        include_total: true to also count every message in the case
+    """
     # Handle OPTIONS request for CORS preflight
     if request.method == 'OPTIONS':
         return jsonify({}), 200
@@ -105,50 +133,52 @@ def get_case_messages(case_id):
             return jsonify({'error': 'Case not found'}), 404
         
         # Get user to check permissions
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         # Check if user has access to this case
         has_access = (
             user.role in [Role.SUPER_ADMIN, Role.CASE_MANAGER] or
-            case.client_id == current_user_id or
-            case.assigned_to_id == current_user_id
+            case.client_id == user.id or
+            case.assigned_to_id == user.id
         )
         
         if not has_access:
             return jsonify({'error': 'Access denied'}), 403
         
-        # Get messages
-        messages = Message.query.filter_by(case_id=case_id).order_by(Message.created_at.desc()).all()
-        
-        messages_data = []
-        for msg in messages:
-            sender = User.query.get(msg.sender_id)
-            recipient = User.query.get(msg.recipient_id)
-            
-            messages_data.append({
-                'id': msg.id,
-                'case_id': msg.case_id,
-                'content': msg.content,
-                'read': msg.read,
-                'created_at': msg.created_at.isoformat() if msg.created_at else None,
-                'sender': {
-                    'id': sender.id,
-                    'name': sender.name,
-                    'email': sender.email
-                } if sender else None,
-                'recipient': {
-                    'id': recipient.id,
-                    'name': recipient.name,
-                    'email': recipient.email
-                } if recipient else None
-            })
+        before = request.args.get('before', type=int)
+        after = request.args.get('after', type=int)
+        limit = min(max(request.args.get('limit', THREAD_PAGE_SIZE, type=int), 1), MAX_THREAD_PAGE_SIZE)
         
-        return jsonify({
+        if before is not None and after is not None:
+            return jsonify({'error': 'Use either before or after, not both'}), 400
+        
+        # Get one page of messages with senders and recipients loaded in bulk
+        messages, has_more = MessageService.get_case_messages(
+            case_id,
+            before=before,
+            after=after,
+            limit=limit
+        )
+        messages_data = [thread_message_to_dict(msg) for msg in messages]
+        read_state = MessageService.get_read_state(case_id, user.id)
+        
+        response = {
             'messages': messages_data,
-            'total': len(messages_data)
-        }), 200
+            'count': len(messages_data),
+            'last_read_message_id': read_state.last_read_message_id if read_state else None,
+            'limit': limit,
+            'has_more': has_more,
+            # Pass as before= / after= to continue reading older or newer messages
+            'older_cursor': messages[-1].id if messages else before,
+            'newer_cursor': messages[0].id if messages else after
+        }
+        if request.args.get('include_total', 'false').lower() == 'true':
+            # Messages in the whole case; counting them grows with the thread
+            response['total'] = MessageService.count_case_messages(case_id)
+        
+        return jsonify(response), 200
         
     except Exception as e:
         print(f"Error fetching messages: {str(e)}")
@@ -173,11 +203,14 @@ def mark_message_read(message_id):
             return jsonify({'error': 'Message not found'}), 404
         
         # Only the recipient can mark a message as read
-        if message.recipient_id != current_user_id:
+        if message.recipient_id != int(current_user_id):
             return jsonify({'error': 'Access denied'}), 403
         
-        message.read = True
-        db.session.commit()
+        if not message.read:
+            message.read = True
+            UnreadCounterService.message_read(message)
+            db.session.commit()
+            emit_unread_count(message.recipient_id)
         
         return jsonify({'message': 'Message marked as read'}), 200
         
@@ -186,6 +219,64 @@ def mark_message_read(message_id):
         print(f"Error marking message as read: {str(e)}")
         return jsonify({'error': 'Failed to mark message as read'}), 500
 
+@messages_bp.route('/cases/<int:case_id>/messages/read', methods=['POST', 'OPTIONS'])
+def mark_case_messages_read(case_id):
+    """
+    Mark all of the current user's messages in a case as read up to a message.
+    
+    Body (optional):
+        up_to_message_id: last message to mark read; defaults to the newest
+    """
+    if request.method == 'OPTIONS':
+        return jsonify({}), 200
+    
+    from flask_jwt_extended import verify_jwt_in_request
+    verify_jwt_in_request()
+    
+    try:
+        current_user_id = int(get_jwt_identity())
+        data = request.get_json(silent=True) or {}
+        
+        case = Case.query.get(case_id)
+        if not case:
+            return jsonify({'error': 'Case not found'}), 404
+        
+        user = get_current_user()
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        has_access = (
+            user.role in [Role.SUPER_ADMIN, Role.CASE_MANAGER] or
+            case.client_id == user.id or
+            case.assigned_to_id == user.id
+        )
+        
+        if not has_access:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        marked, error = MessageService.mark_read_up_to(
+            case_id,
+            user.id,
+            message_id=data.get('up_to_message_id')
+        )
+        
+        if error:
+            return jsonify({'error': error}), 400
+        
+        if marked:
+            emit_unread_count(user.id)
+        
+        return jsonify({
+            'message': 'Messages marked as read',
+            'marked': marked,
+            'unread_count': MessageService.count_unread_after_watermark(case_id, user.id)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error marking case messages as read: {str(e)}")
+        return jsonify({'error': 'Failed to mark messages as read'}), 500
+
 @messages_bp.route('/messages/all', methods=['GET', 'OPTIONS'])
 def get_all_messages():
     """Get all messages in the system (Admin only)"""
@@ -197,7 +288,7 @@ def get_all_messages():
     
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         if not user or user.role != Role.SUPER_ADMIN:
             return jsonify({'error': 'Access denied. Admin only.'}), 403
@@ -205,52 +296,17 @@ def get_all_messages():
         # Get query parameters for filtering
         case_id = request.args.get('case_id', type=int)
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
-        limit = request.args.get('limit', 100, type=int)
-        offset = request.args.get('offset', 0, type=int)
-        
-        # Build query
-        query = Message.query
-        
-        if case_id:
-            query = query.filter_by(case_id=case_id)
-        
-        if unread_only:
-            query = query.filter_by(read=False)
-        
-        # Order by most recent first
-        query = query.order_by(Message.created_at.desc())
-        
-        # Apply pagination
-        total = query.count()
-        messages = query.limit(limit).offset(offset).all()
-        
-        messages_data = []
-        for msg in messages:
-            sender = User.query.get(msg.sender_id)
-            recipient = User.query.get(msg.recipient_id)
-            case = Case.query.get(msg.case_id)
-            
-            messages_data.append({
-                'id': msg.id,
-                'case_id': msg.case_id,
-                'case_title': case.title if case else None,
-                'case_reference': f'CASE-{str(msg.case_id).zfill(4)}',
-                'content': msg.content,
-                'read': msg.read,
-                'created_at': msg.created_at.isoformat() if msg.created_at else None,
-                'sender': {
-                    'id': sender.id,
-                    'name': sender.name,
-                    'email': sender.email,
-                    'role': sender.role.value if sender.role else None
-                } if sender else None,
-                'recipient': {
-                    'id': recipient.id,
-                    'name': recipient.name,
-                    'email': recipient.email,
-                    'role': recipient.role.value if recipient.role else None
-                } if recipient else None
-            })
+        limit = min(max(request.args.get('limit', 100, type=int), 1), MAX_PAGE_SIZE)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        # Participants and case titles are loaded in bulk for the whole page
+        messages, total = MessageService.get_all_messages(
+            case_id=case_id,
+            unread_only=unread_only,
+            limit=limit,
+            offset=offset
+        )
+        messages_data = [thread_message_to_dict(msg, include_case=True) for msg in messages]
         
         return jsonify({
             'messages': messages_data,
@@ -265,7 +321,13 @@ def get_all_messages():
 
 @messages_bp.route('/messages/unread-count', methods=['GET', 'OPTIONS'])
 def get_unread_count():
-    """Get count of unread messages for the current user"""
+    """
+    Get count of unread messages for the current user.
+    
+    Served from the materialized unread counters. Pass by_case=true to also
+    get the per-case breakdown. Clients connected over Socket.IO receive the
+    same payload as 'unread_count' events whenever it changes.
+    """
     if request.method == 'OPTIONS':
         return jsonify({}), 200
     
@@ -275,10 +337,14 @@ def get_unread_count():
     try:
         current_user_id = get_jwt_identity()
         
-        unread_count = Message.query.filter_by(
-            recipient_id=current_user_id,
-            read=False
-        ).count()
+        if request.args.get('by_case', 'false').lower() == 'true':
+            by_case = UnreadCounterService.get_by_case(current_user_id)
+            return jsonify({
+                'unread_count': sum(by_case.values()),
+                'by_case': {str(case_id): count for case_id, count in by_case.items()}
+            }), 200
+        
+        unread_count = UnreadCounterService.get_total(current_user_id)
         
         return jsonify({'unread_count': unread_count}), 200
         
@@ -288,7 +354,7 @@ def get_unread_count():
 
 @messages_bp.route('/messages/conversations', methods=['GET', 'OPTIONS'])
 def get_conversations():
-    """Get all conversations for the current user grouped by case"""
+    """Get a page of conversations for the current user grouped by case"""
     if request.method == 'OPTIONS':
         return jsonify({}), 200
     
@@ -297,67 +363,46 @@ def get_conversations():
     
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get all cases user is involved in
-        if user.role == Role.CLIENT:
-            cases = Case.query.filter_by(client_id=current_user_id).all()
-        elif user.role in [Role.CASE_MANAGER, Role.SUPER_ADMIN]:
-            # Managers and admins see all cases they're assigned to or all cases for admins
-            if user.role == Role.SUPER_ADMIN:
-                cases = Case.query.all()
-            else:
-                cases = Case.query.filter_by(assigned_to_id=current_user_id).all()
-        else:
-            cases = []
+        limit = min(max(request.args.get('limit', 100, type=int), 1), MAX_PAGE_SIZE)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        
+        # Last message, counts and other party come back from one aggregate query
+        rows, total = MessageService.get_conversations(user, limit=limit, offset=offset)
         
         conversations = []
-        for case in cases:
-            # Get messages for this case
-            messages = Message.query.filter_by(case_id=case.id).order_by(Message.created_at.desc()).all()
-            
-            if messages:
-                # Get unread count for this conversation
-                unread_count = sum(1 for m in messages if m.recipient_id == current_user_id and not m.read)
-                
-                # Get the other party in the conversation
-                last_message = messages[0]
-                if user.role == Role.CLIENT:
-                    other_user = User.query.get(case.assigned_to_id) if case.assigned_to_id else None
-                else:
-                    other_user = User.query.get(case.client_id)
-                
-                conversations.append({
-                    'case_id': case.id,
-                    'case_title': case.title,
-                    'case_reference': f'CASE-{str(case.id).zfill(4)}',
-                    'case_status': case.status.value if case.status else None,
-                    'unread_count': unread_count,
-                    'message_count': len(messages),
-                    'last_message': {
-                        'id': last_message.id,
-                        'content': last_message.content,
-                        'created_at': last_message.created_at.isoformat() if last_message.created_at else None,
-                        'sender_id': last_message.sender_id,
-                        'read': last_message.read
-                    },
-                    'other_party': {
-                        'id': other_user.id,
-                        'name': other_user.name,
-                        'email': other_user.email,
-                        'role': other_user.role.value if other_user.role else None
-                    } if other_user else None
-                })
-        
-        # Sort by last message time
-        conversations.sort(key=lambda x: x['last_message']['created_at'], reverse=True)
+        for row in rows:
+            conversations.append({
+                'case_id': row.case_id,
+                'case_title': row.case_title,
+                'case_reference': f'CASE-{str(row.case_id).zfill(4)}',
+                'case_status': row.case_status.value if row.case_status else None,
+                'unread_count': int(row.unread_count or 0),
+                'message_count': row.message_count,
+                'last_message': {
+                    'id': row.id,
+                    'content': row.content,
+                    'created_at': row.created_at.isoformat() if row.created_at else None,
+                    'sender_id': row.sender_id,
+                    'read': row.read
+                },
+                'other_party': {
+                    'id': row.other_id,
+                    'name': row.other_name,
+                    'email': row.other_email,
+                    'role': row.other_role.value if row.other_role else None
+                } if row.other_id else None
+            })
         
         return jsonify({
             'conversations': conversations,
-            'total': len(conversations)
+            'total': total,
+            'limit': limit,
+            'offset': offset
         }), 200
         
     except Exception as e:
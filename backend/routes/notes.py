@@ -46,7 +46,6 @@ def get_case_notes(case_id):
 
 
 @notes_bp.route('/', methods=['POST'])
-@jwt_required()
 @role_required(Role.CASE_MANAGER, Role.SUPER_ADMIN)
 def create_case_note(case_id):
     """Create a new case note (staff only)."""
@@ -79,7 +78,6 @@ def create_case_note(case_id):
 
 
 @notes_bp.route('/<int:note_id>', methods=['PUT'])
-@jwt_required()
 @role_required(Role.CASE_MANAGER, Role.SUPER_ADMIN)
 def update_case_note(case_id, note_id):
     """Update a case note."""
@@ -105,7 +103,6 @@ def update_case_note(case_id, note_id):
 
 
 @notes_bp.route('/<int:note_id>', methods=['DELETE'])
-@jwt_required()
 @role_required(Role.CASE_MANAGER, Role.SUPER_ADMIN)
 def delete_case_note(case_id, note_id):
     """Delete a case note."""
@@ -0,0 +1,54 @@
+"""
+Search routes for case correspondence.
+"""
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from services.search_service import SearchService
+from utils import get_current_user
+
+search_bp = Blueprint('search', __name__, url_prefix='/search')
+
+# Upper bound for client-supplied page sizes
+MAX_PAGE_SIZE = 100
+
+
+@search_bp.route('', methods=['GET'])
+@jwt_required()
+def search_correspondence():
+    """
+    Full-text search over case messages and notes the user can see.
+    
+    Query parameters:
+        q: search text (required)
+        type: 'message', 'note' or 'all' (default)
+        case_id: restrict to one case
+        limit / offset: pagination (default 20 results)
+    """
+    current_user = get_current_user()
+    if not current_user:
+        return jsonify({"msg": "User not found"}), 404
+    
+    kind = request.args.get('type', 'all')
+    if kind not in ('message', 'note', 'all'):
+        return jsonify({"msg": "Invalid type, use message, note or all"}), 400
+    
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_PAGE_SIZE)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    
+    results, error = SearchService.search(
+        current_user,
+        request.args.get('q'),
+        kinds=('message', 'note') if kind == 'all' else (kind,),
+        case_id=request.args.get('case_id', type=int),
+        limit=limit,
+        offset=offset
+    )
+    
+    if error:
+        return jsonify({"msg": error}), 400
+    
+    return jsonify({
+        "results": results,
+        "limit": limit,
+        "offset": offset
+    }), 200
@@ -4,5 +4,11 @@ Services package initialization.
 from .auth_service import AuthService
 from .case_service import CaseService
 from .note_service import CaseNoteService
+from .message_service import MessageService
+from .unread_service import UnreadCounterService
+from .statistics_service import StatisticsService
+from .activity_service import ActivityService
+from .user_service import UserService
+from .user_import_service import UserImportService
 
-__all__ = ['AuthService', 'CaseService', 'CaseNoteService']
+__all__ = ['AuthService', 'CaseService', 'CaseNoteService', 'MessageService', 'UnreadCounterService', 'StatisticsService', 'ActivityService', 'UserService', 'UserImportService']
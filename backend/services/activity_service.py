@@ -0,0 +1,275 @@
+"""
+Activity log service.
+
+Events are queued in memory and written in batches by a background task,
+so recording one costs a request an append to a list. The log is read
+newest first with keyset pagination, and events past the retention period
+are rolled up into per-day counts and deleted.
+"""
+import atexit
+import threading
+import time
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+
+from flask import has_app_context, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from extensions import db, socketio
+from models import ActivityEvent, ActivityDailyCount, User
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+class ActivityBuffer:
+    """Queues activity events and writes them in multi-row INSERTs."""
+
+    def __init__(self, interval=2.0, batch_size=500, max_pending=10000):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.retention_days = None
+        self.prune_interval = None
+        self.app = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._last_prune = time.monotonic()
+        self.metrics = {
+            'events_recorded': 0,
+            'events_written': 0,
+            'events_dropped': 0,
+            'batches_written': 0,
+        }
+        atexit.register(self.flush)
+
+    def init_app(self, app):
+        """Take the flush and retention settings from the app config."""
+        self.app = app
+        self.interval = app.config['ACTIVITY_FLUSH_INTERVAL']
+        self.batch_size = app.config['ACTIVITY_BATCH_SIZE']
+        self.retention_days = app.config['ACTIVITY_RETENTION_DAYS']
+        self.prune_interval = app.config['ACTIVITY_PRUNE_INTERVAL']
+
+    def add(self, event):
+        """
+        Queue an event for the next flush.
+
+        When the queue is full (the database is down or far behind) the
+        event is dropped and counted rather than growing without bound.
+        """
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.metrics['events_dropped'] += 1
+                return
+            self._pending.append(event)
+            self.metrics['events_recorded'] += 1
+
+            schedule = not self._scheduled and self.interval > 0
+            self._scheduled = self._scheduled or schedule
+
+        if schedule:
+            socketio.start_background_task(self._flush_later)
+
+    def _flush_later(self):
+        socketio.sleep(self.interval)
+        self.flush()
+        if self.prune_interval and time.monotonic() - self._last_prune >= self.prune_interval:
+            self._last_prune = time.monotonic()
+            with self._app_context():
+                ActivityService.prune(self.retention_days)
+
+    def _app_context(self):
+        if has_app_context() or self.app is None:
+            return nullcontext()
+        return self.app.app_context()
+
+    def flush(self):
+        """
+        Write everything queued so far; returns the number of events written.
+
+        Uses its own connection, never the caller's session, so a flush
+        cannot commit or roll back anyone else's work.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._scheduled = False
+        if not pending:
+            return 0
+
+        if self.app is None and not has_app_context():
+            self.metrics['events_dropped'] += len(pending)
+            return 0
+
+        try:
+            with self._app_context(), db.engine.begin() as connection:
+                for start in range(0, len(pending), self.batch_size):
+                    connection.execute(insert(ActivityEvent), pending[start:start + self.batch_size])
+                    self.metrics['batches_written'] += 1
+        except Exception as e:
+            print(f"[ERROR] Failed to write {len(pending)} activity events: {str(e)}")
+            self.metrics['events_dropped'] += len(pending)
+            return 0
+
+        self.metrics['events_written'] += len(pending)
+        return len(pending)
+
+    def discard(self):
+        """Drop queued events without writing them."""
+        with self._lock:
+            self._pending = []
+            self._scheduled = False
+
+    def get_metrics(self):
+        """Counters since startup."""
+        with self._lock:
+            return {
+                **self.metrics,
+                'pending': len(self._pending),
+                'flush_interval_seconds': self.interval,
+            }
+
+
+activity_log = ActivityBuffer()
+
+
+class ActivityService:
+    """Service class for the activity log."""
+
+    @staticmethod
+    def _current_actor():
+        """The authenticated user of the current HTTP request, if any."""
+        if not has_request_context():
+            return None
+        try:
+            identity = get_jwt_identity()
+        except Exception:
+            return None
+        return int(identity) if identity is not None else None
+
+    @staticmethod
+    def record(action, case_id=None, subject_type=None, subject_id=None, actor_id=None, **details):
+        """
+        Record an event, e.g. ``record('case.updated', case_id=3, status='CLOSED')``.
+
+        Call it after the change is committed. The actor defaults to the
+        user of the current request; socket handlers pass it explicitly.
+        """
+        activity_log.add({
+            'occurred_at': datetime.utcnow(),
+            'actor_id': actor_id if actor_id is not None else ActivityService._current_actor(),
+            'case_id': case_id,
+            'action': action,
+            'subject_type': subject_type,
+            'subject_id': subject_id,
+            'details': details or None,
+        })
+
+    @staticmethod
+    def list_events(actor_id=None, case_id=None, action=None, since=None, until=None, cursor=None, limit=50):
+        """
+        Get one page of events, newest first, with the actor's name.
+
+        ``cursor`` is the id of the last event of the previous page.
+        Returns (rows, has_more).
+        """
+        query = (
+            select(ActivityEvent, User.name.label('actor_name'))
+            .outerjoin(User, User.id == ActivityEvent.actor_id)
+        )
+        if actor_id is not None:
+            query = query.where(ActivityEvent.actor_id == actor_id)
+        if case_id is not None:
+            query = query.where(ActivityEvent.case_id == case_id)
+        if action:
+            query = query.where(ActivityEvent.action == action)
+        if since:
+            query = query.where(ActivityEvent.occurred_at >= since)
+        if until:
+            query = query.where(ActivityEvent.occurred_at < until)
+        if cursor:
+            query = query.where(ActivityEvent.id < cursor)
+
+        rows = db.session.execute(
+            query.order_by(ActivityEvent.id.desc()).limit(limit + 1)
+        ).all()
+        return rows[:limit], len(rows) > limit
+
+    @staticmethod
+    def _add_daily_counts(counts):
+        """Add (day, action, count) rows to the rollup table."""
+        dialect = db.session.get_bind().dialect.name
+        rows = [
+            {'day': date.fromisoformat(str(day)[:10]), 'action': action, 'count': count}
+            for day, action, count in counts
+        ]
+        if not rows:
+            return
+
+        if dialect not in ('postgresql', 'sqlite'):
+            # Generic fallback for other backends
+            for row in rows:
+                rollup = db.session.get(ActivityDailyCount, (row['day'], row['action']))
+                if rollup is None:
+                    db.session.add(ActivityDailyCount(**row))
+                else:
+                    rollup.count += row['count']
+            return
+
+        upsert = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(ActivityDailyCount)
+        db.session.execute(
+            upsert.values(rows).on_conflict_do_update(
+                index_elements=[ActivityDailyCount.day, ActivityDailyCount.action],
+                set_={'count': ActivityDailyCount.count + upsert.excluded['count']}
+            )
+        )
+
+    @staticmethod
+    def prune(retention_days, batch_size=5000):
+        """
+        Roll up and delete events older than ``retention_days``.
+
+        Works through the oldest events a batch at a time, each in its own
+        short transaction, so pruning a large backlog never holds long
+        locks. Returns (events deleted, error).
+        """
+        if not retention_days:
+            return 0, None
+
+        cutoff = datetime.utcnow() - timedelta(days=retention_days)
+        deleted = 0
+        try:
+            while True:
+                # The oldest events have the lowest ids: everything expired
+                # up to the batch's last id is exactly the batch
+                oldest = (
+                    select(ActivityEvent.id)
+                    .where(ActivityEvent.occurred_at < cutoff)
+                    .order_by(ActivityEvent.id)
+                    .limit(batch_size)
+                    .subquery()
+                )
+                last_id = db.session.execute(select(func.max(oldest.c.id))).scalar_one_or_none()
+                if last_id is None:
+                    break
+
+                batch = (ActivityEvent.occurred_at < cutoff, ActivityEvent.id <= last_id)
+                day = func.date(ActivityEvent.occurred_at)
+                ActivityService._add_daily_counts(db.session.execute(
+                    select(day, ActivityEvent.action, func.count())
+                    .where(*batch)
+                    .group_by(day, ActivityEvent.action)
+                ).all())
+                deleted += db.session.execute(delete(ActivityEvent).where(*batch)).rowcount
+                db.session.commit()
+            return deleted, None
+        except Exception as e:
+            db.session.rollback()
+            return deleted, str(e)
+
+    @staticmethod
+    def get_daily_counts(since=None):
+        """Rolled-up counts for days whose events have been pruned."""
+        query = select(ActivityDailyCount).order_by(ActivityDailyCount.day, ActivityDailyCount.action)
+        if since:
+            query = query.where(ActivityDailyCount.day >= since)
+        return db.session.execute(query).scalars().all()
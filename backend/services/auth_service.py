@@ -1,9 +1,20 @@
 """
 Authentication service for user management.
 """
-from extensions import db, bcrypt
+from datetime import datetime, timedelta
+from flask import current_app
+from extensions import db
 from models import User, Role
 from flask_jwt_extended import create_access_token
+from sqlalchemy import select
+from utils.cache import TTLCache
+from utils.decorators import load_token_user
+from utils.passwords import passwords
+from services.revocation_service import token_blocklist
+
+# Current token version per user id (-1 once the user is deleted), used
+# when role checks trust token claims; app.py sets the TTL from the config
+token_versions = TTLCache(ttl=30, maxsize=10000)
 
 
 class AuthService:
@@ -21,7 +32,8 @@ class AuthService:
             return None, "User already exists"
         
         # Hash password
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        # Hashed off the event loop; see utils.passwords
+        hashed_password = passwords.hash(password)
         
         # Create new user
         new_user = User(
@@ -47,13 +59,18 @@ class AuthService:
         if not user:
             return None, "Invalid credentials"
         
-        if not bcrypt.check_password_hash(user.password_hash, password):
+        if not passwords.check(user.password_hash, password):
             return None, "Invalid credentials"
         
+        # Checked after the password so the response does not reveal which
+        # accounts exist
+        if not user.is_active:
+            return None, "Account is deactivated"
+        
         # Create access token (identity must be a string)
         access_token = create_access_token(
             identity=str(user.id),
-            additional_claims={"role": user.role.value}
+            additional_claims={"role": user.role.value, "ver": user.token_version}
         )
         
         return {
@@ -63,6 +80,61 @@ class AuthService:
             "user_name": user.name
         }, None
     
+    @staticmethod
+    def token_version(user_id):
+        """A user's current token version, cached for a few seconds."""
+        version = token_versions.get(user_id)
+        if version is None:
+            version = db.session.execute(
+                select(User.token_version).where(User.id == user_id)
+            ).scalar_one_or_none()
+            version = -1 if version is None else version
+            token_versions.set(user_id, version)
+        return version
+
+    @staticmethod
+    def is_token_current(claims):
+        """
+        Check a decoded access token against its user's token version.
+
+        When role claims are trusted only the (cached) version is read;
+        otherwise the request's user is loaded here, once, and reused by
+        role_required and get_current_user. Tokens of deleted users and
+        tokens issued before a revoke_tokens call fail the check.
+        """
+        if current_app.config['JWT_TRUST_ROLE_CLAIM']:
+            version = AuthService.token_version(int(claims['sub']))
+        else:
+            user = load_token_user(claims)
+            version = user.token_version if user else -1
+        return claims.get('ver', 0) == version
+
+    @staticmethod
+    def revoke_tokens(user):
+        """
+        Invalidate every token issued to a user so far.
+
+        Called when a user's role or password changes or the account is
+        deactivated; the user has to log in again to get a new token.
+        """
+        user.token_version = (user.token_version or 0) + 1
+        db.session.commit()
+        token_versions.delete(user.id)
+
+    @staticmethod
+    def revoke_token(claims):
+        """Revoke one access token, e.g. on logout; the user's other tokens keep working."""
+        if claims.get('exp'):
+            expires_at = datetime.utcfromtimestamp(claims['exp'])
+        else:
+            expires_at = datetime.utcnow() + current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+        token_blocklist.revoke(claims['jti'], int(claims['sub']), expires_at)
+
+    @staticmethod
+    def forget_token_version(user_id):
+        """Drop a user's cached token version, e.g. after deleting the user."""
+        token_versions.delete(user_id)
+
     @staticmethod
     def get_user_by_id(user_id):
         """Get a user by ID."""
@@ -1,10 +1,36 @@
 """
 Case management service for case operations.
 """
+import copy
+from datetime import datetime
+
 from extensions import db
 from models import Case, User, Role, CaseStatus, CaseCategory, Priority
-from sqlalchemy import select
+from sqlalchemy import select, update, func, literal, tuple_, case as sql_case
+from sqlalchemy.orm import aliased, selectinload
+from services.statistics_service import StatisticsService
+from services.activity_service import ActivityService
+from utils.cache import TTLCache
 from utils.helpers import generate_case_id
+from utils.conditional import tables_version
+
+# Dashboard statistics per (role, user); cleared on every case change and
+# expired after a short TTL so other workers catch up too
+_statistics_cache = TTLCache(ttl=30)
+
+# Fields available to row-based case listings (see case_row_to_dict)
+CASE_ROW_FIELDS = (
+    'case_id', 'title', 'description', 'category', 'status', 'priority',
+    'client_id', 'client', 'assigned_to_id', 'assigned_to',
+    'created_at', 'updated_at', 'closed_at',
+)
+
+# Case listings can only be sorted on indexed columns
+SORT_COLUMNS = {
+    'created_at': Case.created_at,
+    'case_id': Case.case_id,
+    'id': Case.id,
+}
 
 
 class CaseService:
@@ -38,18 +64,34 @@ class CaseService:
             
             db.session.add(new_case)
             db.session.commit()
+            CaseService.invalidate_statistics()
+            ActivityService.record(
+                'case.created', case_id=new_case.id, subject_type='case', subject_id=new_case.id,
+                reference=new_case.case_id, title=new_case.title
+            )
             
             return new_case, None
         except Exception as e:
             db.session.rollback()
             return None, str(e)
     
+    @staticmethod
+    def party_options():
+        """
+        Loader options that fetch case clients and assignees in bulk.
+        
+        Each relationship costs one extra SELECT for the whole list instead
+        of one per case when case_to_dict touches it.
+        """
+        return [selectinload(Case.client), selectinload(Case.assigned_to)]
+    
     @staticmethod
     def get_cases_by_client(client_id):
         """Get all cases for a specific client."""
         cases = db.session.execute(
             select(Case)
             .filter_by(client_id=client_id)
+            .options(*CaseService.party_options())
             .order_by(Case.created_at.desc())
         ).scalars().all()
         return cases
@@ -58,7 +100,9 @@ class CaseService:
     def get_all_cases():
         """Get all cases (admin view)."""
         cases = db.session.execute(
-            select(Case).order_by(Case.created_at.desc())
+            select(Case)
+            .options(*CaseService.party_options())
+            .order_by(Case.created_at.desc())
         ).scalars().all()
         return cases
     
@@ -93,10 +137,15 @@ class CaseService:
         if not case:
             return None, "Case not found"
         
+        previous_assignee = case.assigned_to_id
         try:
             if status:
                 if isinstance(status, str):
                     status = CaseStatus[status.upper()]
+                if status == CaseStatus.CLOSED and case.status != CaseStatus.CLOSED:
+                    case.closed_at = datetime.utcnow()
+                elif status != CaseStatus.CLOSED:
+                    case.closed_at = None
                 case.status = status
             
             if priority:
@@ -116,11 +165,163 @@ class CaseService:
                     return None, "Invalid user for assignment"
             
             db.session.commit()
+            CaseService.invalidate_statistics()
+            
+            changes = {}
+            if status:
+                changes['status'] = case.status.value
+            if priority:
+                changes['priority'] = case.priority.value
+            if changes:
+                ActivityService.record('case.updated', case_id=case.id, subject_type='case', subject_id=case.id, **changes)
+            if case.assigned_to_id != previous_assignee:
+                ActivityService.record(
+                    'case.assigned', case_id=case.id, subject_type='case', subject_id=case.id,
+                    assigned_to_id=case.assigned_to_id, previous_assigned_to_id=previous_assignee
+                )
+            
+            # Imported here to avoid a circular import with the socket handlers
+            from websockets.handlers import emit_case_status_update
+            emit_case_status_update(
+                case.id,
+                case.status.value,
+                priority=case.priority.value,
+                assigned_to_id=case.assigned_to_id
+            )
             return case, None
         except Exception as e:
             db.session.rollback()
             return None, str(e)
     
+    @staticmethod
+    def bulk_update_cases(case_ids=None, filters=None, status=None, priority=None, assigned_to_id=None,
+                          max_cases=None):
+        """
+        Apply the same changes to many cases at once.
+        
+        Targets are either explicit case ids or listing filters. The
+        assignee is validated once and the changes are applied with one
+        set-based UPDATE in a single transaction; case rooms then get one
+        coalesced case_update frame. A filter matching more than
+        ``max_cases`` cases is refused before anything is changed.
+        
+        Returns:
+            (results, error) where results is a list of
+            {"id": ..., "result": "updated" | "not_found"} in request order.
+        """
+        if not case_ids and not filters:
+            return None, "Provide case_ids or a filter"
+        
+        values = {}
+        try:
+            if status:
+                if isinstance(status, str):
+                    status = CaseStatus[status.upper()]
+                values['status'] = status
+                if status == CaseStatus.CLOSED:
+                    # Keep the original closing time of cases already closed
+                    values['closed_at'] = sql_case(
+                        (Case.status == CaseStatus.CLOSED, Case.closed_at),
+                        else_=datetime.utcnow()
+                    )
+                else:
+                    values['closed_at'] = None
+            
+            if priority:
+                if isinstance(priority, str):
+                    priority = Priority[priority.upper()]
+                values['priority'] = priority
+            
+            target = CaseService._filter_conditions(**(filters or {}))
+        except KeyError as e:
+            return None, f"Invalid value: {e.args[0]}"
+        
+        if assigned_to_id is not None:
+            # Validate that assigned user is staff, once for the whole batch
+            assignee_role = db.session.execute(
+                select(User.role).filter_by(id=assigned_to_id)
+            ).scalar_one_or_none()
+            if assignee_role not in [Role.CASE_MANAGER, Role.SUPER_ADMIN]:
+                return None, "Invalid user for assignment"
+            values['assigned_to_id'] = assigned_to_id
+        
+        if not values:
+            return None, "No changes to apply"
+        
+        if case_ids:
+            target.append(Case.id.in_(case_ids))
+        if not target:
+            # Never run an UPDATE without a WHERE clause
+            return None, "The filter does not select any cases"
+        
+        if not case_ids and max_cases is not None:
+            matching = db.session.execute(
+                select(func.count()).select_from(Case).where(*target)
+            ).scalar_one()
+            if matching > max_cases:
+                return None, f"The filter matches {matching} cases; at most {max_cases} per request"
+        
+        try:
+            previous_assignees = {}
+            if assigned_to_id is not None:
+                # Read (and lock) the current assignees so only real changes are
+                # logged as case.assigned; the UPDATE then covers exactly these cases
+                previous_assignees = dict(db.session.execute(
+                    select(Case.id, Case.assigned_to_id).where(*target).with_for_update()
+                ).all())
+                target = [Case.id.in_(previous_assignees)]
+            
+            updated = db.session.execute(
+                update(Case)
+                .where(*target)
+                .values(**values)
+                .returning(Case.id, Case.status, Case.priority, Case.assigned_to_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.session.commit()
+        except Exception:
+            # Database errors propagate; only invalid input is returned as an error
+            db.session.rollback()
+            raise
+        
+        CaseService.invalidate_statistics()
+        
+        # The same events update_case records for each case
+        for row in updated:
+            changes = {}
+            if status:
+                changes['status'] = row.status.value
+            if priority:
+                changes['priority'] = row.priority.value
+            if changes:
+                ActivityService.record('case.updated', case_id=row.id, subject_type='case', subject_id=row.id,
+                                       bulk=True, **changes)
+            if assigned_to_id is not None and row.assigned_to_id != previous_assignees.get(row.id):
+                ActivityService.record(
+                    'case.assigned', case_id=row.id, subject_type='case', subject_id=row.id, bulk=True,
+                    assigned_to_id=row.assigned_to_id, previous_assigned_to_id=previous_assignees.get(row.id)
+                )
+        
+        # Imported here to avoid a circular import with the socket handlers
+        from websockets.handlers import emit_case_status_update
+        for row in updated:
+            emit_case_status_update(
+                row.id,
+                row.status.value,
+                priority=row.priority.value,
+                assigned_to_id=row.assigned_to_id
+            )
+        
+        updated_ids = {row.id for row in updated}
+        if case_ids:
+            results = [
+                {"id": case_id, "result": "updated" if case_id in updated_ids else "not_found"}
+                for case_id in case_ids
+            ]
+        else:
+            results = [{"id": case_id, "result": "updated"} for case_id in sorted(updated_ids)]
+        return results, None
+    
     @staticmethod
     def get_cases_by_status(status):
         """Get cases filtered by status."""
@@ -130,6 +331,7 @@ class CaseService:
         cases = db.session.execute(
             select(Case)
             .filter_by(status=status)
+            .options(*CaseService.party_options())
             .order_by(Case.created_at.desc())
         ).scalars().all()
         return cases
@@ -140,6 +342,7 @@ class CaseService:
         cases = db.session.execute(
             select(Case)
             .filter_by(assigned_to_id=assignee_id)
+            .options(*CaseService.party_options())
             .order_by(Case.created_at.desc())
         ).scalars().all()
         return cases
@@ -170,57 +373,186 @@ class CaseService:
         if client_id:
             query = query.filter_by(client_id=client_id)
         
-        query = query.order_by(Case.created_at.desc())
+        query = query.options(*CaseService.party_options()).order_by(Case.created_at.desc())
         cases = db.session.execute(query).scalars().all()
         return cases
     
+    @staticmethod
+    def _filter_conditions(status=None, category=None, priority=None, assigned_to_id=None, client_id=None):
+        """
+        Build WHERE conditions for case listings.
+        
+        Raises KeyError for an unknown status, category or priority name.
+        """
+        conditions = []
+        if status:
+            if isinstance(status, str):
+                status = CaseStatus[status.upper()]
+            conditions.append(Case.status == status)
+        if category:
+            if isinstance(category, str):
+                category = CaseCategory[category.upper()]
+            conditions.append(Case.category == category)
+        if priority:
+            if isinstance(priority, str):
+                priority = Priority[priority.upper()]
+            conditions.append(Case.priority == priority)
+        if assigned_to_id is not None:
+            conditions.append(Case.assigned_to_id == assigned_to_id)
+        if client_id:
+            conditions.append(Case.client_id == client_id)
+        return conditions
+    
+    @staticmethod
+    def _listing_query(query, filters, sort, descending, cursor):
+        """Apply listing filters, the keyset cursor and the sort order to a query."""
+        sort_column = SORT_COLUMNS[sort]
+        query = query.where(*CaseService._filter_conditions(**(filters or {})))
+        
+        if cursor is not None:
+            if sort_column is Case.id:
+                position, anchor = Case.id, literal(cursor)
+            else:
+                anchor_case = aliased(Case)
+                position = tuple_(sort_column, Case.id)
+                anchor = tuple_(
+                    select(getattr(anchor_case, sort)).where(anchor_case.id == cursor).scalar_subquery(),
+                    literal(cursor)
+                )
+            query = query.where(position < anchor if descending else position > anchor)
+        
+        if descending:
+            return query.order_by(sort_column.desc(), Case.id.desc())
+        return query.order_by(sort_column.asc(), Case.id.asc())
+    
+    @staticmethod
+    def _page(query, limit):
+        items = db.session.execute(query if limit is None else query.limit(limit + 1)).all()
+        if limit is None:
+            return items, False
+        # One extra row was fetched to learn whether another page exists
+        return items[:limit], len(items) > limit
+    
+    @staticmethod
+    def _row_columns(fields=None):
+        """Labelled columns for the requested case fields, for case_row_to_dict."""
+        client = aliased(User)
+        assignee = aliased(User)
+        wanted = CASE_ROW_FIELDS if fields is None else [name for name in CASE_ROW_FIELDS if name in fields]
+        
+        columns = {'id': Case.id}
+        joins = []
+        for name in wanted:
+            if name == 'client':
+                columns['client_id'] = Case.client_id
+                columns['client_name'] = client.name
+                columns['client_email'] = client.email
+                joins.append((client, client.id == Case.client_id))
+            elif name == 'assigned_to':
+                columns['assigned_to_id'] = Case.assigned_to_id
+                columns['assigned_to_name'] = assignee.name
+                columns['assigned_to_email'] = assignee.email
+                joins.append((assignee, assignee.id == Case.assigned_to_id))
+            else:
+                columns[name] = getattr(Case, name)
+        
+        query = select(*(column.label(label) for label, column in columns.items())).select_from(Case)
+        for target, condition in joins:
+            query = query.outerjoin(target, condition)
+        return query
+    
+    @staticmethod
+    def list_case_rows(filters=None, sort='created_at', descending=True, limit=50, cursor=None, fields=None):
+        """
+        Get one page of cases as column tuples instead of ORM objects.
+        
+        Pages are keyed on (sort column, id): ``cursor`` is the id of the
+        last case of the previous page. Only the indexed columns in
+        SORT_COLUMNS can be sorted on, and ``fields`` limits the columns
+        selected to those a sparse fieldset serializes. The client and
+        assignee come from joins in the same statement and no identity map
+        entries are built. ``limit=None`` returns every matching case.
+        Serialize the rows with case_row_to_dict.
+        
+        Returns:
+            (rows, has_more)
+        """
+        query = CaseService._listing_query(CaseService._row_columns(fields), filters, sort, descending, cursor)
+        return CaseService._page(query, limit)
+    
+    @staticmethod
+    def case_list_version(filters=None):
+        """
+        Get (newest updated_at, count, version) for the cases matching a listing's filters.
+
+        ``version`` is the change counter of cases and users (the listed
+        parties' names). This is the validator for conditional GETs, so it
+        is never cached: another worker may have changed a case since.
+        """
+        filters = {key: value for key, value in (filters or {}).items() if value is not None}
+        row = db.session.execute(
+            select(func.max(Case.updated_at), func.count(), tables_version('cases', 'users'))
+            .select_from(Case)
+            .where(*CaseService._filter_conditions(**filters))
+        ).one()
+        return row[0], row[1], row[2]
+
     @staticmethod
     def get_case_statistics(user_id=None, role=None):
-        """Get case statistics for dashboard."""
+        """
+        Get case statistics for dashboard.
+        
+        Counts come from one GROUP BY (status, priority) query and are
+        cached per (role, user) until a case is created or updated.
+        """
+        cache_key = (role, user_id)
+        stats = _statistics_cache.get(cache_key)
+        if stats is not None:
+            return copy.deepcopy(stats), None
+        
         try:
-            stats = {}
+            query = select(Case.status, Case.priority, func.count(Case.id).label('count'))
             
-            # Base query filter conditions
+            # Client sees only their cases, staff sees all cases
             if user_id and role == Role.CLIENT:
-                # Client sees only their cases
-                base_filter = Case.client_id == user_id
-            else:
-                # Staff sees all cases
-                base_filter = True
-            
-            # Count by status
-            for status in CaseStatus:
-                count = db.session.execute(
-                    select(Case).filter(base_filter, Case.status == status)
-                ).scalars().all()
-                stats[status.value.lower()] = len(count)
-            
-            # Count by priority
-            priority_counts = {}
-            for priority in Priority:
-                count = db.session.execute(
-                    select(Case).filter(base_filter, Case.priority == priority)
-                ).scalars().all()
-                priority_counts[priority.value.lower()] = len(count)
-            stats['by_priority'] = priority_counts
+                query = query.filter(Case.client_id == user_id)
             
-            # Total count
-            total = db.session.execute(
-                select(Case).filter(base_filter)
-            ).scalars().all()
-            stats['total'] = len(total)
+            # My cases (for staff) counted in the same pass
+            is_staff = user_id and role in [Role.CASE_MANAGER, Role.SUPER_ADMIN]
+            if is_staff:
+                query = query.add_columns(
+                    func.sum(sql_case((Case.assigned_to_id == user_id, 1), else_=0)).label('mine')
+                )
             
-            # My cases (for staff)
-            if user_id and role in [Role.CASE_MANAGER, Role.SUPER_ADMIN]:
-                my_cases = db.session.execute(
-                    select(Case).filter_by(assigned_to_id=user_id)
-                ).scalars().all()
-                stats['my_cases'] = len(my_cases)
+            rows = db.session.execute(query.group_by(Case.status, Case.priority)).all()
             
-            return stats, None
+            stats = {status.value.lower(): 0 for status in CaseStatus}
+            priority_counts = {priority.value.lower(): 0 for priority in Priority}
+            total = 0
+            my_cases = 0
+            for row in rows:
+                stats[row.status.value.lower()] += row.count
+                priority_counts[row.priority.value.lower()] += row.count
+                total += row.count
+                if is_staff:
+                    my_cases += row.mine or 0
+            
+            stats['by_priority'] = priority_counts
+            stats['total'] = total
+            if is_staff:
+                stats['my_cases'] = my_cases
+            
+            _statistics_cache.set(cache_key, stats)
+            return copy.deepcopy(stats), None
         except Exception as e:
             return None, str(e)
     
+    @staticmethod
+    def invalidate_statistics():
+        """Drop cached dashboard statistics after cases change."""
+        _statistics_cache.clear()
+        StatisticsService.invalidate()
+    
     @staticmethod
     def delete_case(case_id):
         """Delete a case (soft delete - mark as closed)."""
@@ -232,8 +564,12 @@ class CaseService:
             return False, "Case not found"
         
         try:
+            if case.status != CaseStatus.CLOSED:
+                case.closed_at = datetime.utcnow()
             case.status = CaseStatus.CLOSED
             db.session.commit()
+            CaseService.invalidate_statistics()
+            ActivityService.record('case.deleted', case_id=case.id, subject_type='case', subject_id=case.id)
             return True, None
         except Exception as e:
             db.session.rollback()
@@ -0,0 +1,305 @@
+"""
+Message service for case correspondence.
+"""
+from extensions import db
+from models import Message, Case, User, Role, MessageReadState
+from services.unread_service import UnreadCounterService
+from sqlalchemy import select, update, func, and_, true, tuple_, literal, case as sql_case
+from sqlalchemy.orm import aliased, selectinload
+
+
+class MessageService:
+    """Service class for case messaging operations."""
+
+    @staticmethod
+    def case_scope(user):
+        """
+        Build the filter selecting the cases a user takes part in.
+
+        Returns None when the user's role has no conversations at all.
+        """
+        if user.role == Role.SUPER_ADMIN:
+            return true()
+        if user.role == Role.CASE_MANAGER:
+            return Case.assigned_to_id == user.id
+        if user.role == Role.CLIENT:
+            return Case.client_id == user.id
+        return None
+
+    @staticmethod
+    def participant_options(include_case=False):
+        """
+        Loader options that fetch message senders and recipients in bulk.
+
+        Each relationship costs one extra SELECT for the whole page instead of
+        one per message.
+        """
+        options = [selectinload(Message.sender), selectinload(Message.recipient)]
+        if include_case:
+            options.append(selectinload(Message.case).load_only(Case.id, Case.title))
+        return options
+
+    @staticmethod
+    def _thread_position(message_id):
+        """Row value (created_at, id) of a message, used as a keyset cursor."""
+        anchor = aliased(Message)
+        created_at = select(anchor.created_at).where(anchor.id == message_id).scalar_subquery()
+        return tuple_(created_at, literal(message_id))
+
+    @staticmethod
+    def get_case_messages(case_id, before=None, after=None, limit=50):
+        """
+        Get one page of a case thread, newest first, with participants loaded.
+
+        Pages are keyed on (created_at, id): ``before`` returns the messages
+        older than the given message id and ``after`` the ones newer than it.
+        Each page is a bounded range scan on ix_messages_case_id_created_at,
+        so the cost does not depend on the length of the thread.
+
+        Returns:
+            (messages, has_more) where has_more tells whether more messages
+            exist beyond the page in the direction being read.
+        """
+        position = tuple_(Message.created_at, Message.id)
+        query = (
+            select(Message)
+            .filter_by(case_id=case_id)
+            .options(*MessageService.participant_options())
+        )
+
+        if after is not None:
+            query = query.where(position > MessageService._thread_position(after))
+            query = query.order_by(Message.created_at.asc(), Message.id.asc())
+        else:
+            if before is not None:
+                query = query.where(position < MessageService._thread_position(before))
+            query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+        # Fetch one extra row to learn whether another page exists
+        messages = db.session.execute(query.limit(limit + 1)).scalars().all()
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+
+        if after is not None:
+            messages.reverse()
+
+        return messages, has_more
+
+    @staticmethod
+    def count_case_messages(case_id):
+        """
+        Count every message in a case thread.
+
+        Unlike a page this grows with the thread, so the thread endpoint
+        only runs it when asked to (include_total).
+        """
+        return db.session.execute(
+            select(func.count()).select_from(Message).where(Message.case_id == case_id)
+        ).scalar_one()
+
+    @staticmethod
+    def get_read_state(case_id, user_id):
+        """Get a user's read watermark for a case, or None."""
+        return db.session.get(MessageReadState, (case_id, user_id))
+
+    @staticmethod
+    def mark_read_up_to(case_id, user_id, message_id=None):
+        """
+        Mark every message up to and including message_id as read for a user.
+
+        Runs one set-based UPDATE over the user's unread messages in the case,
+        advances the (case, user) watermark and adjusts the unread counter in
+        the same transaction. Without message_id the newest message is used.
+
+        Returns:
+            (marked, error) where marked is the number of messages flipped.
+        """
+        if message_id is None:
+            message_id = db.session.execute(
+                select(Message.id)
+                .filter_by(case_id=case_id)
+                .order_by(Message.created_at.desc(), Message.id.desc())
+                .limit(1)
+            ).scalar_one_or_none()
+            if message_id is None:
+                return 0, None
+        else:
+            anchor_case = db.session.execute(
+                select(Message.case_id).filter_by(id=message_id)
+            ).scalar_one_or_none()
+            if anchor_case != case_id:
+                return None, "Message not found in this case"
+
+        # Database errors propagate (after a rollback); only the validation
+        # problems above are returned as errors
+        try:
+            position = MessageService._thread_position(message_id)
+            marked = db.session.execute(
+                update(Message)
+                .where(
+                    Message.case_id == case_id,
+                    Message.recipient_id == user_id,
+                    Message.read.is_(False),
+                    tuple_(Message.created_at, Message.id) <= position
+                )
+                .values(read=True)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+            # Only ever move the watermark forward
+            state = MessageService.get_read_state(case_id, user_id)
+            if state is None:
+                db.session.add(MessageReadState(
+                    case_id=case_id,
+                    user_id=user_id,
+                    last_read_message_id=message_id
+                ))
+            elif db.session.execute(
+                select(tuple_(Message.created_at, Message.id) > position)
+                .where(Message.id == state.last_read_message_id)
+            ).scalar_one_or_none() is not True:
+                state.last_read_message_id = message_id
+
+            UnreadCounterService.adjust(user_id, case_id, -marked)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return marked, None
+
+    @staticmethod
+    def count_unread_after_watermark(case_id, user_id):
+        """
+        Count unread messages to a user that are newer than their read watermark.
+
+        This is a range scan on ix_messages_case_id_created_at starting at the
+        watermark, instead of a scan over the read flags of the whole case.
+        Messages after the watermark already read one at a time (PUT
+        /messages/<id>/read) are not counted, so this agrees with the
+        unread counters.
+        """
+        query = select(func.count(Message.id)).filter_by(case_id=case_id, recipient_id=user_id, read=False)
+
+        state = MessageService.get_read_state(case_id, user_id)
+        if state is not None:
+            query = query.where(
+                tuple_(Message.created_at, Message.id)
+                > MessageService._thread_position(state.last_read_message_id)
+            )
+
+        return db.session.execute(query).scalar_one()
+
+    @staticmethod
+    def get_all_messages(case_id=None, unread_only=False, limit=100, offset=0):
+        """
+        Get a page of messages across all cases for the admin feed.
+
+        Returns:
+            (messages, total) with participants and case titles loaded.
+        """
+        query = select(Message)
+
+        if case_id:
+            query = query.filter_by(case_id=case_id)
+
+        if unread_only:
+            query = query.filter_by(read=False)
+
+        total = db.session.execute(
+            select(func.count()).select_from(query.subquery())
+        ).scalar_one()
+
+        messages = db.session.execute(
+            query.options(*MessageService.participant_options(include_case=True))
+            .order_by(Message.created_at.desc())
+            .limit(limit)
+            .offset(offset)
+        ).scalars().all()
+
+        return messages, total
+
+    @staticmethod
+    def get_conversations(user, limit=100, offset=0):
+        """
+        Get one page of the user's conversation inbox.
+
+        Every case with at least one message is a conversation. The last
+        message, message count and the user's unread count are computed with
+        window functions in a single statement, joined with the case and the
+        other party, so the query count does not grow with the number of cases.
+
+        Returns:
+            (rows, total) where each row exposes the last message columns,
+            message_count, unread_count, case_title, case_status and the
+            other party's columns (other_id, other_name, ...).
+        """
+        scope = MessageService.case_scope(user)
+        if scope is None:
+            return [], 0
+
+        unread = sql_case(
+            (and_(Message.recipient_id == user.id, Message.read.is_(False)), 1),
+            else_=0
+        )
+        ranked = (
+            select(
+                Message.id,
+                Message.case_id,
+                Message.content,
+                Message.created_at,
+                Message.sender_id,
+                Message.read,
+                func.row_number().over(
+                    partition_by=Message.case_id,
+                    order_by=(Message.created_at.desc(), Message.id.desc())
+                ).label('position'),
+                func.count(Message.id).over(partition_by=Message.case_id).label('message_count'),
+                func.sum(unread).over(partition_by=Message.case_id).label('unread_count'),
+            )
+            .join(Case, Case.id == Message.case_id)
+            .where(scope)
+            .subquery()
+        )
+
+        # Clients talk to the assigned staff member, staff talk to the client
+        other_party = aliased(User)
+        other_party_id = Case.assigned_to_id if user.role == Role.CLIENT else Case.client_id
+
+        rows = db.session.execute(
+            select(
+                ranked.c.id,
+                ranked.c.case_id,
+                ranked.c.content,
+                ranked.c.created_at,
+                ranked.c.sender_id,
+                ranked.c.read,
+                ranked.c.message_count,
+                ranked.c.unread_count,
+                Case.title.label('case_title'),
+                Case.status.label('case_status'),
+                other_party.id.label('other_id'),
+                other_party.name.label('other_name'),
+                other_party.email.label('other_email'),
+                other_party.role.label('other_role'),
+                func.count().over().label('total'),
+            )
+            .join(Case, Case.id == ranked.c.case_id)
+            .outerjoin(other_party, other_party.id == other_party_id)
+            .where(ranked.c.position == 1)
+            .order_by(ranked.c.created_at.desc(), ranked.c.id.desc())
+            .limit(limit)
+            .offset(offset)
+        ).all()
+
+        if rows:
+            return rows, rows[0].total
+
+        # Past the last page the window total is unavailable; count directly
+        total = 0
+        if offset:
+            total = db.session.execute(
+                select(func.count(func.distinct(Message.case_id)))
+                .join(Case, Case.id == Message.case_id)
+                .where(scope)
+            ).scalar_one()
+        return [], total
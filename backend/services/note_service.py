@@ -4,6 +4,7 @@ Case notes management service.
 from extensions import db
 from models import CaseNote, Case, User, Role
 from sqlalchemy import select
+from services.activity_service import ActivityService
 
 
 class CaseNoteService:
@@ -30,6 +31,10 @@ class CaseNoteService:
             
             db.session.add(new_note)
             db.session.commit()
+            ActivityService.record(
+                'note.created', case_id=case_id, subject_type='note', subject_id=new_note.id,
+                actor_id=author_id, is_private=is_private
+            )
             
             return new_note, None
         except Exception as e:
@@ -71,6 +76,7 @@ class CaseNoteService:
                 note.is_private = is_private
             
             db.session.commit()
+            ActivityService.record('note.updated', case_id=note.case_id, subject_type='note', subject_id=note.id)
             return note, None
         except Exception as e:
             db.session.rollback()
@@ -87,8 +93,10 @@ class CaseNoteService:
             return False, "Note not found"
         
         try:
+            case_id = note.case_id
             db.session.delete(note)
             db.session.commit()
+            ActivityService.record('note.deleted', case_id=case_id, subject_type='note', subject_id=note_id)
             return True, None
         except Exception as e:
             db.session.rollback()
@@ -0,0 +1,151 @@
+"""
+Blocklist of revoked access tokens.
+
+A revoked token's jti is written to revoked_tokens and kept in a set in
+every worker, so the check on each authenticated request is a set lookup
+with no query. Each worker reads only the rows revoked since its last
+refresh, at most every REVOCATION_REFRESH_INTERVAL seconds, which bounds
+how long a token revoked on another worker keeps working there. Rows are
+only needed until their token expires and are pruned after that.
+"""
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from flask import has_app_context
+from extensions import db, socketio
+from models import RevokedToken
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+
+# Refreshes re-read this far back so revocations committed late or by a
+# worker whose clock is slightly behind are not missed
+REFRESH_LOOKBACK = timedelta(seconds=60)
+
+
+class TokenBlocklist:
+    """In-process set of revoked jtis, refreshed incrementally from the database."""
+
+    def __init__(self, refresh_interval=5.0, prune_interval=3600):
+        self.refresh_interval = refresh_interval
+        self.prune_interval = prune_interval
+        self.app = None
+        # jti -> expiry of the revoked token
+        self._revoked = {}
+        self._loaded_at = None
+        self._refreshed_at = 0.0
+        self._last_prune = time.monotonic()
+        self._refresh_lock = threading.Lock()
+        self.metrics = {
+            'revoked': 0,
+            'refreshes': 0,
+            'rows_loaded': 0,
+            'rows_pruned': 0,
+        }
+
+    def init_app(self, app):
+        """Take the refresh and prune intervals from the app config."""
+        self.app = app
+        self.refresh_interval = app.config['REVOCATION_REFRESH_INTERVAL']
+        self.prune_interval = app.config['REVOCATION_PRUNE_INTERVAL']
+
+    def _app_context(self):
+        if has_app_context() or self.app is None:
+            return nullcontext()
+        return self.app.app_context()
+
+    def is_revoked(self, jti):
+        """
+        Whether a token has been revoked.
+
+        Refreshes first when the set is older than the refresh interval;
+        only one request per worker does so; the rest use the current set.
+        """
+        if self._loaded_at is None or (
+            self.refresh_interval and time.monotonic() - self._refreshed_at >= self.refresh_interval
+        ):
+            if self._refresh_lock.acquire(blocking=self._loaded_at is None):
+                try:
+                    self._refresh()
+                finally:
+                    self._refresh_lock.release()
+        return jti in self._revoked
+
+    def refresh(self):
+        """Read revocations made since the last refresh (all live ones the first time)."""
+        with self._refresh_lock:
+            self._refresh()
+
+    def _refresh(self):
+        now = datetime.utcnow()
+        query = select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > now)
+        if self._loaded_at is not None:
+            query = query.where(RevokedToken.revoked_at >= self._loaded_at - REFRESH_LOOKBACK)
+
+        try:
+            with self._app_context():
+                rows = db.session.execute(query).all()
+        except Exception as e:
+            # Keep the current set; the next request tries again
+            print(f"[ERROR] Failed to refresh the token blocklist: {str(e)}")
+            self._refreshed_at = time.monotonic()
+            return
+
+        revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+        revoked.update(rows)
+        self._revoked = revoked
+        self._loaded_at = now
+        self._refreshed_at = time.monotonic()
+        self.metrics['refreshes'] += 1
+        self.metrics['rows_loaded'] += len(rows)
+
+        if self.prune_interval and time.monotonic() - self._last_prune >= self.prune_interval:
+            self._last_prune = time.monotonic()
+            socketio.start_background_task(self._prune_later)
+
+    def _prune_later(self):
+        with self._app_context():
+            try:
+                self.prune()
+            except Exception as e:
+                db.session.rollback()
+                print(f"[ERROR] Failed to prune revoked tokens: {str(e)}")
+
+    def prune(self):
+        """Delete rows of tokens that have expired anyway; returns the number deleted."""
+        result = db.session.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow())
+        )
+        db.session.commit()
+        self.metrics['rows_pruned'] += result.rowcount
+        return result.rowcount
+
+    def revoke(self, jti, user_id, expires_at):
+        """Revoke one token, in this worker at once and in the others on their next refresh."""
+        db.session.add(RevokedToken(jti=jti, user_id=user_id, revoked_at=datetime.utcnow(), expires_at=expires_at))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Already revoked
+            db.session.rollback()
+        self._revoked[jti] = expires_at
+        self.metrics['revoked'] += 1
+
+    def clear(self):
+        """Forget every revocation held in memory; the next check reloads them."""
+        with self._refresh_lock:
+            self._revoked = {}
+            self._loaded_at = None
+            self._refreshed_at = 0.0
+
+    def get_metrics(self):
+        """Counters since startup plus the size of the set."""
+        return {
+            **self.metrics,
+            'size': len(self._revoked),
+            'refresh_interval_seconds': self.refresh_interval,
+        }
+
+
+token_blocklist = TokenBlocklist()
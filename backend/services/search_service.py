@@ -0,0 +1,320 @@
+"""
+Full-text search service for cases, case messages and notes.
+"""
+import html
+import re
+from extensions import db
+from models import Message, CaseNote, Case, User, Role
+from sqlalchemy import select, func, literal_column, true, or_, union_all, table as sql_table, column as sql_column
+from services.case_service import CaseService
+
+# Highlight markers wrapped around matched terms in snippets
+MARK_START = '<mark>'
+MARK_END = '</mark>'
+# The database marks matches with these private-use characters instead, so
+# the snippet text can be HTML-escaped before the real markers go in
+_SENTINEL_START = '\ue000'
+_SENTINEL_END = '\ue001'
+
+# Trigram indexes cannot narrow down anything shorter
+MIN_CASE_QUERY_LENGTH = 3
+
+
+class SearchService:
+    """Service class for searching case correspondence."""
+    
+    @staticmethod
+    def _fts5_query(text):
+        """Turn free text into an FTS5 query that ANDs quoted terms."""
+        terms = re.findall(r'\w+', text, flags=re.UNICODE)
+        return ' '.join(f'"{term}"' for term in terms)
+    
+    @staticmethod
+    def _message_scope(user):
+        """Cases whose messages the user may search, or None."""
+        if user.role in [Role.CASE_MANAGER, Role.SUPER_ADMIN]:
+            return true()
+        if user.role == Role.CLIENT:
+            return Case.client_id == user.id
+        return None
+    
+    @staticmethod
+    def _note_scope(user):
+        """Notes the user may search, or None. Clients never see private notes."""
+        if user.role in [Role.CASE_MANAGER, Role.SUPER_ADMIN]:
+            return true()
+        if user.role == Role.CLIENT:
+            return (Case.client_id == user.id) & (CaseNote.is_private.is_(False))
+        return None
+    
+    @staticmethod
+    def _highlight(snippet):
+        """
+        HTML-escape a snippet of user text, then turn the match sentinels into <mark> tags.
+        
+        Messages and notes are user input; without escaping, a client that
+        renders snippets as HTML would render whatever markup they contain.
+        """
+        if snippet is None:
+            return None
+        return (
+            html.escape(snippet)
+            .replace(_SENTINEL_START, MARK_START)
+            .replace(_SENTINEL_END, MARK_END)
+        )
+    
+    @staticmethod
+    def _search_table(model, text, scope, case_id, limit):
+        """Run a ranked search over one table and return result dicts."""
+        table = model.__tablename__
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect == 'sqlite':
+            match = SearchService._fts5_query(text)
+            if not match:
+                return []
+            fts_table = sql_table(f'{table}_fts', sql_column('rowid'))
+            fts = literal_column(f'{table}_fts')
+            query = (
+                select(
+                    model.id,
+                    model.case_id,
+                    model.created_at,
+                    func.snippet(fts, 0, _SENTINEL_START, _SENTINEL_END, '…', 16).label('snippet'),
+                    # bm25() is lower-is-better; flip it so higher is better
+                    (-func.bm25(fts)).label('score'),
+                )
+                .select_from(fts_table)
+                .join(model, model.id == fts_table.c.rowid)
+                .where(fts.op('MATCH')(match))
+            )
+        elif dialect == 'postgresql':
+            vector = literal_column(f'{table}.search_vector')
+            tsquery = func.websearch_to_tsquery('english', text)
+            query = (
+                select(
+                    model.id,
+                    model.case_id,
+                    model.created_at,
+                    func.ts_headline(
+                        'english', model.content, tsquery,
+                        f'StartSel={_SENTINEL_START}, StopSel={_SENTINEL_END}, MaxFragments=2, MaxWords=16, MinWords=6'
+                    ).label('snippet'),
+                    func.ts_rank_cd(vector, tsquery).label('score'),
+                )
+                .where(vector.op('@@')(tsquery))
+            )
+        else:
+            # No full-text index available; unranked substring match
+            query = (
+                select(
+                    model.id,
+                    model.case_id,
+                    model.created_at,
+                    model.content.label('snippet'),
+                    literal_column('0').label('score'),
+                )
+                .where(model.content.ilike(f'%{text}%'))
+            )
+        
+        query = query.join(Case, Case.id == model.case_id).where(scope)
+        if case_id:
+            query = query.where(model.case_id == case_id)
+        
+        rows = db.session.execute(
+            query.order_by(literal_column('score').desc(), model.id.desc()).limit(limit)
+        ).all()
+        
+        return [{
+            'id': row.id,
+            'case_id': row.case_id,
+            'snippet': SearchService._highlight(row.snippet),
+            'score': float(row.score or 0),
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+        } for row in rows]
+    
+    @staticmethod
+    def search(user, text, kinds=('message', 'note'), case_id=None, limit=20, offset=0):
+        """
+        Search messages and notes visible to a user, best matches first.
+        
+        Each kind is searched through its full-text index and the ranked
+        results are merged; only the top ``offset + limit`` hits of each kind
+        are ever read.
+        
+        Returns:
+            (results, error) where each result has type, id, case_id,
+            snippet (HTML-escaped, with <mark> highlights), score and created_at.
+        """
+        text = (text or '').strip()
+        if not text:
+            return None, "Search query is required"
+        
+        try:
+            results = []
+            sources = (
+                ('message', Message, SearchService._message_scope(user)),
+                ('note', CaseNote, SearchService._note_scope(user)),
+            )
+            for kind, model, scope in sources:
+                if kind not in kinds or scope is None:
+                    continue
+                for hit in SearchService._search_table(model, text, scope, case_id, offset + limit):
+                    hit['type'] = kind
+                    results.append(hit)
+        except Exception:
+            # Database errors propagate; only a bad query is returned as an error
+            db.session.rollback()
+            raise
+        
+        results.sort(key=lambda hit: (hit['score'], hit['id']), reverse=True)
+        return results[offset:offset + limit], None
+
+    @staticmethod
+    def _case_scope(user):
+        """Cases the user may find, or None."""
+        if user.role in [Role.CASE_MANAGER, Role.SUPER_ADMIN]:
+            return true()
+        if user.role == Role.CLIENT:
+            return Case.client_id == user.id
+        return None
+    
+    @staticmethod
+    def _trigram_query(text):
+        """
+        Turn free text into an FTS5 trigram query.
+        
+        Whitespace separated terms are quoted and ANDed, so each matches
+        anywhere as a substring ("2024-07" finds 1000HILLS-2024-070). Terms
+        too short for a trigram make the whole text one substring instead
+        ("Client 17").
+        """
+        terms = text.split()
+        if any(len(term) < MIN_CASE_QUERY_LENGTH for term in terms):
+            terms = [text]
+        return ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+    
+    @staticmethod
+    def _case_branches(text):
+        """
+        (query, score) pairs finding matching cases, one per search index.
+        
+        Each query selects Case.id from its index joined to cases, so the
+        caller can add visibility and filter conditions to every branch.
+        """
+        dialect = db.session.get_bind().dialect.name
+        
+        if dialect == 'sqlite':
+            match = SearchService._trigram_query(text)
+            cases_fts = sql_table('cases_fts', sql_column('rowid'))
+            users_fts = sql_table('users_fts', sql_column('rowid'))
+            return [
+                # bm25() is lower-is-better; flip it. References weigh most.
+                (
+                    select(Case.id).select_from(cases_fts)
+                    .join(Case, Case.id == cases_fts.c.rowid)
+                    .where(literal_column('cases_fts').op('MATCH')(match)),
+                    -func.bm25(literal_column('cases_fts'), 10.0, 5.0, 1.0)
+                ),
+                (
+                    select(Case.id).select_from(users_fts)
+                    .join(Case, Case.client_id == users_fts.c.rowid)
+                    # Client names only; users_fts also indexes emails
+                    .where(literal_column('users_fts').op('MATCH')(f'{{name}} : ({match})')),
+                    -func.bm25(literal_column('users_fts'))
+                ),
+            ]
+        
+        pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        if dialect == 'postgresql':
+            vector = literal_column('cases.search_vector')
+            tsquery = func.websearch_to_tsquery('english', text)
+            return [
+                (
+                    select(Case.id)
+                    .where(or_(Case.case_id.ilike(pattern, escape='\\'), Case.title.ilike(pattern, escape='\\'))),
+                    func.greatest(func.similarity(Case.case_id, text), func.similarity(Case.title, text))
+                ),
+                (
+                    select(Case.id).where(vector.op('@@')(tsquery)),
+                    func.ts_rank_cd(vector, tsquery)
+                ),
+                (
+                    select(Case.id).join(User, User.id == Case.client_id)
+                    .where(User.name.ilike(pattern, escape='\\')),
+                    func.similarity(User.name, text)
+                ),
+            ]
+        
+        # No search index available; unranked substring match
+        return [(
+            select(Case.id).join(User, User.id == Case.client_id)
+            .where(or_(
+                Case.case_id.ilike(pattern, escape='\\'),
+                Case.title.ilike(pattern, escape='\\'),
+                Case.description.ilike(pattern, escape='\\'),
+                User.name.ilike(pattern, escape='\\'),
+            )),
+            literal_column('0')
+        )]
+    
+    @staticmethod
+    def search_cases(user, text, filters=None, fields=None, limit=20, offset=0):
+        """
+        Search cases by partial reference, title, description or client name.
+        
+        Every index is searched in its own branch of a UNION ALL, with the
+        user's visibility and the filters applied inside the branch, and
+        only each branch's top ``offset + limit`` hits are kept. A case's
+        score is its best branch score.
+        
+        Returns:
+            (rows, has_more, error). Rows are case_row_to_dict-compatible
+            column tuples plus a ``score``, best matches first.
+        """
+        text = (text or '').strip()
+        if len(text) < MIN_CASE_QUERY_LENGTH:
+            return None, False, f"Search query must be at least {MIN_CASE_QUERY_LENGTH} characters"
+        
+        scope = SearchService._case_scope(user)
+        if scope is None:
+            return [], False, None
+        
+        try:
+            conditions = CaseService._filter_conditions(**(filters or {}))
+        except KeyError as e:
+            return None, False, f"Invalid filter value: {e.args[0]}"
+        
+        # One extra hit tells whether another page exists
+        wanted = offset + limit + 1
+        branches = []
+        for query, score in SearchService._case_branches(text):
+            top = (
+                query.add_columns(score.label('score'))
+                .where(scope, *conditions)
+                .order_by(literal_column('score').desc(), Case.id.desc())
+                .limit(wanted)
+                .subquery()
+            )
+            branches.append(select(top.c.id.label('case_id'), top.c.score))
+        hits = union_all(*branches).subquery()
+        ranked = (
+            select(hits.c.case_id, func.max(hits.c.score).label('score'))
+            .group_by(hits.c.case_id)
+            .subquery()
+        )
+        
+        try:
+            rows = db.session.execute(
+                CaseService._row_columns(fields)
+                .add_columns(ranked.c.score)
+                .join(ranked, ranked.c.case_id == Case.id)
+                .order_by(ranked.c.score.desc(), Case.id.desc())
+                .limit(limit + 1)
+                .offset(offset)
+            ).all()
+        except Exception:
+            # Database errors propagate; only bad input is returned as an error
+            db.session.rollback()
+            raise
+        return rows[:limit], len(rows) > limit, None
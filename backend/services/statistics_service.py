@@ -0,0 +1,109 @@
+"""
+System statistics service for the admin dashboard.
+"""
+import copy
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import Case, User, Role, CaseStatus
+from sqlalchemy import select, func, literal, union_all
+from utils.cache import TTLCache
+
+# Snapshots per trend length; short TTL, also cleared on case changes
+_system_cache = TTLCache(ttl=60)
+
+
+class StatisticsService:
+    """Service class for system-wide dashboard statistics."""
+
+    @staticmethod
+    def _week_start(column):
+        """SQL expression for the Monday starting the week of a timestamp."""
+        if db.engine.dialect.name == 'postgresql':
+            return func.date_trunc('week', column)
+        # SQLite: move to the coming Sunday, then back to its Monday
+        return func.date(column, 'weekday 0', '-6 days')
+
+    @staticmethod
+    def _week_key(value):
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        return str(value)[:10]
+
+    @staticmethod
+    def get_weekly_trends(weeks=12):
+        """
+        Count cases opened and closed per week over the last ``weeks`` weeks.
+
+        Both series come from one UNION ALL of two grouped range scans, on
+        ix_cases_created_at and ix_cases_closed_at. Weeks without activity
+        are reported as zero.
+        """
+        today = datetime.utcnow().date()
+        first_week = today - timedelta(days=today.weekday()) - timedelta(weeks=weeks - 1)
+        since = datetime.combine(first_week, datetime.min.time())
+
+        opened_week = StatisticsService._week_start(Case.created_at)
+        closed_week = StatisticsService._week_start(Case.closed_at)
+        trends = union_all(
+            select(opened_week.label('week'), literal('opened').label('kind'), func.count().label('count'))
+            .where(Case.created_at >= since)
+            .group_by(opened_week),
+            select(closed_week.label('week'), literal('closed').label('kind'), func.count().label('count'))
+            .where(Case.closed_at >= since)
+            .group_by(closed_week),
+        )
+
+        buckets = {
+            (first_week + timedelta(weeks=n)).isoformat(): {'opened': 0, 'closed': 0}
+            for n in range(weeks)
+        }
+        for row in db.session.execute(trends):
+            bucket = buckets.get(StatisticsService._week_key(row.week))
+            if bucket is not None:
+                bucket[row.kind] = row.count
+
+        return [{'week_start': week, **counts} for week, counts in buckets.items()]
+
+    @staticmethod
+    def get_system_stats(weeks=12):
+        """
+        Get users by role, cases by status and weekly case trends.
+
+        Each breakdown is one grouped aggregate and the totals are summed
+        from it. The snapshot is cached for a minute and dropped when a
+        case is created or updated.
+        """
+        stats = _system_cache.get(weeks)
+        if stats is not None:
+            return copy.deepcopy(stats), None
+
+        try:
+            role_counts = {role.value: 0 for role in Role}
+            for role, count in db.session.execute(
+                select(User.role, func.count()).group_by(User.role)
+            ):
+                role_counts[role.value] = count
+
+            status_counts = {status.value: 0 for status in CaseStatus}
+            for status, count in db.session.execute(
+                select(Case.status, func.count()).group_by(Case.status)
+            ):
+                status_counts[status.value] = count
+
+            stats = {
+                "total_users": sum(role_counts.values()),
+                "total_cases": sum(status_counts.values()),
+                "users_by_role": role_counts,
+                "cases_by_status": status_counts,
+                "weekly_trends": StatisticsService.get_weekly_trends(weeks),
+            }
+            _system_cache.set(weeks, stats)
+            return copy.deepcopy(stats), None
+        except Exception as e:
+            return None, str(e)
+
+    @staticmethod
+    def invalidate():
+        """Drop cached system statistics."""
+        _system_cache.clear()
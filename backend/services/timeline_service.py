@@ -0,0 +1,135 @@
+"""
+Case timeline service.
+
+Merges a case's messages, notes, deadlines, appointments and documents
+into one feed, newest first.
+"""
+import heapq
+from datetime import datetime
+
+from extensions import db
+from models import Message, CaseNote, Deadline, Appointment, Document, User, Role
+from sqlalchemy import select, and_, or_
+
+# Event kinds in the order they appear in when they share a timestamp
+TIMELINE_KINDS = ('message', 'note', 'deadline', 'appointment', 'document')
+
+
+class TimelineService:
+    """Service class for merged case timelines."""
+
+    @staticmethod
+    def _sources(case_id, user):
+        """
+        Per-kind queries as (kind, model, timestamp column, select).
+
+        Each select is ordered by (timestamp, id) on an index leading with
+        case_id, so it reads the newest rows of the case first.
+        """
+        sender = User.__table__.alias('sender')
+        author = User.__table__.alias('author')
+        uploader = User.__table__.alias('uploader')
+        attorney = User.__table__.alias('attorney')
+
+        notes = select(
+            CaseNote.id, CaseNote.created_at.label('at'), CaseNote.content, CaseNote.is_private,
+            CaseNote.author_id, author.c.name.label('author_name')
+        ).join(author, author.c.id == CaseNote.author_id).where(CaseNote.case_id == case_id)
+        if user.role not in [Role.CASE_MANAGER, Role.SUPER_ADMIN]:
+            # Clients never see private notes
+            notes = notes.where(CaseNote.is_private.is_(False))
+
+        return [
+            ('message', Message, Message.created_at, select(
+                Message.id, Message.created_at.label('at'), Message.content, Message.read,
+                Message.sender_id, sender.c.name.label('sender_name'), Message.recipient_id
+            ).join(sender, sender.c.id == Message.sender_id).where(Message.case_id == case_id)),
+            ('note', CaseNote, CaseNote.created_at, notes),
+            ('deadline', Deadline, Deadline.due_date, select(
+                Deadline.id, Deadline.due_date.label('at'), Deadline.title, Deadline.is_completed
+            ).where(Deadline.case_id == case_id)),
+            ('appointment', Appointment, Appointment.start_datetime, select(
+                Appointment.id, Appointment.start_datetime.label('at'), Appointment.title,
+                Appointment.end_datetime, Appointment.status, Appointment.appointment_type,
+                Appointment.attorney_id, attorney.c.name.label('attorney_name')
+            ).join(attorney, attorney.c.id == Appointment.attorney_id).where(Appointment.case_id == case_id)),
+            ('document', Document, Document.created_at, select(
+                Document.id, Document.created_at.label('at'), Document.filename, Document.mime_type,
+                Document.file_size, Document.uploaded_by_id, uploader.c.name.label('uploaded_by_name')
+            ).join(uploader, uploader.c.id == Document.uploaded_by_id).where(Document.case_id == case_id)),
+        ]
+
+    @staticmethod
+    def encode_cursor(event):
+        """Opaque cursor pointing just past an event."""
+        return f"{event['timestamp']}~{event['type']}~{event['id']}"
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """(timestamp, kind, id) from a cursor. Raises ValueError if malformed."""
+        timestamp, kind, event_id = cursor.split('~')
+        if kind not in TIMELINE_KINDS:
+            raise ValueError(f"Unknown event type: {kind}")
+        return datetime.fromisoformat(timestamp), kind, int(event_id)
+
+    @staticmethod
+    def _before(kind, model, column, cursor):
+        """Condition selecting a kind's events that come after the cursor in the feed."""
+        at, cursor_kind, cursor_id = cursor
+        position, cursor_position = TIMELINE_KINDS.index(kind), TIMELINE_KINDS.index(cursor_kind)
+        if position > cursor_position:
+            # Same timestamp sorts after the cursor's event
+            return column <= at
+        if position < cursor_position:
+            return column < at
+        return or_(column < at, and_(column == at, model.id < cursor_id))
+
+    @staticmethod
+    def _stream(kind, result):
+        """A kind's rows as (timestamp, rank, id, kind, row) merge items."""
+        # Merged in descending order, so earlier kinds get higher ranks
+        rank = -TIMELINE_KINDS.index(kind)
+        for row in result:
+            yield row.at, rank, row.id, kind, row
+
+    @staticmethod
+    def _serialize(kind, row):
+        data = dict(row._mapping)
+        at = data.pop('at')
+        for key, value in data.items():
+            if isinstance(value, datetime):
+                data[key] = value.isoformat()
+            elif hasattr(value, 'value'):
+                data[key] = value.value
+        return {'type': kind, 'timestamp': at.isoformat(), **data}
+
+    @staticmethod
+    def get_case_timeline(case_id, user, cursor=None, limit=50, kinds=None):
+        """
+        Get one page of a case's timeline, newest first.
+
+        Every kind is read with its own bounded query (at most ``limit + 1``
+        rows, in index order) and the ordered results are k-way merged with
+        heapq.merge, consuming only what the page needs. ``cursor`` is the
+        value from encode_cursor for the last event of the previous page;
+        ties on the timestamp are broken by kind, then id.
+
+        Returns:
+            (events, has_more)
+        """
+        streams = []
+        for kind, model, column, query in TimelineService._sources(case_id, user):
+            if kinds and kind not in kinds:
+                continue
+            if cursor is not None:
+                query = query.where(TimelineService._before(kind, model, column, cursor))
+            result = db.session.execute(query.order_by(column.desc(), model.id.desc()).limit(limit + 1))
+            streams.append(TimelineService._stream(kind, result))
+
+        merged = heapq.merge(*streams, key=lambda item: item[:3], reverse=True)
+        events = []
+        for at, rank, event_id, kind, row in merged:
+            if len(events) == limit:
+                return events, True
+            events.append(TimelineService._serialize(kind, row))
+        return events, False
@@ -0,0 +1,114 @@
+"""
+Unread message counter service.
+"""
+from extensions import db
+from models import Message, UnreadCounter
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+class UnreadCounterService:
+    """
+    Service class maintaining the materialized unread counters.
+    
+    Counter changes are flushed into the caller's session; the caller commits
+    them together with the message change they describe.
+    """
+    
+    @staticmethod
+    def adjust(user_id, case_id, delta):
+        """Add delta to a recipient's unread counter for a case."""
+        if not delta:
+            return
+        
+        # Upsert so concurrent first messages in a case cannot collide
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            insert, larger = postgresql.insert, func.greatest
+        elif dialect == 'sqlite':
+            insert, larger = sqlite.insert, func.max
+        else:
+            insert = None
+        
+        if insert is not None:
+            statement = insert(UnreadCounter).values(
+                user_id=user_id,
+                case_id=case_id,
+                count=max(delta, 0)
+            ).on_conflict_do_update(
+                index_elements=[UnreadCounter.user_id, UnreadCounter.case_id],
+                set_={'count': larger(UnreadCounter.count + delta, 0)}
+            )
+            db.session.execute(statement)
+            return
+        
+        # Generic fallback for other backends
+        counter = db.session.get(UnreadCounter, (user_id, case_id), with_for_update=True)
+        if counter:
+            counter.count = max(counter.count + delta, 0)
+        else:
+            db.session.add(UnreadCounter(user_id=user_id, case_id=case_id, count=max(delta, 0)))
+        db.session.flush()
+    
+    @staticmethod
+    def message_created(message):
+        """Count a newly added unread message for its recipient."""
+        if not message.read:
+            UnreadCounterService.adjust(message.recipient_id, message.case_id, 1)
+    
+    @staticmethod
+    def message_read(message):
+        """Discount a message that has just been marked as read."""
+        UnreadCounterService.adjust(message.recipient_id, message.case_id, -1)
+    
+    @staticmethod
+    def get_total(user_id):
+        """Get the number of unread messages for a user across all cases."""
+        return db.session.execute(
+            select(func.coalesce(func.sum(UnreadCounter.count), 0))
+            .filter_by(user_id=user_id)
+        ).scalar_one()
+    
+    @staticmethod
+    def get_by_case(user_id):
+        """Get a user's non-zero unread counts keyed by case id."""
+        rows = db.session.execute(
+            select(UnreadCounter.case_id, UnreadCounter.count)
+            .filter_by(user_id=user_id)
+            .filter(UnreadCounter.count > 0)
+        ).all()
+        return {row.case_id: row.count for row in rows}
+    
+    @staticmethod
+    def rebuild():
+        """
+        Recompute every counter from the messages table.
+        
+        Used to repair drift, e.g. after messages were edited outside the API.
+        Returns the number of counter rows written.
+        
+        Message writes and counter adjustments made while the rebuild runs
+        would be lost or counted twice, so they are held off until it
+        commits: on PostgreSQL both tables are locked against writers
+        (reads go on), and on SQLite the DELETE already takes the
+        database's single write lock.
+        """
+        try:
+            if db.session.get_bind().dialect.name == 'postgresql':
+                # Messages first, in the order writers take them
+                db.session.execute(text('LOCK TABLE messages IN SHARE ROW EXCLUSIVE MODE'))
+                db.session.execute(text('LOCK TABLE unread_counters IN SHARE ROW EXCLUSIVE MODE'))
+            db.session.execute(delete(UnreadCounter))
+            rows = db.session.execute(
+                db.insert(UnreadCounter).from_select(
+                    ['user_id', 'case_id', 'count'],
+                    select(Message.recipient_id, Message.case_id, func.count(Message.id))
+                    .filter(Message.read.is_(False))
+                    .group_by(Message.recipient_id, Message.case_id)
+                )
+            ).rowcount
+            db.session.commit()
+            return rows, None
+        except Exception as e:
+            db.session.rollback()
+            return None, str(e)
@@ -0,0 +1,244 @@
+"""
+Bulk user import from CSV or NDJSON.
+
+Input is read a batch at a time, so memory stays flat however many users a
+file holds. Each batch is validated, checked against existing emails with
+one query, has its passwords hashed in parallel and is written with one
+executemany INSERT in its own transaction.
+"""
+import csv
+import io
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from flask import current_app
+from extensions import db
+from models import User, Role
+from sqlalchemy import select, insert, func
+from sqlalchemy.dialects import postgresql, sqlite
+from services.activity_service import ActivityService
+from utils.passwords import passwords
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+# Users migrated from another system may bring their bcrypt hash instead
+BCRYPT_HASH_PATTERN = re.compile(r'^\$2[aby]\$\d{2}\$[./A-Za-z0-9]{53}$')
+# Errors listed in a report; any beyond this are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (row number, fields) from a binary CSV or NDJSON stream.
+
+    CSV needs a header row naming the columns. Row numbers count records,
+    starting at 1; fields is None for an NDJSON line that is not an object.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        yield from enumerate(csv.DictReader(text), start=1)
+        return
+
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            fields = json.loads(line)
+        except ValueError:
+            fields = None
+        yield number, fields if isinstance(fields, dict) else None
+
+
+def _text(fields, key):
+    value = fields.get(key)
+    return str(value).strip() if value is not None else ''
+
+
+def _hash_password(password):
+    return passwords.hash(password, bulk=True)
+
+
+class ImportReport:
+    """Counts and per-row errors for one import."""
+
+    def __init__(self, fmt):
+        self.format = fmt
+        self.rows = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.started_at = time.perf_counter()
+
+    def error(self, number, email, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'email': email or None, 'error': message})
+
+    def to_dict(self):
+        seconds = time.perf_counter() - self.started_at
+        return {
+            'format': self.format,
+            'rows': self.rows,
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'seconds': round(seconds, 2),
+            'users_per_minute': round(self.created * 60 / seconds) if seconds else 0,
+        }
+
+
+class UserImportService:
+    """Service class for bulk user imports."""
+
+    @staticmethod
+    def _validate(fields):
+        """(column values, error) for one input row."""
+        if fields is None:
+            return None, 'Not a JSON object'
+
+        email, name = _text(fields, 'email'), _text(fields, 'name')
+        password, password_hash = _text(fields, 'password'), _text(fields, 'password_hash')
+        if not EMAIL_PATTERN.match(email):
+            return None, 'Invalid email'
+        if not name:
+            return None, 'Missing name'
+        if password_hash:
+            if not BCRYPT_HASH_PATTERN.match(password_hash):
+                return None, 'password_hash is not a bcrypt hash'
+        elif not password:
+            return None, 'Missing password'
+
+        role = _text(fields, 'role').upper() or Role.CLIENT.name
+        if role not in Role.__members__:
+            return None, f'Invalid role: {role}'
+
+        return {
+            'email': email,
+            'name': name,
+            'phone': _text(fields, 'phone') or None,
+            'role': Role[role],
+            'password': password,
+            'password_hash': password_hash or None,
+            'email_verified': False,
+        }, None
+
+    @staticmethod
+    def _existing_emails(emails):
+        """The (lower-cased) emails among ``emails`` that already have an account."""
+        return set(db.session.execute(
+            select(func.lower(User.email)).where(func.lower(User.email).in_(emails))
+        ).scalars())
+
+    @staticmethod
+    def _insert(rows):
+        """
+        Insert users with one executemany; returns the emails inserted.
+
+        Rows whose email was taken since the batch was checked (another
+        request or import) are skipped by ON CONFLICT rather than failing
+        the whole batch.
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect not in ('postgresql', 'sqlite'):
+            # Generic fallback for other backends
+            db.session.execute(insert(User), rows)
+            return {row['email'] for row in rows}
+
+        statement = (postgresql.insert if dialect == 'postgresql' else sqlite.insert)(User)
+        return set(db.session.execute(
+            statement.on_conflict_do_nothing(index_elements=[User.email]).returning(User.email),
+            rows
+        ).scalars())
+
+    @staticmethod
+    def _import_batch(batch, seen, report, pool):
+        """Validate, deduplicate, hash and insert one batch of rows."""
+        candidates = []
+        for number, fields in batch:
+            values, error = UserImportService._validate(fields)
+            if error:
+                report.error(number, fields and _text(fields, 'email'), error)
+                continue
+            key = values['email'].lower()
+            if key in seen:
+                report.error(number, values['email'], 'Duplicate email in file')
+                continue
+            seen.add(key)
+            candidates.append((number, values))
+        if not candidates:
+            return
+
+        existing = UserImportService._existing_emails([values['email'].lower() for _, values in candidates])
+        fresh = []
+        for number, values in candidates:
+            if values['email'].lower() in existing:
+                report.error(number, values['email'], 'Email already registered')
+            else:
+                fresh.append((number, values))
+        if not fresh:
+            return
+
+        passwords = [values['password'] for _, values in fresh if not values['password_hash']]
+        hashes = iter(pool.map(_hash_password, passwords))
+        rows = []
+        for _, values in fresh:
+            values.pop('password')
+            if not values['password_hash']:
+                values['password_hash'] = next(hashes)
+            rows.append(values)
+
+        inserted = UserImportService._insert(rows)
+        db.session.commit()
+        for number, values in fresh:
+            if values['email'] in inserted:
+                report.created += 1
+            else:
+                report.error(number, values['email'], 'Email already registered')
+
+    @staticmethod
+    def import_users(stream, fmt, batch_size=None, workers=None):
+        """
+        Create users from a CSV or NDJSON stream.
+
+        Rows have ``email``, ``name``, ``password`` (or an existing bcrypt
+        ``password_hash``) and optionally ``role`` (a Role name, default
+        CLIENT) and ``phone``. Invalid rows and emails that are taken or
+        repeated in the file are reported and skipped; every other row is
+        created. Batches are committed as they go, so an interrupted
+        import keeps the batches written so far.
+
+        Returns:
+            (report dict, error)
+        """
+        if fmt not in IMPORT_FORMATS:
+            return None, f"Unknown import format: {fmt}. Use one of: {', '.join(IMPORT_FORMATS)}"
+
+        batch_size = batch_size or current_app.config['USER_IMPORT_BATCH_SIZE']
+        workers = workers or current_app.config['USER_IMPORT_HASH_WORKERS']
+        report = ImportReport(fmt)
+        seen = set()
+        rows = read_rows(stream, fmt)
+        try:
+            # bcrypt releases the GIL, so the threads hash in parallel, within
+            # the bulk share of the password hashing slots (see utils.passwords)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                while True:
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        break
+                    report.rows += len(batch)
+                    UserImportService._import_batch(batch, seen, report, pool)
+        except (UnicodeDecodeError, csv.Error) as e:
+            # Batches before the unreadable one are already committed
+            db.session.rollback()
+            report.error(None, None, f"Could not read the input after row {report.rows}: {str(e)}")
+
+        if report.created:
+            ActivityService.record('users.imported', subject_type='user', created=report.created, failed=report.failed)
+        return report.to_dict(), None
@@ -0,0 +1,129 @@
+"""
+User directory service for the admin user screens.
+"""
+from extensions import db
+from models import User, Role
+from sqlalchemy import select, func, literal, literal_column, or_, and_, tuple_, table as sql_table, column as sql_column
+from sqlalchemy.orm import aliased
+from services.search_service import SearchService, MIN_CASE_QUERY_LENGTH
+
+# The user directory can only be sorted on indexed columns
+USER_SORT_COLUMNS = ('name', 'email', 'created_at', 'id')
+# Sorted case-insensitively, on the lower() expression indexes
+CASELESS_SORT_COLUMNS = ('name', 'email')
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class UserService:
+    """Service class for listing and searching users."""
+
+    @staticmethod
+    def _sort_key(entity, sort):
+        column = getattr(entity, sort)
+        return func.lower(column) if sort in CASELESS_SORT_COLUMNS else column
+
+    @staticmethod
+    def _prefix_condition(text, dialect):
+        """Name or email starts with ``text``, ignoring case."""
+        if dialect == 'sqlite':
+            # A range on lower() is what the expression indexes can serve;
+            # SQLite's LIKE optimization only applies to plain columns
+            start = text.lower()
+            end = start[:-1] + chr(ord(start[-1]) + 1)
+            return or_(
+                and_(func.lower(User.name) >= start, func.lower(User.name) < end),
+                and_(func.lower(User.email) >= start, func.lower(User.email) < end),
+            )
+        pattern = _escape_like(text) + '%'
+        return or_(User.name.ilike(pattern, escape='\\'), User.email.ilike(pattern, escape='\\'))
+
+    @staticmethod
+    def _search_condition(text):
+        """
+        Condition matching users whose name or email contains every term.
+
+        Terms go through the trigram indexes (users_fts on SQLite, pg_trgm
+        on PostgreSQL). A term too short for a trigram turns the search
+        into a prefix match of the whole text instead ("jo" finds John).
+        """
+        dialect = db.session.get_bind().dialect.name
+        terms = text.split()
+        if any(len(term) < MIN_CASE_QUERY_LENGTH for term in terms):
+            return UserService._prefix_condition(text, dialect)
+
+        if dialect == 'sqlite':
+            users_fts = sql_table('users_fts', sql_column('rowid'))
+            matches = select(users_fts.c.rowid).where(
+                literal_column('users_fts').op('MATCH')(SearchService._trigram_query(text))
+            )
+            return User.id.in_(matches)
+
+        return and_(*(
+            or_(User.name.ilike(f'%{_escape_like(term)}%', escape='\\'),
+                User.email.ilike(f'%{_escape_like(term)}%', escape='\\'))
+            for term in terms
+        ))
+
+    @staticmethod
+    def _filter_conditions(role=None, status=None, search=None):
+        conditions = []
+        if role:
+            conditions.append(User.role == Role[role])
+        if status:
+            conditions.append(User.is_active.is_({'active': True, 'inactive': False}[status]))
+        if search:
+            conditions.append(UserService._search_condition(search))
+        return conditions
+
+    @staticmethod
+    def list_users(filters=None, sort='name', descending=False, limit=50, cursor=None):
+        """
+        Get one page of users.
+
+        ``filters`` may hold ``role`` (a Role name), ``status`` (active or
+        inactive) and ``search`` (text matched against names and emails).
+        Pages are keyed on (sort column, id): ``cursor`` is the id of the
+        last user of the previous page. ``limit=None`` returns every
+        matching user. Raises KeyError for an unknown role or status.
+
+        Returns:
+            (users, has_more)
+        """
+        sort_key = UserService._sort_key(User, sort)
+        query = select(User).where(*UserService._filter_conditions(**(filters or {})))
+
+        if cursor is not None:
+            if sort == 'id':
+                position, anchor = User.id, literal(cursor)
+            else:
+                anchor_user = aliased(User)
+                position = tuple_(sort_key, User.id)
+                anchor = tuple_(
+                    select(UserService._sort_key(anchor_user, sort))
+                    .where(anchor_user.id == cursor).scalar_subquery(),
+                    literal(cursor)
+                )
+            query = query.where(position < anchor if descending else position > anchor)
+
+        if descending:
+            query = query.order_by(sort_key.desc(), User.id.desc())
+        else:
+            query = query.order_by(sort_key.asc(), User.id.asc())
+
+        result = db.session.execute(query if limit is None else query.limit(limit + 1))
+        users = result.scalars().all()
+        if limit is None:
+            return users, False
+        # One extra row was fetched to learn whether another page exists
+        return users[:limit], len(users) > limit
+
+    @staticmethod
+    def count_users(filters=None):
+        """Count the users matching a directory's filters."""
+        return db.session.execute(
+            select(func.count()).select_from(User)
+            .where(*UserService._filter_conditions(**(filters or {})))
+        ).scalar_one()
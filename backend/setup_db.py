@@ -21,19 +21,15 @@ def setup_initial_data(app):
     with app.app_context():
         print("Starting database setup...")
         
-        # 1. Create all tables for sqlite or run migrations for other databases
-        db_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
-        if db_uri.startswith('sqlite'):
-            db.create_all()
-            print("Database tables created using create_all (sqlite).")
-        else:
-            # For production Postgres, run migrations (recommended)
-            try:
-                print("Running migrations (flask-migrate upgrade) for production DB...")
-                migrate_upgrade()
-                print("Migrations applied successfully.")
-            except Exception as e:
-                print(f"Failed to run migrations: {e}")
+        # 1. Create missing tables, then migrate existing ones (indexes etc.)
+        db.create_all()
+        print("Database tables created using create_all.")
+        try:
+            print("Running migrations (flask-migrate upgrade)...")
+            migrate_upgrade()
+            print("Migrations applied successfully.")
+        except Exception as e:
+            print(f"Failed to run migrations: {e}")
 
         # 2. Create Super Admin if none exists
         admin_email = "admin@1000hills.com"
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Activity log checks.
+Records events through the API, reads them back with filters and keyset
+pages, and applies the retention policy:
+
+    python -m pytest test_activity_log.py -q
+"""
+import os
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('TEST_DATABASE_URL', 'sqlite://')
+
+from datetime import datetime, timedelta
+
+from test_query_budget import app, client, people, auth_header, count_queries  # noqa: F401
+from extensions import db
+from models import ActivityEvent, ActivityDailyCount
+from services.activity_service import ActivityService, activity_log
+
+
+def test_changes_are_logged_in_batches(client, people):
+    client_headers = auth_header(people['client'])
+    staff_headers = auth_header(people['manager'])
+
+    with count_queries() as statements:
+        case = client.post('/cases/', headers=client_headers, json={
+            'title': 'Boundary dispute', 'category': 'PROPERTY_LAW', 'description': 'Fence moved'
+        }).get_json()['case']
+    # Recording only queues the event
+    assert not [s for s in statements if 'activity_events' in s]
+
+    client.put(f"/cases/admin/{case['id']}", headers=staff_headers, json={
+        'status': 'IN_PROGRESS', 'assigned_to_id': people['manager'].id
+    })
+    client.post(f"/cases/{case['id']}/notes/", headers=staff_headers, json={'content': 'Called client'})
+    client.post(f"/cases/{case['id']}/messages", headers=staff_headers, json={
+        'content': 'We are on it', 'recipient_id': people['client'].id
+    })
+
+    with count_queries() as statements:
+        assert activity_log.flush() == 5
+    # One multi-row INSERT for the whole batch
+    assert len(statements) == 1, statements
+
+    admin = auth_header(people['admin'])
+    log = client.get('/admin/activity-log', headers=admin).get_json()
+    assert [event['action'] for event in log['events']] == [
+        'message.sent', 'note.created', 'case.assigned', 'case.updated', 'case.created',
+    ]
+    created = log['events'][-1]
+    assert created['user'] == 'client'
+    assert created['details']['reference'] == case['case_id']
+    assert log['events'][0]['user'] == 'manager'
+
+    by_manager = client.get(f"/admin/activity-log?actor_id={people['manager'].id}&limit=3", headers=admin).get_json()
+    assert by_manager['has_more']
+    rest = client.get(
+        f"/admin/activity-log?actor_id={people['manager'].id}&limit=3&cursor={by_manager['next_cursor']}",
+        headers=admin
+    ).get_json()
+    assert [e['id'] for e in by_manager['events'] + rest['events']] == [e['id'] for e in log['events'][:4]]
+    assert not rest['has_more']
+
+    tomorrow = (datetime.utcnow() + timedelta(days=1)).isoformat()
+    assert client.get(f'/admin/activity-log?since={tomorrow}', headers=admin).get_json()['events'] == []
+    assert client.get('/admin/activity-log?since=yesterday', headers=admin).status_code == 400
+    assert client.get('/admin/activity-log', headers=staff_headers).status_code == 403
+
+
+def test_retention_rolls_up_old_events(client, people):
+    now = datetime.utcnow()
+    db.session.add_all(
+        [ActivityEvent(occurred_at=now - timedelta(days=400, hours=n), action='case.updated') for n in range(3)]
+        + [ActivityEvent(occurred_at=now - timedelta(days=400), action='case.created')]
+        + [ActivityEvent(occurred_at=now - timedelta(days=2), action='case.updated')]
+    )
+    db.session.commit()
+
+    deleted, error = ActivityService.prune(365, batch_size=2)
+    assert error is None
+    assert deleted == 4
+    assert [event.occurred_at.date() for event in ActivityEvent.query] == [(now - timedelta(days=2)).date()]
+    assert sum(rollup.count for rollup in ActivityDailyCount.query) == 4
+
+    # Pruning again adds to the existing daily counts
+    db.session.add(ActivityEvent(occurred_at=now - timedelta(days=400), action='case.created'))
+    db.session.commit()
+    ActivityService.prune(365)
+    daily = client.get('/admin/activity-log/daily', headers=auth_header(people['admin'])).get_json()
+    assert sum(row['count'] for row in daily if row['action'] == 'case.created') == 2
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Case reference allocation checks.
+Submits cases from many threads at once against a SQLite file database and
+checks that every case gets its own reference:
+
+    python -m pytest test_case_references.py -q
+"""
+import os
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('TEST_DATABASE_URL', 'sqlite://')
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from config.settings import TestingConfig
+from extensions import db
+from models import Case, CaseSequence, Role, User
+
+THREADS = 16
+CASES_PER_THREAD = 8
+
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    # In-memory SQLite shares one connection between threads; a file
+    # database gives each thread its own connection and real locking
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'cases.db'}")
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_concurrent_submissions_get_unique_references(file_app):
+    from services import CaseService
+
+    client = User(email='client@example.com', password_hash='x', name='client', role=Role.CLIENT)
+    db.session.add(client)
+    db.session.commit()
+    client_id = client.id
+
+    errors = []
+    start = threading.Barrier(THREADS)
+
+    def submit():
+        with file_app.app_context():
+            start.wait()
+            for n in range(CASES_PER_THREAD):
+                case, error = CaseService.create_case(f'Case {n}', 'Details', 'OTHER', client_id)
+                if error:
+                    errors.append(error)
+            db.session.remove()
+
+    threads = [threading.Thread(target=submit) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    references = [case_id for (case_id,) in db.session.execute(db.select(Case.case_id))]
+    year = datetime.now().year
+    expected = THREADS * CASES_PER_THREAD
+    assert sorted(references) == [f'1000HILLS-{year}-{n:03d}' for n in range(1, expected + 1)]
+    assert db.session.get(CaseSequence, year).last_value == expected
+
+
+def test_sequence_continues_after_existing_references(file_app):
+    from services import CaseService
+
+    year = datetime.now().year
+    client = User(email='client@example.com', password_hash='x', name='client', role=Role.CLIENT)
+    db.session.add(client)
+    db.session.flush()
+    # A case numbered before the counter existed
+    db.session.add(Case(case_id=f'1000HILLS-{year}-041', title='Old', category='OTHER', client_id=client.id))
+    db.session.commit()
+
+    case, error = CaseService.create_case('New', 'Details', 'OTHER', client.id)
+    assert error is None
+    assert case.case_id == f'1000HILLS-{year}-042'
@@ -0,0 +1,881 @@
+#!/usr/bin/env python3
+"""
+Query budget checks for the busiest API endpoints.
+Runs in-process against an in-memory SQLite database:
+
+    python -m pytest test_query_budget.py -q
+"""
+import os
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('TEST_DATABASE_URL', 'sqlite://')
+
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from extensions import db
+from models import User, Case, Message, Role, CaseCategory
+
+
+@pytest.fixture
+def app():
+    from services.case_service import CaseService
+    from services.activity_service import activity_log
+    from services.auth_service import token_versions
+    from services.revocation_service import token_blocklist
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        # Cached dashboard statistics and queued events must not leak between databases
+        CaseService.invalidate_statistics()
+        token_versions.clear()
+        activity_log.discard()
+        # Loaded up front so its first query is not counted by a test
+        token_blocklist.clear()
+        token_blocklist.refresh()
+        yield app
+        activity_log.discard()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@contextmanager
+def count_queries():
+    """Collect every SQL statement sent to the database inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def make_user(email, role):
+    user = User(email=email, password_hash='x', name=email.split('@')[0], role=role)
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def auth_header(user):
+    token = create_access_token(identity=str(user.id), additional_claims={'role': user.role.value})
+    return {'Authorization': f'Bearer {token}'}
+
+
+def seed_cases(count, client_user, manager, messages_per_case=3):
+    """Create cases with a short exchange of messages between client and manager."""
+    start = Case.query.count()
+    for i in range(start, start + count):
+        case = Case(
+            case_id=f'1000HILLS-2024-{i + 1:03d}',
+            title=f'Case {i}',
+            category=CaseCategory.OTHER,
+            client_id=client_user.id,
+            assigned_to_id=manager.id
+        )
+        db.session.add(case)
+        db.session.flush()
+        for n in range(messages_per_case):
+            sender, recipient = (manager, client_user) if n % 2 == 0 else (client_user, manager)
+            db.session.add(Message(
+                case_id=case.id,
+                sender_id=sender.id,
+                recipient_id=recipient.id,
+                content=f'Message {n} on case {i}',
+                read=False
+            ))
+    db.session.commit()
+
+
+@pytest.fixture
+def people(app):
+    people = {
+        'admin': make_user('admin@example.com', Role.SUPER_ADMIN),
+        'manager': make_user('manager@example.com', Role.CASE_MANAGER),
+        'client': make_user('client@example.com', Role.CLIENT),
+    }
+    db.session.commit()
+    return people
+
+
+def test_conversations_query_count_is_constant(client, people):
+    headers = auth_header(people['client'])
+    counts = []
+    for batch in (5, 50):
+        seed_cases(batch, people['client'], people['manager'])
+        db.session.expire_all()
+        with count_queries() as statements:
+            response = client.get('/messages/conversations', headers=headers)
+        assert response.status_code == 200
+        counts.append(len(statements))
+    assert counts[0] == counts[1] <= 2, counts
+
+    data = response.get_json()
+    assert data['total'] == 55
+    first = data['conversations'][0]
+    assert first['message_count'] == 3
+    # Two of the three messages in each case were sent by the manager to the client
+    assert first['unread_count'] == 2
+    assert first['other_party']['id'] == people['manager'].id
+    assert first['last_message']['content'].startswith('Message 2')
+
+
+def test_conversations_are_paginated(client, people):
+    seed_cases(7, people['client'], people['manager'])
+    headers = auth_header(people['admin'])
+
+    page = client.get('/messages/conversations?limit=5&offset=5', headers=headers).get_json()
+    assert page['total'] == 7
+    assert len(page['conversations']) == 2
+
+    past_end = client.get('/messages/conversations?limit=5&offset=10', headers=headers).get_json()
+    assert past_end['total'] == 7
+    assert past_end['conversations'] == []
+
+
+def test_case_messages_query_count_is_constant(client, people):
+    headers = auth_header(people['client'])
+    counts = []
+    for messages_per_case in (4, 40):
+        seed_cases(1, people['client'], people['manager'], messages_per_case=messages_per_case)
+        case_id = Case.query.order_by(Case.id.desc()).first().id
+        db.session.expire_all()
+        with count_queries() as statements:
+            response = client.get(f'/cases/{case_id}/messages', headers=headers)
+        assert response.status_code == 200
+        assert len(response.get_json()['messages']) == messages_per_case
+        counts.append(len(statements))
+    assert counts[0] == counts[1] <= 6, counts
+
+    # The whole case is only counted on request; count is the page
+    assert 'total' not in response.get_json()
+    page = client.get(f'/cases/{case_id}/messages?limit=10&include_total=true', headers=headers).get_json()
+    assert (page['total'], page['count']) == (40, 10)
+
+    messages = response.get_json()['messages']
+    assert {m['sender']['email'] for m in messages} == {'manager@example.com', 'client@example.com'}
+    assert all(m['recipient']['email'] != m['sender']['email'] for m in messages)
+
+
+def test_admin_message_feed_query_count_is_constant(client, people):
+    seed_cases(30, people['client'], people['manager'])
+    headers = auth_header(people['admin'])
+    counts = []
+    for limit in (5, 80):
+        db.session.expire_all()
+        with count_queries() as statements:
+            response = client.get(f'/messages/all?limit={limit}', headers=headers)
+        assert response.status_code == 200
+        assert len(response.get_json()['messages']) == limit
+        counts.append(len(statements))
+    assert counts[0] == counts[1] <= 6, counts
+
+    message = response.get_json()['messages'][0]
+    assert message['case_title'].startswith('Case ')
+    assert message['sender']['role'] in ('CLIENT', 'CASE_MANAGER')
+
+
+def test_case_thread_keyset_pagination(client, people):
+    seed_cases(1, people['client'], people['manager'], messages_per_case=25)
+    case_id = Case.query.first().id
+    expected = [m.id for m in Message.query.order_by(Message.created_at.desc(), Message.id.desc())]
+    headers = auth_header(people['client'])
+
+    seen = []
+    url = f'/cases/{case_id}/messages?limit=10'
+    while True:
+        page = client.get(url, headers=headers).get_json()
+        seen.extend(m['id'] for m in page['messages'])
+        if not page['has_more']:
+            break
+        url = f"/cases/{case_id}/messages?limit=10&before={page['older_cursor']}"
+    assert seen == expected
+
+    newer = client.get(f'/cases/{case_id}/messages?limit=5&after={expected[8]}', headers=headers).get_json()
+    assert [m['id'] for m in newer['messages']] == expected[3:8]
+    assert newer['has_more'] is True
+
+
+def test_unread_counters_follow_messages(app, client, people):
+    from extensions import socketio
+    from services.unread_service import UnreadCounterService
+
+    seed_cases(1, people['client'], people['manager'], messages_per_case=0)
+    case_id = Case.query.first().id
+    client_id = people['client'].id
+    socket = socketio.test_client(app, auth={'token': auth_header(people['client'])['Authorization'][7:]})
+
+    for n in range(3):
+        response = client.post(
+            f'/cases/{case_id}/messages',
+            json={'recipient_id': client_id, 'content': f'Update {n}'},
+            headers=auth_header(people['manager'])
+        )
+        assert response.status_code == 201
+
+    pushes = [e for e in socket.get_received() if e['name'] == 'unread_count']
+    assert [p['args'][0]['unread_count'] for p in pushes] == [1, 2, 3]
+
+    headers = auth_header(people['client'])
+    assert client.get('/messages/unread-count', headers=headers).get_json()['unread_count'] == 3
+
+    message_id = response.get_json()['data']['id']
+    assert client.put(f'/messages/{message_id}/read', headers=headers).status_code == 200
+    # Marking the same message twice must not decrement again
+    assert client.put(f'/messages/{message_id}/read', headers=headers).status_code == 200
+    data = client.get('/messages/unread-count?by_case=true', headers=headers).get_json()
+    assert data == {'unread_count': 2, 'by_case': {str(case_id): 2}}
+
+    UnreadCounterService.rebuild()
+    assert UnreadCounterService.get_total(client_id) == 2
+    socket.disconnect()
+
+
+def test_mark_read_up_to_message(app, client, people):
+    from extensions import socketio
+    from services.unread_service import UnreadCounterService
+
+    seed_cases(1, people['client'], people['manager'], messages_per_case=10)
+    UnreadCounterService.rebuild()
+    case_id = Case.query.first().id
+    client_id = people['client'].id
+    thread = [m.id for m in Message.query.order_by(Message.created_at, Message.id)]
+    headers = auth_header(people['client'])
+
+    # Messages 0, 2, 4, 6 and 8 were sent to the client; read up to message 5
+    response = client.post(f'/cases/{case_id}/messages/read', json={'up_to_message_id': thread[5]}, headers=headers)
+    assert response.get_json()['marked'] == 3
+    assert response.get_json()['unread_count'] == 2
+    assert UnreadCounterService.get_total(client_id) == 2
+
+    # Reading an older message again leaves the watermark where it is
+    response = client.post(f'/cases/{case_id}/messages/read', json={'up_to_message_id': thread[1]}, headers=headers)
+    assert response.get_json()['marked'] == 0
+    page = client.get(f'/cases/{case_id}/messages', headers=headers).get_json()
+    assert page['last_read_message_id'] == thread[5]
+
+    # A message read on its own past the watermark is no longer counted
+    assert client.put(f'/messages/{thread[8]}/read', headers=headers).status_code == 200
+    response = client.post(f'/cases/{case_id}/messages/read', json={'up_to_message_id': thread[5]}, headers=headers)
+    assert response.get_json()['unread_count'] == UnreadCounterService.get_total(client_id) == 1
+    response = client.post(f'/cases/{case_id}/messages/read', json={'up_to_message_id': 999999}, headers=headers)
+    assert response.status_code == 400
+
+    socket = socketio.test_client(app, auth={'token': headers['Authorization'][7:]})
+    socket.get_received()
+    socket.emit('mark_read', {'token': headers['Authorization'][7:], 'case_id': case_id})
+    pushes = [e for e in socket.get_received() if e['name'] == 'unread_count']
+    assert pushes[-1]['args'][0]['unread_count'] == 0
+    page = client.get(f'/cases/{case_id}/messages', headers=headers).get_json()
+    assert page['last_read_message_id'] == thread[-1]
+    assert all(m['read'] for m in page['messages'] if m['recipient']['id'] == client_id)
+    socket.disconnect()
+
+
+def test_search_ranks_highlights_and_filters(client, people):
+    from models import CaseNote
+
+    seed_cases(2, people['client'], people['manager'], messages_per_case=1)
+    other_client = make_user('other@example.com', Role.CLIENT)
+    seed_cases(1, other_client, people['manager'], messages_per_case=0)
+    first, second, other = Case.query.order_by(Case.id).all()
+
+    message = Message.query.filter_by(case_id=first.id).first()
+    message.content = 'The tenancy agreement was signed; the tenancy deposit is still held'
+    db.session.add(Message(case_id=second.id, sender_id=people['manager'].id,
+                           recipient_id=people['client'].id, content='Deposit receipt <img src=x onerror=alert(1)> attached'))
+    db.session.add(Message(case_id=other.id, sender_id=people['manager'].id,
+                           recipient_id=other_client.id, content='Your tenancy deposit'))
+    db.session.add(CaseNote(case_id=first.id, author_id=people['manager'].id,
+                            content='Deposit dispute looks weak', is_private=True))
+    db.session.commit()
+
+    results = client.get('/search?q=deposit', headers=auth_header(people['client'])).get_json()['results']
+    # The client sees neither the other client's case nor private notes
+    assert {(r['type'], r['case_id']) for r in results} == {('message', first.id), ('message', second.id)}
+    assert '<mark>deposit</mark>' in results[0]['snippet'].lower()
+    # Message text is escaped; only the highlights are markup
+    receipt = next(r['snippet'] for r in results if r['case_id'] == second.id)
+    assert receipt.startswith('<mark>Deposit</mark> receipt &lt;img') and '<img' not in receipt
+
+    results = client.get('/search?q=tenancy deposit', headers=auth_header(people['client'])).get_json()['results']
+    assert [r['id'] for r in results] == [message.id]
+
+    staff = client.get('/search?q=deposit&type=note', headers=auth_header(people['manager'])).get_json()['results']
+    assert [r['type'] for r in staff] == ['note']
+
+
+def test_search_database_errors_are_not_client_errors(client, people, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    from services.search_service import SearchService
+    from services.case_service import CaseService
+
+    def broken(*args, **kwargs):
+        raise OperationalError('SELECT', {}, Exception('database is locked'))
+
+    monkeypatch.setattr(SearchService, '_search_table', broken)
+    monkeypatch.setattr(CaseService, '_row_columns', broken)
+    # Raised (a 500 outside TESTING) instead of a 400 carrying the driver message
+    with pytest.raises(OperationalError):
+        client.get('/search?q=deposit', headers=auth_header(people['client']))
+    with pytest.raises(OperationalError):
+        client.get('/cases/admin/search?q=deposit', headers=auth_header(people['manager']))
+    # Bad input is still a 400
+    assert client.get('/search?q=', headers=auth_header(people['client'])).status_code == 400
+    assert client.get('/cases/admin/search?q=ab', headers=auth_header(people['manager'])).status_code == 400
+
+
+def test_case_search_by_reference_name_and_words(client, people):
+    other_client = make_user('other@example.com', Role.CLIENT)
+    other_client.name = 'Agnes Uwimana'
+    seed_cases(12, people['client'], people['manager'], messages_per_case=0)
+    seed_cases(1, other_client, people['manager'], messages_per_case=0)
+    cases = Case.query.order_by(Case.id).all()
+    cases[3].title = 'Boundary dispute with neighbour'
+    cases[5].description = 'The neighbour moved the boundary fence last spring'
+    db.session.commit()
+    headers = auth_header(people['manager'])
+
+    def search(query):
+        response = client.get(f'/cases/admin/search?{query}', headers=headers)
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+
+    # Partial references match anywhere in the case_id
+    assert {c['case_id'] for c in search('q=2024-01')['cases']} == {
+        '1000HILLS-2024-010', '1000HILLS-2024-011', '1000HILLS-2024-012', '1000HILLS-2024-013',
+    }
+    # Title matches rank above description matches
+    assert [c['id'] for c in search('q=boundary')['cases']] == [cases[3].id, cases[5].id]
+    assert [c['id'] for c in search('q=uwimana&fields=id,client')['cases']] == [cases[-1].id]
+
+    page = search('q=1000HILLS&limit=5&fields=id,case_id')
+    assert page['has_more'] and len(page['cases']) == 5
+    assert set(page['cases'][0]) == {'id', 'case_id', 'score'}
+    assert search('q=1000HILLS&limit=5&offset=10')['has_more'] is False
+    assert len(search('q=1000HILLS&status=PENDING')['cases']) == 13
+
+    assert client.get('/cases/admin/search?q=ab', headers=headers).status_code == 400
+    assert client.get('/cases/admin/search?q=boundary', headers=auth_header(people['client'])).status_code == 403
+
+
+def test_case_timeline_merges_every_kind(client, people):
+    from datetime import datetime, timedelta
+    from models import Appointment, CaseNote, Deadline, Document
+
+    seed_cases(1, people['client'], people['manager'], messages_per_case=0)
+    case = Case.query.first()
+    start = datetime(2026, 3, 1, 9, 0)
+    manager, client_user = people['manager'], people['client']
+    for n in range(6):
+        at = start + timedelta(days=n)
+        db.session.add(Message(case_id=case.id, sender_id=manager.id, recipient_id=client_user.id,
+                               content=f'Message {n}', created_at=at))
+        db.session.add(CaseNote(case_id=case.id, author_id=manager.id, content=f'Note {n}',
+                                is_private=n % 2 == 0, created_at=at + timedelta(hours=1)))
+    db.session.add(Deadline(case_id=case.id, title='File defence', due_date=start + timedelta(days=2)))
+    db.session.add(Document(case_id=case.id, filename='lease.pdf', file_path='/docs/lease.pdf',
+                            uploaded_by_id=client_user.id, created_at=start + timedelta(days=2)))
+    db.session.add(Appointment(title='Consultation', case_id=case.id, client_id=client_user.id,
+                               attorney_id=manager.id, start_datetime=start + timedelta(days=4),
+                               end_datetime=start + timedelta(days=4, hours=1)))
+    db.session.commit()
+
+    staff = auth_header(manager)
+    url = f'/cases/{case.id}/timeline'
+    db.session.expire_all()
+    with count_queries() as statements:
+        feed = client.get(url, headers=staff).get_json()
+    # User, case, then one bounded query per kind
+    assert len(statements) == 7, statements
+    events = feed['events']
+    assert len(events) == 15 and not feed['has_more']
+    assert [e['timestamp'] for e in events] == sorted((e['timestamp'] for e in events), reverse=True)
+    # Same timestamp: ordered by kind
+    assert [e['type'] for e in events if e['timestamp'].startswith('2026-03-03T09')] == ['message', 'deadline', 'document']
+    assert events[0] == {**events[0], 'type': 'note', 'content': 'Note 5', 'author_name': 'manager'}
+
+    pages, url = [], f'/cases/{case.id}/timeline?limit=4'
+    while url:
+        page = client.get(url, headers=staff).get_json()
+        pages.append(page['events'])
+        url = page['next_cursor'] and f"/cases/{case.id}/timeline?limit=4&cursor={quote(page['next_cursor'])}"
+    assert [len(p) for p in pages] == [4, 4, 4, 3]
+    assert sum(pages, []) == events
+
+    own = client.get(f'/cases/{case.id}/timeline?types=note', headers=auth_header(client_user)).get_json()
+    # Clients never see private notes
+    assert [e['content'] for e in own['events']] == ['Note 5', 'Note 3', 'Note 1']
+    assert client.get(f'/cases/{case.id}/timeline?types=email', headers=staff).status_code == 400
+    assert client.get(f'/cases/{case.id}/timeline?cursor=yesterday', headers=staff).status_code == 400
+
+
+def test_role_checks_load_the_user_once_and_honor_token_versions(app, client, people):
+    seed_cases(1, people['client'], people['manager'], messages_per_case=0)
+    case_id = Case.query.first().id
+    manager_id = people['manager'].id
+    staff, admin = auth_header(people['manager']), auth_header(people['admin'])
+    db.session.expire_all()
+    with count_queries() as statements:
+        response = client.post(f'/cases/{case_id}/notes/', headers=staff, json={'content': 'Called client'})
+    assert response.status_code == 201
+    # Token check, role_required and the route share one lookup
+    assert sum('FROM users' in s for s in statements) == 1, statements
+
+    app.config['JWT_TRUST_ROLE_CLAIM'] = True
+    with count_queries() as statements:
+        assert client.get('/admin/realtime-metrics', headers=admin).status_code == 200
+        assert client.get('/admin/realtime-metrics', headers=admin).status_code == 200
+    # Only the first request reads the token version; roles come from the claim
+    assert len(statements) == 1 and 'token_version' in statements[0], statements
+
+    response = client.put(f'/admin/users/{manager_id}', headers=admin, json={'role': 'CLIENT'})
+    assert response.status_code == 200
+    # The old token carries the old role and is refused at once
+    response = client.get(f'/cases/{case_id}/notes/', headers=staff)
+    assert response.status_code == 401 and response.get_json()['error'] == 'token_revoked'
+    fresh = create_access_token(identity=str(manager_id), additional_claims={'role': 'CLIENT', 'ver': 1})
+    response = client.post(f'/cases/{case_id}/notes/', headers={'Authorization': f'Bearer {fresh}'}, json={'content': 'x'})
+    assert response.status_code == 403
+
+    app.config['JWT_TRUST_ROLE_CLAIM'] = False
+    assert client.get(f'/cases/{case_id}/notes/', headers=staff).status_code == 401
+    from utils.passwords import passwords
+    User.query.get(manager_id).password_hash = passwords.hash('secret')
+    db.session.commit()
+    credentials = {'email': 'manager@example.com', 'password': 'secret'}
+    response = client.post(f'/admin/users/{manager_id}/toggle-status', headers=admin)
+    assert response.get_json()['user']['is_active'] is False
+    # Deactivating revoked the token issued after the role change
+    assert client.get('/auth/me', headers={'Authorization': f'Bearer {fresh}'}).status_code == 401
+    # and the user cannot log back in for a new one
+    response = client.post('/auth/login', json=credentials)
+    assert response.status_code == 401 and response.get_json()['msg'] == 'Account is deactivated'
+    client.post(f'/admin/users/{manager_id}/toggle-status', headers=admin)
+    assert client.post('/auth/login', json=credentials).status_code == 200
+
+
+def test_logout_revokes_the_token_without_a_query_per_request(app, client, people):
+    import uuid
+    from datetime import datetime, timedelta
+    from flask_jwt_extended import decode_token
+    from models import RevokedToken
+    from services.revocation_service import token_blocklist
+
+    app.config['JWT_TRUST_ROLE_CLAIM'] = True
+    headers = auth_header(people['client'])
+    assert client.get('/auth/protected', headers=headers).status_code == 200
+    with count_queries() as statements:
+        assert client.get('/auth/protected', headers=headers).status_code == 200
+    # The blocklist is checked in memory
+    assert not any('revoked_tokens' in s for s in statements), statements
+
+    assert client.post('/auth/logout', headers=headers).status_code == 200
+    response = client.get('/auth/protected', headers=headers)
+    assert response.status_code == 401 and response.get_json()['error'] == 'token_revoked'
+    # Only that token; the user's other sessions keep working
+    assert client.get('/auth/protected', headers=auth_header(people['client'])).status_code == 200
+
+    # A revocation made by another worker shows up on the next refresh
+    other = auth_header(people['manager'])
+    token = create_access_token(identity=str(people['manager'].id), additional_claims={'role': 'CASE_MANAGER'})
+    jti = decode_token(token)['jti']
+    now = datetime.utcnow()
+    db.session.add_all([
+        RevokedToken(jti=jti, user_id=people['manager'].id, revoked_at=now, expires_at=now + timedelta(hours=1)),
+        RevokedToken(jti=str(uuid.uuid4()), revoked_at=now - timedelta(hours=2), expires_at=now - timedelta(hours=1)),
+    ])
+    db.session.commit()
+    assert client.get('/auth/protected', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+    with count_queries() as statements:
+        token_blocklist.refresh()
+    # Incremental: only rows revoked since the last refresh
+    assert len(statements) == 1 and 'revoked_at >=' in statements[0], statements
+    assert client.get('/auth/protected', headers={'Authorization': f'Bearer {token}'}).status_code == 401
+    assert client.get('/auth/protected', headers=other).status_code == 200
+
+    # Expired tokens are pruned; live revocations are kept
+    assert token_blocklist.prune() == 1
+    assert RevokedToken.query.count() == 2
+
+
+def test_password_hashing_is_capped_and_sheds_load(client, monkeypatch):
+    import threading
+    from utils.passwords import PasswordHasher, HashingBusy, passwords
+
+    hasher = PasswordHasher(concurrency=2, max_waiting=2)
+    release, peak, running = threading.Event(), [], []
+
+    def slow_hash(n):
+        running.append(n)
+        peak.append(len(running))
+        release.wait(5)
+        running.remove(n)
+        return n
+
+    threads = [threading.Thread(target=hasher._run, args=('hashes', slow_hash, n)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    while hasher.get_metrics()['waiting'] < 2:
+        threading.Event().wait(0.01)
+    # Two hashing, two queued: the next caller is turned away
+    with pytest.raises(HashingBusy):
+        hasher._run('hashes', slow_hash, 5)
+    release.set()
+    for thread in threads:
+        thread.join()
+    metrics = hasher.get_metrics()
+    assert max(peak) == 2 and metrics['hashes'] == 4 and metrics['rejected'] == 1
+    assert metrics['max_waiting_seen'] == 2 and metrics['waiting'] == metrics['active'] == 0
+
+    account = {'email': 'new@example.com', 'password': 's3cret-pass', 'name': 'New'}
+    assert client.post('/auth/register', json=account).status_code == 201
+    assert client.post('/auth/login', json=account).status_code == 200
+    assert client.post('/auth/login', json={**account, 'password': 'wrong'}).status_code == 401
+
+    monkeypatch.setattr(passwords, 'max_waiting', 0)
+    response = client.post('/auth/login', json=account)
+    assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+
+
+def test_user_directory_searches_and_pages_in_sql(client, people):
+    for name in ('John Smith', 'Joan Smithers', 'Mary Jones', 'Peter Blacksmith', 'Ann Lee'):
+        make_user(f"{name.split()[0].lower()}@clients.example.com", Role.CLIENT).name = name
+    db.session.commit()
+    admin = auth_header(people['admin'])
+
+    def names(url):
+        response = client.get(url, headers=admin)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        return [user['name'] for user in (body if isinstance(body, list) else body['users'])]
+
+    # Substrings of names and emails, case-insensitive, every term must match
+    assert names('/admin/users?search=SMITH') == ['Joan Smithers', 'John Smith', 'Peter Blacksmith']
+    assert names('/admin/users?search=smith joan') == ['Joan Smithers']
+    assert names('/admin/users?search=clients.example&role=CLIENT&sort=-name')[:2] == ['Peter Blacksmith', 'Mary Jones']
+    # Too short for a trigram: a prefix of the name or email
+    assert names('/admin/users?search=jo') == ['Joan Smithers', 'John Smith']
+    assert names('/admin/users?search=ma') == ['manager', 'Mary Jones']
+    assert names('/admin/users?status=inactive') == []
+
+    pages, url = [], '/admin/users?limit=3&sort=-name&include_total=true'
+    while url:
+        db.session.expire_all()
+        with count_queries() as statements:
+            page = client.get(url, headers=admin).get_json()
+        # The admin, the page and the total
+        assert len(statements) == 3, statements
+        pages.append([user['name'] for user in page['users']])
+        url = page['next_cursor'] and f"/admin/users?limit=3&sort=-name&include_total=true&cursor={page['next_cursor']}"
+    assert [len(p) for p in pages] == [3, 3, 2] and page['total'] == 8
+    assert sum(pages, []) == sorted(sum(pages, []), key=str.lower, reverse=True)
+    assert client.get('/admin/users?sort=password_hash', headers=admin).status_code == 400
+    assert client.get('/admin/users?role=OWNER', headers=admin).status_code == 400
+
+
+def test_bulk_user_import_reports_rows_and_batches(app, client, people):
+    import io
+    import json
+    from extensions import bcrypt
+
+    app.config['USER_IMPORT_BATCH_SIZE'] = 3
+    migrated_hash = bcrypt.generate_password_hash('migrated').decode('utf-8')
+    csv_body = '\n'.join([
+        'email,name,password,role,phone,password_hash',
+        'ada@firm.example,Ada,pw-ada,CASE_MANAGER,,',
+        'not-an-email,Bob,pw-bob,,,',
+        'CLIENT@example.com,Existing,pw,,,',
+        'cy@firm.example,Cy,pw-cy,,+250 788 000 000,',
+        'ADA@firm.example,Ada again,pw,,,',
+        'dee@firm.example,Dee,pw-dee,OWNER,,',
+        f'eve@firm.example,Eve,,VIEWER,,{migrated_hash}',
+    ]) + '\n'
+    from utils.passwords import passwords
+
+    admin = auth_header(people['admin'])
+    hashes = passwords.get_metrics()['hashes']
+    with count_queries() as statements:
+        response = client.post('/admin/users/import', data=csv_body, headers={**admin, 'Content-Type': 'text/csv'})
+    report = response.get_json()
+    assert response.status_code == 200, report
+    assert (report['rows'], report['created'], report['failed']) == (7, 3, 4)
+    # Plaintext passwords were hashed through the shared, capped hasher
+    assert passwords.get_metrics()['hashes'] - hashes == 2
+    assert [(e['row'], e['error']) for e in report['errors']] == [
+        (2, 'Invalid email'), (3, 'Email already registered'),
+        (5, 'Duplicate email in file'), (6, 'Invalid role: OWNER'),
+    ]
+    # Per batch of three rows: one email check and one INSERT
+    assert sum(s.lstrip().startswith('INSERT INTO users') for s in statements) == 3
+    assert sum('lower(users.email) IN' in s for s in statements) == 3
+
+    ada = User.query.filter_by(email='ada@firm.example').one()
+    assert ada.role == Role.CASE_MANAGER and ada.password_hash.startswith('$2')
+    assert User.query.filter_by(email='cy@firm.example').one().phone == '+250 788 000 000'
+    assert client.post('/auth/login', json={'email': 'eve@firm.example', 'password': 'migrated'}).status_code == 200
+    assert client.post('/auth/login', json={'email': 'cy@firm.example', 'password': 'pw-cy'}).status_code == 200
+
+    lines = [json.dumps({'email': 'fay@firm.example', 'name': 'Fay', 'password': 'pw'}), '[1, 2]', '',
+             json.dumps({'email': 'cy@firm.example', 'name': 'Cy', 'password': 'pw'})]
+    upload = {'file': (io.BytesIO('\n'.join(lines).encode()), 'people.ndjson')}
+    report = client.post('/admin/users/import', data=upload, headers=admin, content_type='multipart/form-data').get_json()
+    assert (report['format'], report['rows'], report['created']) == ('ndjson', 3, 1)
+    assert [(e['row'], e['error']) for e in report['errors']] == [
+        (2, 'Not a JSON object'), (3, 'Email already registered'),
+    ]
+    assert client.post('/admin/users/import?format=xml', data='<users/>', headers=admin).status_code == 400
+    assert client.post('/admin/users/import', data=csv_body, headers=auth_header(people['manager'])).status_code == 403
+
+
+def test_socket_session_is_bound_at_connect(app, people, monkeypatch):
+    import websockets.handlers as handlers
+    from extensions import socketio
+    from websockets.sessions import session_count
+
+    seed_cases(1, people['client'], people['manager'], messages_per_case=0)
+    case_id = Case.query.first().id
+    socket = socketio.test_client(app, auth={'token': auth_header(people['client'])['Authorization'][7:]})
+    socket.emit('join_case', {'case_id': case_id})
+    socket.get_received()
+    assert session_count() == 1
+
+    decodes = []
+    monkeypatch.setattr(handlers, 'decode_token', lambda token: decodes.append(token))
+    db.session.expire_all()
+    with count_queries() as statements:
+        socket.emit('send_message', {'case_id': case_id, 'content': 'Hello'})
+    writes = [s for s in statements if s.lstrip().upper().startswith(('INSERT', 'UPDATE'))]
+
+    assert decodes == []
+    assert [e['args'][0]['sender_name'] for e in socket.get_received() if e['name'] == 'new_message'] == ['client']
+    # The message insert and the counter upsert share one transaction
+    assert len(writes) == 2 and sum(s.strip() == 'COMMIT' for s in statements) <= 1, statements
+
+    monkeypatch.undo()
+    # A token for someone else cannot take over the connection and its rooms
+    socket.emit('reauthenticate', {'token': auth_header(people['manager'])['Authorization'][7:]})
+    assert [e['args'][0]['error'] for e in socket.get_received() if e['name'] == 'error'] == ['invalid_token']
+    socket.emit('reauthenticate', {'token': auth_header(people['client'])['Authorization'][7:]})
+    assert [e['name'] for e in socket.get_received()] == ['status']
+
+    socket.disconnect()
+    assert session_count() == 0
+
+    # Joining a room re-checks the token version, so a deactivated user is cut off
+    from services.auth_service import AuthService
+    socket = socketio.test_client(app, auth={'token': auth_header(people['client'])['Authorization'][7:]})
+    socket.get_received()
+    AuthService.revoke_tokens(people['client'])
+    socket.emit('join_case', {'case_id': case_id})
+    assert not socket.is_connected() and session_count() == 0
+
+    # Sending and marking read re-check too: a logged-out token cannot post
+    from datetime import datetime
+    from services.revocation_service import token_blocklist
+    from flask_jwt_extended import decode_token
+    token = create_access_token(identity=str(people['client'].id),
+                                additional_claims={'role': 'CLIENT', 'ver': people['client'].token_version})
+    socket = socketio.test_client(app, auth={'token': token})
+    socket.get_received()
+    claims = decode_token(token)
+    token_blocklist.revoke(claims['jti'], people['client'].id, datetime.utcfromtimestamp(claims['exp']))
+    sent = Message.query.count()
+    socket.emit('send_message', {'case_id': case_id, 'content': 'After logout'})
+    assert Message.query.count() == sent
+    assert not socket.is_connected() and session_count() == 0
+
+
+def test_case_statistics_are_aggregated_and_cached(client, people):
+    from services.case_service import CaseService
+
+    headers = auth_header(people['manager'])
+    counts = []
+    for batch in (5, 50):
+        seed_cases(batch, people['client'], people['manager'], messages_per_case=0)
+        CaseService.invalidate_statistics()
+        with count_queries() as statements:
+            response = client.get('/cases/statistics', headers=headers)
+        counts.append(len([s for s in statements if 'FROM cases' in s]))
+    assert counts == [1, 1], counts
+
+    stats = response.get_json()
+    assert stats['total'] == 55 and stats['pending'] == 55 and stats['my_cases'] == 55
+    assert stats['by_priority']['medium'] == 55
+
+    with count_queries() as statements:
+        assert client.get('/cases/statistics', headers=headers).get_json() == stats
+    assert not [s for s in statements if 'FROM cases' in s]
+
+    # Updating a case invalidates the snapshot
+    case_id = Case.query.first().id
+    client.put(f'/cases/admin/{case_id}', json={'status': 'CLOSED'}, headers=headers)
+    stats = client.get('/cases/statistics', headers=headers).get_json()
+    assert stats['pending'] == 54 and stats['closed'] == 1
+
+    client_stats = client.get('/cases/statistics', headers=auth_header(people['client'])).get_json()
+    assert client_stats['total'] == 55 and 'my_cases' not in client_stats
+
+
+def test_admin_stats_are_grouped_with_weekly_trends(client, people):
+    from datetime import datetime, timedelta
+
+    seed_cases(6, people['client'], people['manager'], messages_per_case=0)
+    cases = Case.query.order_by(Case.id).all()
+    # Two cases opened three weeks ago, one of them closed last week
+    three_weeks_ago = datetime.utcnow() - timedelta(weeks=3)
+    cases[0].created_at = cases[1].created_at = three_weeks_ago
+    db.session.commit()
+    headers = auth_header(people['admin'])
+    client.put(f'/cases/admin/{cases[2].id}', json={'status': 'CLOSED'}, headers=headers)
+    cases[0].status = cases[2].status
+    cases[0].closed_at = datetime.utcnow() - timedelta(weeks=1)
+    db.session.commit()
+
+    with count_queries() as statements:
+        stats = client.get('/admin/stats?weeks=4', headers=headers).get_json()
+    # One user lookup for the role check, two grouped counts and the trends
+    assert len(statements) <= 4, statements
+    assert stats['total_users'] == 3 and stats['users_by_role']['CLIENT'] == 1
+    assert stats['total_cases'] == 6 and stats['cases_by_status']['CLOSED'] == 2
+
+    weeks = stats['weekly_trends']
+    assert len(weeks) == 4
+    assert [w['opened'] for w in weeks] == [2, 0, 0, 4]
+    assert [w['closed'] for w in weeks] == [0, 0, 1, 1]
+
+    with count_queries() as statements:
+        assert client.get('/admin/stats?weeks=4', headers=headers).get_json() == stats
+    assert not [s for s in statements if 'GROUP BY' in s]
+
+
+def test_case_listings_paginate_sort_and_select_fields(client, people):
+    seed_cases(12, people['client'], people['manager'], messages_per_case=0)
+    headers = auth_header(people['manager'])
+    expected = [c.id for c in Case.query.order_by(Case.case_id.desc())]
+
+    seen = []
+    url = '/cases/admin?limit=5&sort=-case_id&fields=id,case_id,status&include_total=true'
+    while url:
+        page = client.get(url, headers=headers).get_json()
+        assert page.get('total', 12) == 12
+        assert all(set(case) == {'id', 'case_id', 'status'} for case in page['cases'])
+        seen.extend(case['id'] for case in page['cases'])
+        url = page['next_cursor'] and f"/cases/admin?limit=5&sort=-case_id&fields=id,case_id,status&cursor={page['next_cursor']}"
+    assert seen == expected
+
+    # Sparse fields load neither descriptions nor the client and assignee rows
+    db.session.expire_all()
+    with count_queries() as statements:
+        page = client.get('/cases/?limit=3&sort=created_at&fields=id,title', headers=auth_header(people['client'])).get_json()
+    assert [case['id'] for case in page['cases']] == sorted(expected)[:3]
+    # The list validator, then the page itself
+    assert len(statements) == 3, statements
+    assert 'description' not in statements[-1]
+
+    client_view = client.get('/cases/admin/filter?status=PENDING&limit=20&fields=client', headers=headers).get_json()
+    assert client_view['cases'][0] == {'client': {'id': people['client'].id, 'name': 'client', 'email': 'client@example.com'}}
+
+    # Existing callers still get the bare list
+    assert len(client.get(f"/cases/admin/assigned/{people['manager'].id}", headers=headers).get_json()) == 12
+    assert client.get('/cases/admin?sort=title', headers=headers).status_code == 400
+    assert client.get('/cases/admin?fields=secret', headers=headers).status_code == 400
+    assert client.get('/cases/admin?status=NOPE', headers=headers).status_code == 400
+
+
+def test_case_lists_load_parties_in_bulk(client, people):
+    from services.case_service import CaseService
+    from utils import case_to_dict, case_row_to_dict
+
+    other_manager = make_user('other-manager@example.com', Role.CASE_MANAGER)
+    seed_cases(10, people['client'], people['manager'], messages_per_case=0)
+    seed_cases(10, people['client'], other_manager, messages_per_case=0)
+    Case.query.first().assigned_to_id = None
+    db.session.commit()
+
+    db.session.expire_all()
+    with count_queries() as statements:
+        orm = [case_to_dict(case) for case in CaseService.get_all_cases()]
+    # Cases, then one SELECT each for the clients and the assignees
+    assert len(statements) == 3, statements
+
+    rows, _ = CaseService.list_case_rows(limit=None)
+    assert [case_row_to_dict(row) for row in rows] == orm
+
+    headers = auth_header(people['manager'])
+    db.session.expire_all()
+    with count_queries() as statements:
+        response = client.get('/cases/admin', headers=headers)
+    assert response.get_json() == orm
+    # The role check, the list validator and a single joined listing query
+    assert len(statements) == 3, statements
+
+
+def test_case_lists_answer_conditional_gets(client, people):
+    from datetime import datetime, timedelta
+
+    seed_cases(3, people['client'], people['manager'], messages_per_case=0)
+    headers = auth_header(people['client'])
+    first = client.get('/cases/', headers=headers)
+    etag, last_modified = first.headers['ETag'], first.headers['Last-Modified']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    with count_queries() as statements:
+        cached = client.get('/cases/', headers={**headers, 'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+    # Only the validator aggregate; no rows are loaded
+    assert len(statements) == 1, statements
+
+    assert client.get('/cases/', headers={**headers, 'If-Modified-Since': last_modified}).status_code == 304
+    # Other query parameters are other representations
+    assert client.get('/cases/?limit=2', headers={**headers, 'If-None-Match': etag}).status_code == 200
+
+    # An update moves updated_at, and a deletion changes the count
+    case = Case.query.first()
+    case.updated_at = datetime.utcnow() + timedelta(seconds=5)
+    db.session.commit()
+    changed = client.get('/cases/', headers={**headers, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    db.session.delete(Case.query.order_by(Case.id.desc()).first())
+    db.session.commit()
+    assert client.get('/cases/', headers={**headers, 'If-None-Match': changed.headers['ETag']}).status_code == 200
+
+    staff = auth_header(people['manager'])
+    admin_list = client.get('/cases/admin', headers=staff)
+    assert client.get('/cases/admin', headers={**staff, 'If-None-Match': admin_list.headers['ETag']}).status_code == 304
+
+    # An edit within the same second as the last one still changes the ETag
+    case = Case.query.first()
+    stamp = case.updated_at
+    case.title, case.updated_at = 'Edited in the same second', stamp
+    db.session.commit()
+    edited = client.get('/cases/admin', headers={**staff, 'If-None-Match': admin_list.headers['ETag']})
+    assert edited.status_code == 200
+    # and so does renaming a party shown in the list, which leaves cases untouched
+    people['client'].name = 'Renamed client'
+    db.session.commit()
+    assert client.get('/cases/admin', headers={**staff, 'If-None-Match': edited.headers['ETag']}).status_code == 200
+
+    appointments = client.get('/api/appointments', headers=headers)
+    assert appointments.status_code == 200
+    assert client.get('/api/appointments', headers={
+        **headers, 'If-None-Match': appointments.headers['ETag'],
+    }).status_code == 304
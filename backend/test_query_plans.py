@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Query plan regression checks for the hot tables.
+Captures the SQL issued by the busiest endpoints and fails if EXPLAIN shows
+a full table scan on any of the indexed tables:
+
+    python -m pytest test_query_plans.py -q
+
+Runs on in-memory SQLite by default. Point TEST_DATABASE_URL and
+DATABASE_URL at a PostgreSQL database to check the Postgres plans.
+"""
+import re
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import Appointment, CaseNote, Case, Role
+from test_query_budget import app, client, people, auth_header, make_user, seed_cases  # noqa: F401
+
+HOT_TABLES = {
+    'users', 'cases', 'messages', 'case_notes', 'appointments',
+    'unread_counters', 'message_read_states', 'activity_events',
+    'deadlines', 'documents',
+}
+
+# SQLite reports "SCAN <table or alias>" for full table scans
+SQLITE_SCAN = re.compile(r'^SCAN (\w+?)(?:_\d+)?$')
+
+
+@contextmanager
+def capture_statements():
+    """Collect (statement, parameters) for every read or write inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _postgres_seq_scans(node):
+    scans = []
+    if node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') in HOT_TABLES:
+        scans.append(f"Seq Scan on {node['Relation Name']}")
+    for child in node.get('Plans', []):
+        scans.extend(_postgres_seq_scans(child))
+    return scans
+
+
+def full_scans(statement, parameters):
+    """Return the full table scans on hot tables in a statement's plan."""
+    dialect = db.engine.dialect.name
+    with db.engine.connect() as conn:
+        if dialect == 'sqlite':
+            plan = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+            return [
+                row.detail for row in plan
+                if SQLITE_SCAN.match(row.detail) and SQLITE_SCAN.match(row.detail).group(1) in HOT_TABLES
+            ]
+        if dialect == 'postgresql':
+            # Tiny test tables are always cheaper to scan; only flag scans
+            # the planner cannot avoid because no index applies
+            conn.exec_driver_sql('SET enable_seqscan = off')
+            plan = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+            return _postgres_seq_scans(plan[0]['Plan'])
+    pytest.skip(f'No plan checks for {dialect}')
+
+
+def assert_no_full_scans(statements):
+    assert statements, 'no statements captured'
+    problems = []
+    for statement, parameters in statements:
+        scans = full_scans(statement, parameters)
+        if scans:
+            problems.append(f'{scans}\n    {statement}')
+    assert not problems, 'Full table scans:\n' + '\n'.join(problems)
+
+
+@pytest.fixture
+def seeded(people):
+    from datetime import datetime, timedelta
+    from services.unread_service import UnreadCounterService
+
+    seed_cases(3, people['client'], people['manager'], messages_per_case=4)
+    UnreadCounterService.rebuild()
+    people['viewer'] = make_user('viewer@example.com', Role.VIEWER)
+    case = Case.query.first()
+    start = datetime.utcnow() + timedelta(days=1)
+    db.session.add(CaseNote(case_id=case.id, author_id=people['manager'].id, content='Call back', is_private=False))
+    db.session.add(Appointment(
+        title='Consultation',
+        start_datetime=start,
+        end_datetime=start + timedelta(hours=1),
+        client_id=people['client'].id,
+        attorney_id=people['viewer'].id
+    ))
+    db.session.commit()
+    return case
+
+
+HOT_REQUESTS = [
+    ('client', 'GET', '/messages/conversations'),
+    ('manager', 'GET', '/messages/conversations'),
+    ('client', 'GET', '/cases/{case}/messages?limit=2'),
+    ('client', 'GET', '/cases/{case}/messages?before={message}'),
+    ('client', 'GET', '/cases/{case}/messages?after={message}'),
+    ('client', 'POST', '/cases/{case}/messages/read'),
+    ('client', 'GET', '/messages/unread-count?by_case=true'),
+    ('client', 'GET', '/cases/'),
+    ('client', 'GET', '/cases/statistics'),
+    ('client', 'GET', '/cases/{case}/notes/'),
+    ('manager', 'GET', '/cases/admin/assigned/{manager}'),
+    ('manager', 'GET', '/cases/admin/filter?assigned_to_id={manager}&status=PENDING'),
+    ('manager', 'GET', '/cases/admin?status=IN_PROGRESS'),
+    ('client', 'GET', '/api/appointments'),
+    ('viewer', 'GET', '/api/appointments?start_date=2020-01-01T00:00:00'),
+    ('client', 'GET', '/search?q=message'),
+    ('admin', 'GET', '/admin/stats'),
+    ('client', 'GET', '/cases/?limit=2&cursor={case}&fields=id,title'),
+    ('manager', 'GET', '/cases/admin?limit=2&cursor={case}&include_total=true'),
+    ('manager', 'GET', '/cases/admin?status=PENDING&limit=2&sort=case_id'),
+    ('admin', 'GET', '/admin/activity-log?actor_id={manager}&limit=2'),
+    ('manager', 'GET', '/cases/admin/search?q=2024-001'),
+    ('client', 'GET', '/cases/{case}/timeline?limit=3'),
+    ('manager', 'GET', '/cases/admin/search?q=client&fields=id,client'),
+    ('admin', 'GET', '/admin/activity-log?case_id={case}&cursor={message}'),
+    ('admin', 'GET', '/admin/users?limit=2&cursor={manager}'),
+    ('admin', 'GET', '/admin/users?search=ma&limit=2'),
+    ('admin', 'GET', '/admin/users?search=manager&sort=-created_at&limit=2'),
+    ('admin', 'GET', '/admin/users?role=CASE_MANAGER'),
+]
+
+
+@pytest.mark.parametrize('role,method,url', HOT_REQUESTS)
+def test_hot_queries_use_indexes(client, people, seeded, role, method, url):
+    from models import Message
+
+    url = url.format(
+        case=seeded.id,
+        message=Message.query.filter_by(case_id=seeded.id).order_by(Message.id).first().id,
+        manager=people['manager'].id
+    )
+    headers = auth_header(people[role])
+
+    with capture_statements() as statements:
+        response = client.open(url, method=method, headers=headers, json={} if method == 'POST' else None)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    assert_no_full_scans(statements)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Socket.IO broadcast checks.
+Runs Socket.IO servers on the in-memory SQLite stand-in broker to check that
+room emits reach clients connected to another worker, and checks that case
+updates, including bulk changes, are coalesced per room:
+
+    python -m pytest test_socketio_queue.py -q
+"""
+import os
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('TEST_DATABASE_URL', 'sqlite://')
+
+import time
+import uuid
+
+import pytest
+
+from test_query_budget import app, client, people, auth_header, seed_cases  # noqa: F401
+from app import create_app
+from config.settings import TestingConfig
+from extensions import db, socketio
+from models import ActivityEvent, Case, Role, Priority
+from websockets.broker import SQLiteManager, create_client_manager
+
+
+@pytest.fixture
+def queued_app(monkeypatch):
+    channel = f'test-{uuid.uuid4().hex}'
+    monkeypatch.setattr(TestingConfig, 'SOCKETIO_MESSAGE_QUEUE', 'sqlite://', raising=False)
+    monkeypatch.setattr(TestingConfig, 'SOCKETIO_CHANNEL', channel, raising=False)
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def worker(channel):
+    """A bare Socket.IO server on the stand-in broker that records what it sends."""
+    import socketio as python_socketio
+
+    server = python_socketio.Server(
+        client_manager=create_client_manager('sqlite://', channel=channel),
+        async_mode='threading'
+    )
+    server.sent = []
+    server._send_eio_packet = lambda eio_sid, eio_pkt: server.sent.append(
+        (eio_sid, server.packet_class(encoded_packet=eio_pkt.data).data)
+    )
+    server.manager_initialized = True
+    server.manager.initialize()
+    return server
+
+
+def wait_for(server, event, timeout=2):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        sent = [(eio_sid, data[1]) for eio_sid, data in server.sent if data[0] == event]
+        if sent:
+            return sent
+        time.sleep(0.02)
+    return []
+
+
+def test_room_emits_cross_workers():
+    channel = f'test-{uuid.uuid4().hex}'
+    first, second = worker(channel), worker(channel)
+
+    # A client connected to the first worker, in a case room and its own room
+    sid = first.manager.connect('eio-1', '/')
+    first.manager.enter_room(sid, '/', 'case_7')
+    first.manager.enter_room(sid, '/', 'user_3')
+
+    second.emit('case_update', {'case_id': 7, 'status': 'CLOSED'}, room='case_7')
+    second.emit('notification', {'msg': 'hello'}, room='user_3')
+    second.emit('case_update', {'case_id': 8, 'status': 'CLOSED'}, room='case_8')
+
+    assert wait_for(first, 'case_update') == [('eio-1', {'case_id': 7, 'status': 'CLOSED'})]
+    assert wait_for(first, 'notification') == [('eio-1', {'msg': 'hello'})]
+    assert second.sent == []
+
+
+def test_app_publishes_room_emits(queued_app):
+    from websockets.handlers import emit_case_status_update, emit_notification
+
+    assert isinstance(socketio.server.manager, SQLiteManager)
+    channel = queued_app.config['SOCKETIO_CHANNEL']
+    other = worker(channel)
+    sid = other.manager.connect('eio-2', '/')
+    other.manager.enter_room(sid, '/', 'case_5')
+    other.manager.enter_room(sid, '/', 'user_9')
+
+    emit_case_status_update(5, 'IN_PROGRESS')
+    emit_notification(9, {'msg': 'Case assigned'})
+
+    assert wait_for(other, 'case_update') == [('eio-2', {'updates': [{'case_id': 5, 'status': 'IN_PROGRESS'}]})]
+    assert wait_for(other, 'notification') == [('eio-2', {'msg': 'Case assigned'})]
+
+
+def test_no_queue_keeps_the_in_process_manager():
+    assert create_client_manager(None) is None
+    assert create_client_manager('') is None
+
+
+def test_case_updates_are_coalesced_per_room(app, client, people, monkeypatch):
+    from websockets.aggregator import case_updates
+
+    monkeypatch.setattr(case_updates, 'window', 0.2)
+    seed_cases(2, people['client'], people['manager'], messages_per_case=0)
+    first, second = Case.query.order_by(Case.id).all()
+    socket = socketio.test_client(app, auth={'token': auth_header(people['client'])['Authorization'][7:]})
+    socket.emit('join_case', {'case_id': first.id})
+    socket.get_received()
+    before = case_updates.get_metrics()
+
+    headers = auth_header(people['manager'])
+    for status in ('IN_PROGRESS', 'AWAITING_CLIENT', 'CLOSED'):
+        client.put(f'/cases/admin/{first.id}', json={'status': status}, headers=headers)
+    client.put(f'/cases/admin/{first.id}', json={'priority': 'HIGH'}, headers=headers)
+    client.put(f'/cases/admin/{second.id}', json={'status': 'CLOSED'}, headers=headers)
+
+    deadline = time.time() + 2
+    frames = []
+    while not frames and time.time() < deadline:
+        time.sleep(0.05)
+        frames = [e['args'][0] for e in socket.get_received() if e['name'] == 'case_update']
+
+    # One frame for the room, carrying only the latest state of its case
+    assert len(frames) == 1
+    assert frames[0]['updates'] == [{
+        'case_id': first.id,
+        'status': 'CLOSED',
+        'priority': 'HIGH',
+        'assigned_to_id': people['manager'].id,
+    }]
+    metrics = case_updates.get_metrics()
+    assert metrics['events_received'] - before['events_received'] == 5
+    assert metrics['events_merged'] - before['events_merged'] == 3
+    assert metrics['frames_sent'] - before['frames_sent'] == 2
+    socket.disconnect()
+
+
+def test_bulk_update_is_one_statement_and_one_frame(app, client, people, monkeypatch):
+    from test_query_budget import count_queries, make_user
+    from websockets.aggregator import case_updates
+
+    monkeypatch.setattr(case_updates, 'window', 0.2)
+    from services.activity_service import activity_log
+    seed_cases(5, people['client'], people['manager'], messages_per_case=0)
+    activity_log.flush()
+    successor = make_user('successor@example.com', Role.CASE_MANAGER)
+    db.session.commit()
+    ids = [case.id for case in Case.query.order_by(Case.id)]
+    socket = socketio.test_client(app, auth={'token': auth_header(people['client'])['Authorization'][7:]})
+    socket.emit('join_case', {'case_id': ids[0]})
+    socket.get_received()
+
+    headers = auth_header(people['admin'])
+    with count_queries() as statements:
+        response = client.post('/cases/admin/bulk', headers=headers, json={
+            'case_ids': ids[:3] + [9999],
+            'changes': {'assigned_to_id': successor.id, 'status': 'IN_PROGRESS'},
+        })
+    assert response.status_code == 200, response.get_json()
+    data = response.get_json()
+    assert data['updated'] == 3
+    assert data['results'][-1] == {'id': 9999, 'result': 'not_found'}
+    assert len([s for s in statements if s.lstrip().upper().startswith('UPDATE CASES')]) == 1
+
+    deadline = time.time() + 2
+    frames = []
+    while not frames and time.time() < deadline:
+        time.sleep(0.05)
+        frames = [e['args'][0] for e in socket.get_received() if e['name'] == 'case_update']
+    assert frames == [{'updates': [{
+        'case_id': ids[0], 'status': 'IN_PROGRESS', 'priority': 'MEDIUM', 'assigned_to_id': successor.id,
+    }]}]
+
+    # Logged as update_case does: status and assignee changes as separate events
+    activity_log.flush()
+    events = ActivityEvent.query.filter(ActivityEvent.case_id == ids[0]).order_by(ActivityEvent.id).all()
+    assert [(e.action, e.details) for e in events] == [
+        ('case.updated', {'status': 'IN_PROGRESS', 'bulk': True}),
+        ('case.assigned', {'assigned_to_id': successor.id, 'previous_assigned_to_id': people['manager'].id, 'bulk': True}),
+    ]
+    # Assigning cases to the manager they already have is not logged as a reassignment
+    response = client.post('/cases/admin/bulk', headers=headers, json={
+        'case_ids': ids[:3], 'changes': {'assigned_to_id': successor.id},
+    })
+    assert response.get_json()['updated'] == 3
+    assert activity_log.flush() == 0
+
+    # Close everything the departing manager still holds
+    response = client.post('/cases/admin/bulk', headers=headers, json={
+        'filter': {'assigned_to_id': people['manager'].id},
+        'changes': {'status': 'CLOSED'},
+    })
+    assert [r['id'] for r in response.get_json()['results']] == ids[3:]
+    db.session.expire_all()
+    assert all(case.closed_at for case in Case.query.filter(Case.id.in_(ids[3:])))
+
+    invalid = client.post('/cases/admin/bulk', headers=headers, json={
+        'case_ids': ids, 'changes': {'assigned_to_id': people['client'].id},
+    })
+    assert invalid.status_code == 400
+    assert client.post('/cases/admin/bulk', headers=headers, json={'changes': {'status': 'CLOSED'}}).status_code == 400
+    # Null or empty filter values would otherwise update every case
+    for empty in ({'status': None}, {'assigned_to_id': None}, {'status': ''}):
+        response = client.post('/cases/admin/bulk', headers=headers, json={'filter': empty, 'changes': {'priority': 'HIGH'}})
+        assert response.status_code == 400, empty
+    monkeypatch.setattr('routes.cases.MAX_BULK_CASES', 2)
+    response = client.post('/cases/admin/bulk', headers=headers, json={
+        'filter': {'assigned_to_id': successor.id}, 'changes': {'priority': 'HIGH'},
+    })
+    assert response.status_code == 400 and 'matches 3 cases' in response.get_json()['msg']
+    db.session.expire_all()
+    assert Case.query.filter_by(priority=Priority.HIGH).count() == 0
+    socket.disconnect()
@@ -2,15 +2,25 @@
 Utilities package initialization.
 """
 from .decorators import role_required, get_current_user
-from .serializers import case_to_dict, user_to_dict, message_to_dict
+from .serializers import (
+    case_to_dict,
+    case_row_to_dict,
+    user_to_dict,
+    message_to_dict,
+    participant_to_dict,
+    thread_message_to_dict,
+)
 from .helpers import generate_case_id, validate_required_fields
 
 __all__ = [
     'role_required',
     'get_current_user',
     'case_to_dict',
+    'case_row_to_dict',
     'user_to_dict',
     'message_to_dict',
+    'participant_to_dict',
+    'thread_message_to_dict',
     'generate_case_id',
     'validate_required_fields',
 ]
@@ -0,0 +1,54 @@
+"""
+Small in-process caches for dashboard data.
+"""
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Thread-safe dict cache whose entries expire after ``ttl`` seconds.
+
+    The cache is per process. Callers clear it when the underlying data
+    changes; the TTL bounds how stale other workers can get.
+    """
+
+    def __init__(self, ttl=30, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        """Cache a value for ``ttl`` seconds."""
+        with self._lock:
+            if len(self._entries) >= self.maxsize and key not in self._entries:
+                # Drop the entry closest to expiry to make room
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def delete(self, key):
+        """Drop one entry, if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,80 @@
+"""
+Conditional GET support for list endpoints.
+
+A list's validator is built from the change counters of the tables it
+shows (see models.table_version) plus the newest ``updated_at`` and the
+row count in the caller's scope, which one aggregate query can answer
+without loading any rows. The counters change on every commit that
+touches those tables, including edits within the same second and changes
+to joined rows such as party names.
+"""
+import hashlib
+from datetime import timezone
+
+from flask import request, make_response
+from sqlalchemy import select, func
+from models import TableVersion
+
+
+def tables_version(*tables):
+    """
+    Scalar subquery summing the change counters of some tables.
+
+    The sum only ever grows, so it can be added as one more column to a
+    list's validator query.
+    """
+    return (
+        select(func.coalesce(func.sum(TableVersion.version), 0))
+        .where(TableVersion.table_name.in_(tables))
+        .scalar_subquery()
+    )
+
+
+def list_etag(last_modified, count, scope='', version=None):
+    """
+    ETag for a list of ``count`` rows last changed at ``last_modified``.
+
+    ``scope`` names the caller's view (filters, user); the request's path
+    and query string are always included, since sort order, fields and
+    cursors change the body. ``version`` is the tables_version() of the
+    tables the list shows.
+    """
+    stamp = last_modified.isoformat() if last_modified else '-'
+    key = f'{request.full_path}|{scope}|{count}|{stamp}|{version}'
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _http_date(last_modified):
+    """Naive UTC timestamps at the one-second precision of HTTP dates."""
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0)
+
+
+def not_modified(etag, last_modified=None):
+    """
+    A 304 response if the client's copy is current, else None.
+
+    If-None-Match takes precedence; If-Modified-Since is only checked when
+    the client sent no ETag.
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = _http_date(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return set_validators(make_response('', 304), etag, last_modified)
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach ETag and Last-Modified, and make clients revalidate."""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = _http_date(last_modified)
+    # Lists are per user: browsers may keep them but must revalidate
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Authorization')
+    return response
@@ -2,48 +2,78 @@
 Decorators for route protection and authorization.
 """
 from functools import wraps
-from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import jsonify, g, current_app
+from flask_jwt_extended import jwt_required, get_jwt
 from extensions import db
 from models import User, Role
 
 
+def _role_set(allowed_roles):
+    """Allowed roles as a set; a single list of roles is accepted too."""
+    roles = set()
+    for role in allowed_roles:
+        if isinstance(role, (list, tuple, set)):
+            roles.update(role)
+        else:
+            roles.add(role)
+    return roles
+
+
 def role_required(*allowed_roles):
     """
     Decorator to check if the user has one of the allowed roles.
-    
+
+    With JWT_TRUST_ROLE_CLAIM set, the token's signed role claim is checked
+    and the database is not touched; otherwise the request's user is loaded
+    once (see get_current_user) and shared with the route.
+
     Usage:
         @role_required(Role.SUPER_ADMIN, Role.CASE_MANAGER)
         def admin_only_route():
             pass
     """
+    roles = _role_set(allowed_roles)
+    role_values = {role.value for role in roles}
+
     def wrapper(fn):
         @wraps(fn)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = db.session.execute(
-                db.select(User).filter_by(id=current_user_id)
-            ).scalar_one_or_none()
-            
-            if not user:
-                return jsonify({"msg": "User not found"}), 404
-            
-            if user.role not in allowed_roles:
+            if current_app.config['JWT_TRUST_ROLE_CLAIM']:
+                allowed = get_jwt().get('role') in role_values
+            else:
+                user = get_current_user()
+                if not user:
+                    return jsonify({"msg": "User not found"}), 404
+                allowed = user.role in roles
+
+            if not allowed:
                 return jsonify({
                     "msg": "Access forbidden: Insufficient permissions"
                 }), 403
-            
+
             return fn(*args, **kwargs)
         return decorated_function
     return wrapper
 
 
+def load_token_user(claims):
+    """
+    Get the user a decoded token belongs to, loading it at most once per token.
+
+    The user is kept on flask.g keyed by the token's jti, so the token
+    check, role_required and the route all share one lookup.
+    """
+    cached = g.get('_token_user')
+    if cached is not None and cached[0] == claims.get('jti'):
+        return cached[1]
+
+    subject = claims.get('sub')
+    user = db.session.get(User, int(subject)) if subject else None
+    g._token_user = (claims.get('jti'), user)
+    return user
+
+
 def get_current_user():
     """Helper function to get the current authenticated user."""
-    current_user_id = get_jwt_identity()
-    # Convert string ID back to integer
-    user_id = int(current_user_id) if current_user_id else None
-    return db.session.execute(
-        db.select(User).filter_by(id=user_id)
-    ).scalar_one_or_none()
+    return load_token_user(get_jwt())
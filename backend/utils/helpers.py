@@ -2,33 +2,78 @@
 Helper utility functions.
 """
 from datetime import datetime
-from models import Case
+from models import Case, CaseSequence
 from extensions import db
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
 
 
-def generate_case_id():
-    """Generate a unique case ID in format: 1000HILLS-YYYY-NNN"""
-    current_year = datetime.now().year
-    
-    # Get only the case_id field from the last case for the current year
+def _highest_case_sequence(year):
+    """Highest sequence number already used in a year's case references."""
+    # Get only the case_id field from the last case for the year
     # This avoids loading invalid enum values from old data
     result = db.session.execute(
         select(Case.case_id)
-        .filter(Case.case_id.like(f'1000HILLS-{current_year}-%'))
+        .filter(Case.case_id.like(f'1000HILLS-{year}-%'))
         .order_by(Case.id.desc())
         .limit(1)
     ).scalar_one_or_none()
     
     if result:
-        # Extract the sequence number from the last case ID
-        last_sequence = int(result.split('-')[-1])
-        next_sequence = last_sequence + 1
-    else:
-        # First case of the year
-        next_sequence = 1
+        return int(result.split('-')[-1])
+    return 0
+
+
+def next_case_sequence(year):
+    """
+    Allocate the next case reference number for a year.
+    
+    Runs in the caller's transaction: the year's counter row stays locked
+    until the case using the number is committed, so concurrent
+    submissions queue on the row and never get the same number, and a
+    rolled back submission gives its number back.
+    """
+    # Increment first, so the statement takes the write lock straight away
+    # (SQLite) or locks the row (PostgreSQL) before anything is read
+    increment = (
+        update(CaseSequence)
+        .where(CaseSequence.year == year)
+        .values(last_value=CaseSequence.last_value + 1)
+    )
     
-    return f"1000HILLS-{current_year}-{next_sequence:03d}"
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in ('postgresql', 'sqlite'):
+        # Generic fallback for other backends
+        sequence = db.session.get(CaseSequence, year, with_for_update=True)
+        if sequence is None:
+            sequence = CaseSequence(year=year, last_value=_highest_case_sequence(year))
+            db.session.add(sequence)
+        sequence.last_value += 1
+        db.session.flush()
+        return sequence.last_value
+    
+    value = db.session.execute(increment.returning(CaseSequence.last_value)).scalar_one_or_none()
+    if value is not None:
+        return value
+    
+    # First case of the year: seed the counter from existing references.
+    # If another submission created the row meanwhile, take the next value.
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    return db.session.execute(
+        insert(CaseSequence)
+        .values(year=year, last_value=_highest_case_sequence(year) + 1)
+        .on_conflict_do_update(
+            index_elements=[CaseSequence.year],
+            set_={'last_value': CaseSequence.last_value + 1}
+        )
+        .returning(CaseSequence.last_value)
+    ).scalar_one()
+
+
+def generate_case_id():
+    """Generate a unique case ID in format: 1000HILLS-YYYY-NNN"""
+    current_year = datetime.now().year
+    return f"1000HILLS-{current_year}-{next_case_sequence(current_year):03d}"
 
 
 def validate_required_fields(data, required_fields):
@@ -0,0 +1,125 @@
+"""
+Password hashing off the request thread.
+
+bcrypt is slow on purpose (~250 ms a hash). Under the eventlet worker a
+hash run inline blocks the hub, stalling every other request and socket in
+the process for that long. Hashes and checks here run in eventlet's pool
+of native threads instead (bcrypt releases the GIL, so they also run in
+parallel), at most PASSWORD_HASH_CONCURRENCY at a time. Without eventlet
+each request already has its own thread and the hash runs on it, under the
+same cap.
+"""
+import sys
+import threading
+import time
+
+from extensions import bcrypt
+
+
+class HashingBusy(Exception):
+    """Too many password hashes are already waiting; the caller should retry."""
+
+
+def offload(fn, *args):
+    """Run ``fn`` in eventlet's native thread pool when the process is green."""
+    eventlet = sys.modules.get('eventlet')
+    if eventlet is not None and eventlet.patcher.is_monkey_patched('thread'):
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    return fn(*args)
+
+
+class PasswordHasher:
+    """Runs bcrypt with a cap on concurrent hashes and a bounded wait queue."""
+
+    def __init__(self, concurrency=4, max_waiting=64):
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._active = 0
+        self.configure(concurrency, max_waiting)
+        self.metrics = {
+            'hashes': 0,
+            'checks': 0,
+            'rejected': 0,
+            'max_waiting_seen': 0,
+            'wait_seconds': 0.0,
+            'hash_seconds': 0.0,
+        }
+
+    def init_app(self, app):
+        """Take the concurrency cap and queue limit from the app config."""
+        self.configure(app.config['PASSWORD_HASH_CONCURRENCY'], app.config['PASSWORD_HASH_MAX_WAITING'])
+
+    def configure(self, concurrency, max_waiting):
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self._slots = threading.BoundedSemaphore(concurrency)
+        # Bulk work (user imports) may hold at most half the slots, so
+        # logins keep the rest
+        self._bulk_slots = threading.BoundedSemaphore(max(concurrency // 2, 1))
+
+    def _run(self, kind, fn, *args, shed=True):
+        """
+        Run one bcrypt call once a slot is free.
+
+        Raises HashingBusy instead of queueing when ``max_waiting`` calls
+        are already waiting, so a login storm is shed rather than piling up.
+        With ``shed=False`` the call always waits its turn.
+        """
+        with self._lock:
+            if shed and self._waiting >= self.max_waiting:
+                self.metrics['rejected'] += 1
+                raise HashingBusy()
+            self._waiting += 1
+            self.metrics['max_waiting_seen'] = max(self.metrics['max_waiting_seen'], self._waiting)
+
+        slots = self._slots
+        queued_at = time.perf_counter()
+        slots.acquire()
+        started_at = time.perf_counter()
+        with self._lock:
+            self._waiting -= 1
+            self._active += 1
+            self.metrics['wait_seconds'] += started_at - queued_at
+
+        try:
+            return offload(fn, *args)
+        finally:
+            slots.release()
+            with self._lock:
+                self._active -= 1
+                self.metrics[kind] += 1
+                self.metrics['hash_seconds'] += time.perf_counter() - started_at
+
+    def hash(self, password, bulk=False):
+        """
+        bcrypt hash of a password, as stored in users.password_hash.
+
+        ``bulk`` hashes (imports) wait instead of being shed and share at
+        most half the slots between them.
+        """
+        if not bulk:
+            return self._run('hashes', bcrypt.generate_password_hash, password).decode('utf-8')
+        with self._bulk_slots:
+            return self._run('hashes', bcrypt.generate_password_hash, password, shed=False).decode('utf-8')
+
+    def check(self, password_hash, password):
+        """Whether a password matches a stored bcrypt hash."""
+        return self._run('checks', bcrypt.check_password_hash, password_hash, password)
+
+    def get_metrics(self):
+        """Counters since startup plus the current queue depth."""
+        with self._lock:
+            done = self.metrics['hashes'] + self.metrics['checks']
+            return {
+                **self.metrics,
+                'waiting': self._waiting,
+                'active': self._active,
+                'concurrency': self.concurrency,
+                'max_waiting': self.max_waiting,
+                'avg_wait_ms': round(self.metrics['wait_seconds'] * 1000 / done, 1) if done else 0.0,
+                'avg_hash_ms': round(self.metrics['hash_seconds'] * 1000 / done, 1) if done else 0.0,
+            }
+
+
+passwords = PasswordHasher()
@@ -4,31 +4,75 @@ Serialization helper functions.
 from models import Case, User, Message
 
 
-def case_to_dict(case):
-    """Serialize a Case object to dictionary."""
+def _case_party(user):
     return {
-        "id": case.id,
-        "case_id": case.case_id,
-        "title": case.title,
-        "description": case.description,
-        "category": case.category.value,
-        "status": case.status.value,
-        "priority": case.priority.value,
-        "client_id": case.client_id,
-        "client": {
-            "id": case.client.id,
-            "name": case.client.name,
-            "email": case.client.email,
-        } if case.client else None,
-        "assigned_to_id": case.assigned_to_id,
-        "assigned_to": {
-            "id": case.assigned_to.id,
-            "name": case.assigned_to.name,
-            "email": case.assigned_to.email,
-        } if case.assigned_to else None,
-        "created_at": case.created_at.isoformat(),
-        "updated_at": case.updated_at.isoformat(),
-    }
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+    } if user else None
+
+
+# Serializable case fields, in output order
+CASE_FIELDS = {
+    "id": lambda case: case.id,
+    "case_id": lambda case: case.case_id,
+    "title": lambda case: case.title,
+    "description": lambda case: case.description,
+    "category": lambda case: case.category.value,
+    "status": lambda case: case.status.value,
+    "priority": lambda case: case.priority.value,
+    "client_id": lambda case: case.client_id,
+    "client": lambda case: _case_party(case.client),
+    "assigned_to_id": lambda case: case.assigned_to_id,
+    "assigned_to": lambda case: _case_party(case.assigned_to),
+    "created_at": lambda case: case.created_at.isoformat(),
+    "updated_at": lambda case: case.updated_at.isoformat(),
+    "closed_at": lambda case: case.closed_at.isoformat() if case.closed_at else None,
+}
+
+
+def case_to_dict(case, fields=None):
+    """
+    Serialize a Case object to dictionary.
+    
+    With ``fields`` only those keys are produced, so unloaded columns and
+    relationships are never touched.
+    """
+    if fields is None:
+        return {name: serialize(case) for name, serialize in CASE_FIELDS.items()}
+    return {name: serialize(case) for name, serialize in CASE_FIELDS.items() if name in fields}
+
+
+def case_row_to_dict(row, fields=None):
+    """
+    Serialize a case row from CaseService.list_case_rows to dictionary.
+    
+    Produces the same keys as case_to_dict from plain column values.
+    """
+    data = {}
+    for name in CASE_FIELDS:
+        if fields is not None and name not in fields:
+            continue
+        if name == 'client':
+            data[name] = {
+                "id": row.client_id,
+                "name": row.client_name,
+                "email": row.client_email,
+            } if row.client_name is not None else None
+        elif name == 'assigned_to':
+            data[name] = {
+                "id": row.assigned_to_id,
+                "name": row.assigned_to_name,
+                "email": row.assigned_to_email,
+            } if row.assigned_to_id is not None else None
+        else:
+            value = getattr(row, name)
+            if hasattr(value, 'value'):
+                value = value.value
+            elif hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            data[name] = value
+    return data
 
 
 def user_to_dict(user, include_sensitive=False):
@@ -40,6 +84,7 @@ def user_to_dict(user, include_sensitive=False):
         "role": user.role.value,
         "phone": user.phone,
         "email_verified": user.email_verified,
+        "is_active": user.is_active,
         "created_at": user.created_at.isoformat(),
     }
     
@@ -63,3 +108,44 @@ def message_to_dict(message):
         "recipient_name": message.recipient.name,
         "created_at": message.created_at.isoformat(),
     }
+
+
+def participant_to_dict(user, include_role=False):
+    """Serialize the sender or recipient of a message."""
+    if not user:
+        return None
+    
+    data = {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+    }
+    
+    if include_role:
+        data["role"] = user.role.value if user.role else None
+    
+    return data
+
+
+def thread_message_to_dict(message, include_case=False):
+    """
+    Serialize a Message with its sender and recipient for message feeds.
+    
+    Expects the participants (and the case, when include_case is set) to be
+    loaded already, see MessageService.participant_options().
+    """
+    data = {
+        "id": message.id,
+        "case_id": message.case_id,
+        "content": message.content,
+        "read": message.read,
+        "created_at": message.created_at.isoformat() if message.created_at else None,
+        "sender": participant_to_dict(message.sender, include_role=include_case),
+        "recipient": participant_to_dict(message.recipient, include_role=include_case),
+    }
+    
+    if include_case:
+        data["case_title"] = message.case.title if message.case else None
+        data["case_reference"] = f"CASE-{str(message.case_id).zfill(4)}"
+    
+    return data
@@ -3,18 +3,30 @@ WebSocket package initialization.
 """
 from .handlers import (
     handle_connect,
+    handle_reauthenticate,
     on_join_case,
     handle_send_message,
+    handle_mark_read,
     handle_disconnect,
     emit_case_status_update,
-    emit_notification
+    emit_notification,
+    emit_unread_count
 )
+from .broker import SQLiteManager, create_client_manager
+from .aggregator import CaseUpdateAggregator, case_updates
 
 __all__ = [
     'handle_connect',
+    'handle_reauthenticate',
     'on_join_case',
     'handle_send_message',
+    'handle_mark_read',
     'handle_disconnect',
     'emit_case_status_update',
     'emit_notification',
+    'emit_unread_count',
+    'SQLiteManager',
+    'create_client_manager',
+    'CaseUpdateAggregator',
+    'case_updates',
 ]
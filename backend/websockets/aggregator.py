@@ -0,0 +1,76 @@
+"""
+Coalescing of case update broadcasts.
+
+Case changes are queued per room and flushed once per window as a single
+``case_update`` frame. Only the latest state of each case is kept, so a
+burst of updates (bulk reassignments, status sweeps) costs every room
+member one frame instead of one event per change.
+"""
+import threading
+
+from extensions import socketio
+
+
+class CaseUpdateAggregator:
+    """Collects case updates per room and emits them in batched frames."""
+
+    def __init__(self, window=0.5):
+        self.window = window
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self.metrics = {
+            'events_received': 0,
+            'events_merged': 0,
+            'frames_sent': 0,
+        }
+
+    def publish(self, room, case_id, state):
+        """
+        Queue a case's new state for a room.
+
+        A state still pending for the same case is superseded: its fields
+        are overwritten and the event counts as merged.
+        """
+        with self._lock:
+            updates = self._pending.setdefault(room, {})
+            self.metrics['events_received'] += 1
+            if case_id in updates:
+                self.metrics['events_merged'] += 1
+                updates[case_id].update(state)
+            else:
+                updates[case_id] = {'case_id': case_id, **state}
+
+            schedule = not self._scheduled and self.window > 0
+            self._scheduled = self._scheduled or schedule
+
+        if self.window <= 0:
+            self.flush()
+        elif schedule:
+            socketio.start_background_task(self._flush_later)
+
+    def _flush_later(self):
+        socketio.sleep(self.window)
+        self.flush()
+
+    def flush(self):
+        """Emit one frame per room with everything queued so far."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+            self.metrics['frames_sent'] += len(pending)
+
+        for room, updates in pending.items():
+            socketio.emit('case_update', {'updates': list(updates.values())}, room=room)
+
+    def get_metrics(self):
+        """Counters since startup, including how many events were merged."""
+        with self._lock:
+            return {
+                **self.metrics,
+                'pending_rooms': len(self._pending),
+                'window_seconds': self.window,
+            }
+
+
+case_updates = CaseUpdateAggregator()
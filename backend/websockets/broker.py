@@ -0,0 +1,125 @@
+"""
+Pub/sub backends for running Socket.IO on more than one worker.
+
+Each worker only knows the clients connected to it. With a message queue
+configured, every emit is published on a shared channel and replayed by the
+other workers, so room emits such as ``case_<id>`` and ``user_<id>`` reach
+clients wherever they are connected.
+
+SOCKETIO_MESSAGE_QUEUE selects the backend by URL scheme:
+- redis://, rediss://  Redis pub/sub (recommended for production)
+- kafka://             Kafka
+- zmq+tcp://           ZeroMQ (needs a forwarder process)
+- sqlite:///path       SQLite file polled by every worker; for tests and
+                       single-host setups without Redis
+- sqlite://            in-memory SQLite shared by the managers of one process
+- anything else        Kombu (e.g. amqp:// for RabbitMQ)
+"""
+import sqlite3
+import time
+
+import socketio
+
+
+class SQLiteManager(socketio.PubSubManager):
+    """
+    Stand-in broker that shares messages through a SQLite file.
+
+    Publishers append rows to a queue table and each listener polls for rows
+    newer than the last one it has seen. Old rows are pruned periodically.
+    Every process that opens the same file shares the channel.
+    """
+    name = 'sqlite'
+
+    def __init__(self, url='sqlite:///socketio-queue.db', channel='socketio', write_only=False,
+                 logger=None, json=None, poll_interval=0.05, retention=60):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        path = url[len('sqlite:///'):]
+        self.database = path or f'file:socketio-{channel}?mode=memory&cache=shared'
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._published = 0
+
+        # Held open so a shared in-memory queue lives as long as the manager
+        self._anchor = self._connect()
+        with self._anchor as conn:
+            if path:
+                conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS socketio_queue ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'channel TEXT NOT NULL, '
+                'payload TEXT NOT NULL, '
+                'created_at REAL NOT NULL)'
+            )
+        # Deliver everything published from now on, even before the
+        # listener thread gets scheduled
+        self._last_id = self._anchor.execute('SELECT COALESCE(MAX(id), 0) FROM socketio_queue').fetchone()[0]
+
+    def _connect(self):
+        return sqlite3.connect(
+            self.database,
+            timeout=10,
+            check_same_thread=False,
+            uri=self.database.startswith('file:')
+        )
+
+    def _publish(self, data):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    'INSERT INTO socketio_queue (channel, payload, created_at) VALUES (?, ?, ?)',
+                    (self.channel, self.json.dumps(data), time.time())
+                )
+                self._published += 1
+                if self._published % 100 == 0:
+                    conn.execute(
+                        'DELETE FROM socketio_queue WHERE created_at < ?',
+                        (time.time() - self.retention,)
+                    )
+        finally:
+            conn.close()
+
+    def _sleep(self):
+        if self.server is not None:
+            self.server.sleep(self.poll_interval)
+        else:
+            time.sleep(self.poll_interval)
+
+    def _listen(self):
+        conn = self._connect()
+        while True:
+            rows = conn.execute(
+                'SELECT id, payload FROM socketio_queue WHERE id > ? AND channel = ? ORDER BY id',
+                (self._last_id, self.channel)
+            ).fetchall()
+            for row_id, payload in rows:
+                self._last_id = row_id
+                yield self.json.loads(payload)
+            if not rows:
+                self._sleep()
+
+
+def create_client_manager(url, channel='flask-socketio', write_only=False):
+    """
+    Build the Socket.IO client manager for a message queue URL.
+
+    Returns None without a URL, which keeps the default in-process manager
+    (single worker).
+    """
+    if not url:
+        return None
+
+    if url.startswith('sqlite://'):
+        queue_class = SQLiteManager
+    elif url.startswith(('redis://', 'rediss://')):
+        queue_class = socketio.RedisManager
+    elif url.startswith('kafka://'):
+        queue_class = socketio.KafkaManager
+    elif url.startswith('zmq'):
+        queue_class = socketio.ZmqManager
+    else:
+        queue_class = socketio.KombuManager
+
+    return queue_class(url, channel=channel, write_only=write_only)
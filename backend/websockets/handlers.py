@@ -1,12 +1,19 @@
 """
 WebSocket event handlers for real-time communication.
 """
-from flask_socketio import emit, join_room, leave_room
+from flask_socketio import emit, join_room, leave_room, disconnect
 from flask_jwt_extended import decode_token
 from flask import request
 from extensions import db, socketio
 from models import Message, Case, User, Role
+from services.unread_service import UnreadCounterService
+from services.activity_service import ActivityService
+from services.message_service import MessageService
+from services.revocation_service import token_blocklist
+from services.auth_service import AuthService
 from sqlalchemy import select
+from .sessions import bind_session, get_session, clear_session
+from .aggregator import case_updates
 
 
 def get_user_id_from_token(token):
@@ -18,13 +25,75 @@ def get_user_id_from_token(token):
         return None
 
 
+def authenticate(token, user_id=None):
+    """
+    Verify a JWT and bind its user to the current connection.
+    
+    This is the only place socket events pay for signature verification and
+    the user lookup; returns the new session or None. With ``user_id`` the
+    token must belong to that user: a connection's rooms were joined for
+    it, so it cannot switch to another principal.
+    """
+    try:
+        claims = decode_token(token)
+    except Exception:
+        return None
+
+    if user_id is not None and int(claims['sub']) != user_id:
+        return None
+
+    # decode_token does not consult the blocklist loader
+    if token_blocklist.is_revoked(claims['jti']):
+        return None
+
+    user = db.session.get(User, int(claims['sub']))
+    if not user or claims.get('ver', 0) != user.token_version:
+        return None
+
+    return bind_session(request.sid, user, claims)
+
+
+def token_is_current(session):
+    """
+    Re-check the token a connection was opened with.
+    
+    Fails once the token is revoked or its user's token version moved on
+    (role or password change, deactivation, deletion). On failure the
+    session is dropped and the client disconnected.
+    """
+    claims = session.claims
+    if not token_blocklist.is_revoked(claims.get('jti')) and AuthService.is_token_current(claims):
+        return True
+
+    clear_session(request.sid)
+    emit('error', {'msg': 'Token has been revoked', 'error': 'token_revoked'}, room=request.sid)
+    disconnect()
+    return False
+
+
+def current_session():
+    """
+    Get the identity bound to this connection.
+    
+    Emits an error and disconnects the client when the session is missing
+    or its token has expired, so handlers can simply return on None.
+    """
+    session = get_session(request.sid)
+    if session is None:
+        emit('error', {'msg': 'Session expired, please reconnect', 'error': 'token_expired'}, room=request.sid)
+        disconnect()
+    return session
+
+
 @socketio.on('connect')
 def handle_connect(auth):
     """Handles new WebSocket connections and authenticates the user."""
     if auth and 'token' in auth:
-        user_id = get_user_id_from_token(auth['token'])
-        if user_id:
-            print(f"User {user_id} connected with SID {request.sid}")
+        session = authenticate(auth['token'])
+        if session:
+            print(f"User {session.user_id} connected with SID {request.sid}")
+            # Personal room for notifications and unread counter pushes
+            join_room(f"user_{session.user_id}")
             emit('status', {'msg': 'Connected and authenticated'}, room=request.sid)
             return
     
@@ -32,30 +101,39 @@ def handle_connect(auth):
     return False  # Reject connection
 
 
+@socketio.on('reauthenticate')
+def handle_reauthenticate(data):
+    """Rebinds the connection to a refreshed token before the old one expires."""
+    previous = get_session(request.sid, allow_expired=True)
+    session = previous and authenticate(data.get('token'), user_id=previous.user_id)
+    if session:
+        emit('status', {'msg': 'Session refreshed'}, room=request.sid)
+    else:
+        emit('error', {'msg': 'Invalid token', 'error': 'invalid_token'}, room=request.sid)
+
+
 @socketio.on('join_case')
 def on_join_case(data):
     """Allows a user (client or staff) to join a specific case room."""
-    token = data.get('token')
+    session = current_session()
     case_id = data.get('case_id')
-    user_id = get_user_id_from_token(token)
     
-    if not user_id or not case_id:
+    if not session or not case_id or not token_is_current(session):
         return
 
     # Verify user is part of the case (client or assigned staff)
     case = db.session.execute(select(Case).filter_by(id=case_id)).scalar_one_or_none()
-    user = db.session.execute(select(User).filter_by(id=user_id)).scalar_one_or_none()
 
-    if not case or not user:
+    if not case:
         return
 
-    is_client = case.client_id == user_id
-    is_staff = user.role in [Role.CASE_MANAGER, Role.SUPER_ADMIN]
+    is_client = case.client_id == session.user_id
+    is_staff = session.role in [Role.CASE_MANAGER, Role.SUPER_ADMIN]
 
     if is_client or is_staff:
         room = f"case_{case_id}"
         join_room(room)
-        print(f"User {user_id} joined room {room}")
+        print(f"User {session.user_id} joined room {room}")
         emit('status', {'msg': f'Joined case room {case_id}'}, room=request.sid)
     else:
         emit('error', {'msg': 'Unauthorized to join this case room'}, room=request.sid)
@@ -64,25 +142,28 @@ def on_join_case(data):
 @socketio.on('send_message')
 def handle_send_message(data):
     """Handles a new message sent within a case."""
-    token = data.get('token')
+    session = current_session()
     case_id = data.get('case_id')
     content = data.get('content')
-    user_id = get_user_id_from_token(token)
 
-    if not user_id or not case_id or not content:
+    if not session or not case_id or not content or not token_is_current(session):
         return
 
-    case = db.session.execute(select(Case).filter_by(id=case_id)).scalar_one_or_none()
-    sender = db.session.execute(select(User).filter_by(id=user_id)).scalar_one_or_none()
+    participants = db.session.execute(
+        select(Case.client_id, Case.assigned_to_id).filter_by(id=case_id)
+    ).one_or_none()
 
-    if not case or not sender:
+    if not participants:
         return
 
     # Determine recipient (the other party in the case)
-    if sender.role == Role.CLIENT:
-        recipient_id = case.assigned_to_id
+    if session.role == Role.CLIENT:
+        if participants.client_id != session.user_id:
+            emit('error', {'msg': 'Unauthorized to message this case'}, room=request.sid)
+            return
+        recipient_id = participants.assigned_to_id
     else:
-        recipient_id = case.client_id
+        recipient_id = participants.client_id
 
     if not recipient_id:
         # Case not yet assigned
@@ -93,11 +174,17 @@ def handle_send_message(data):
     new_message = Message(
         content=content,
         case_id=case_id,
-        sender_id=user_id,
+        sender_id=session.user_id,
         recipient_id=recipient_id
     )
     db.session.add(new_message)
+    db.session.flush()
+    UnreadCounterService.message_created(new_message)
     db.session.commit()
+    ActivityService.record(
+        'message.sent', case_id=case_id, subject_type='message', subject_id=new_message.id,
+        actor_id=session.user_id, recipient_id=recipient_id
+    )
 
     # Broadcast message to the case room
     room = f"case_{case_id}"
@@ -105,28 +192,85 @@ def handle_send_message(data):
         'id': new_message.id,
         'case_id': case_id,
         'content': content,
-        'sender_id': user_id,
-        'sender_name': sender.name,
+        'sender_id': session.user_id,
+        'sender_name': session.name,
         'created_at': new_message.created_at.isoformat()
     }
     emit('new_message', message_data, room=room)
+    emit_unread_count(recipient_id)
+
+
+@socketio.on('mark_read')
+def handle_mark_read(data):
+    """Marks the user's messages in a case as read up to a given message."""
+    session = current_session()
+    case_id = data.get('case_id')
+
+    if not session or not case_id or not token_is_current(session):
+        return
+
+    participants = db.session.execute(
+        select(Case.client_id, Case.assigned_to_id).filter_by(id=case_id)
+    ).one_or_none()
+
+    if not participants:
+        return
+
+    is_participant = session.user_id in (participants.client_id, participants.assigned_to_id)
+    if not is_participant and session.role not in [Role.CASE_MANAGER, Role.SUPER_ADMIN]:
+        emit('error', {'msg': 'Unauthorized to read this case'}, room=request.sid)
+        return
+
+    try:
+        marked, error = MessageService.mark_read_up_to(
+            case_id,
+            session.user_id,
+            message_id=data.get('up_to_message_id')
+        )
+    except Exception as e:
+        print(f"Error marking case messages as read: {str(e)}")
+        emit('error', {'msg': 'Failed to mark messages as read'}, room=request.sid)
+        return
+
+    if error:
+        emit('error', {'msg': error}, room=request.sid)
+        return
+
+    if marked:
+        emit_unread_count(session.user_id)
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection."""
+    clear_session(request.sid)
     print(f"Client disconnected: {request.sid}")
 
 
 # Helper functions for emitting events from other parts of the application
 
-def emit_case_status_update(case_id, new_status):
-    """Emit a case status update to all users in the case room."""
+def emit_case_status_update(case_id, new_status, **changes):
+    """
+    Queue a case update for everyone in the case room.
+    
+    Updates are coalesced per room and sent as one batched case_update
+    frame per window (see websockets/aggregator.py).
+    """
     room = f"case_{case_id}"
-    socketio.emit('case_update', {'case_id': case_id, 'status': new_status}, room=room)
+    case_updates.publish(room, case_id, {'status': new_status, **changes})
 
 
 def emit_notification(user_id, notification_data):
     """Emit a notification to a specific user."""
     room = f"user_{user_id}"
     socketio.emit('notification', notification_data, room=room)
+
+
+def emit_unread_count(user_id):
+    """Push a user's current unread message counts to their personal room."""
+    room = f"user_{user_id}"
+    by_case = UnreadCounterService.get_by_case(user_id)
+    socketio.emit('unread_count', {
+        'unread_count': sum(by_case.values()),
+        'by_case': {str(case_id): count for case_id, count in by_case.items()}
+    }, room=room)
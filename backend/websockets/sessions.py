@@ -0,0 +1,59 @@
+"""
+Per-connection session registry for authenticated WebSocket clients.
+
+The JWT is verified once in the connect handler and the identity is bound to
+the connection's SID here. Later events look the identity up instead of
+decoding the token and reloading the user again.
+"""
+import time
+
+
+class SocketSession:
+    """Identity bound to one Socket.IO connection."""
+
+    __slots__ = ('sid', 'user_id', 'role', 'name', 'expires_at', 'claims')
+
+    def __init__(self, sid, user_id, role, name, expires_at, claims=None):
+        self.sid = sid
+        self.user_id = user_id
+        self.role = role
+        self.name = name
+        self.expires_at = expires_at
+        # Decoded token, kept to re-check revocation and token version
+        self.claims = claims or {}
+
+    @property
+    def expired(self):
+        """Whether the token the session was opened with has expired."""
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+    def __repr__(self):
+        return f'<SocketSession {self.sid} user={self.user_id}>'
+
+
+_sessions = {}
+
+
+def bind_session(sid, user, claims):
+    """Bind an authenticated user to a connection, replacing any previous identity."""
+    session = SocketSession(sid, user.id, user.role, user.name, claims.get('exp'), claims)
+    _sessions[sid] = session
+    return session
+
+
+def get_session(sid, allow_expired=False):
+    """Get the live session for a connection, or None if missing or expired."""
+    session = _sessions.get(sid)
+    if session is None or (session.expired and not allow_expired):
+        return None
+    return session
+
+
+def clear_session(sid):
+    """Forget a connection's identity."""
+    return _sessions.pop(sid, None)
+
+
+def session_count():
+    """Number of connections currently bound to a user."""
+    return len(_sessions)
@@ -37,12 +37,15 @@ export function NotificationProvider({ children }: { children: React.ReactNode }
     });
 
     socket.on('case_update', (data) => {
-      toast.success(`Case ${data.case_id} status updated to ${data.status}`, {
-        action: {
-          label: 'View',
-          onClick: () => window.location.href = `/dashboard/cases/${data.case_id}`,
-        },
-      });
+      // One frame carries the latest state of every case changed in the window
+      for (const update of data.updates) {
+        toast.success(`Case ${update.case_id} status updated to ${update.status}`, {
+          action: {
+            label: 'View',
+            onClick: () => window.location.href = `/dashboard/cases/${update.case_id}`,
+          },
+        });
+      }
     });
 
     socket.on('error', (data) => {
@@ -172,6 +172,11 @@ class ApiService {
   }
 
   async logout() {
+    if (this.token) {
+      // Revoke the token server side; errors come back in the response,
+      // so the local logout below happens whatever the outcome
+      await this.post('/auth/logout', {});
+    }
     this.clearToken();
   }
 
@@ -202,15 +207,108 @@ class ApiService {
     return this.put(`/cases/admin/${caseId}`, updates);
   }
 
+  /**
+   * One page of a case's messages, notes, deadlines, appointments and
+   * documents, newest first. Pass the previous page's next_cursor to continue.
+   */
+  async getCaseTimeline(caseId: number, params: { cursor?: string | null; limit?: number; types?: string[] } = {}) {
+    const query = new URLSearchParams();
+    if (params.cursor) query.append('cursor', params.cursor);
+    if (params.limit) query.append('limit', String(params.limit));
+    if (params.types?.length) query.append('types', params.types.join(','));
+    const suffix = query.toString();
+    return this.get(`/cases/${caseId}/timeline${suffix ? `?${suffix}` : ''}`);
+  }
+
   async deleteCase(caseId: number) {
     return this.delete(`/cases/admin/${caseId}`);
   }
 
+  /**
+   * Apply one set of changes to many cases in a single transaction.
+   * Target either explicit case_ids or a filter; results report each id.
+   */
+  async bulkUpdateCases(params: {
+    case_ids?: number[];
+    filter?: { status?: string; category?: string; priority?: string; assigned_to_id?: number; client_id?: number };
+    changes: { status?: string; priority?: string; assigned_to_id?: number | null };
+  }) {
+    return this.post('/cases/admin/bulk', params);
+  }
+
+  /**
+   * Fetch one page of the activity log, newest first.
+   * Pass the previous page's next_cursor to continue.
+   */
+  async getActivityLog(params: {
+    actorId?: number;
+    caseId?: number;
+    action?: string;
+    since?: string;
+    until?: string;
+    limit?: number;
+    cursor?: number | null;
+  } = {}) {
+    const query = new URLSearchParams();
+    if (params.actorId) query.append('actor_id', String(params.actorId));
+    if (params.caseId) query.append('case_id', String(params.caseId));
+    if (params.action) query.append('action', params.action);
+    if (params.since) query.append('since', params.since);
+    if (params.until) query.append('until', params.until);
+    if (params.limit) query.append('limit', String(params.limit));
+    if (params.cursor) query.append('cursor', String(params.cursor));
+    const suffix = query.toString();
+    return this.get(`/admin/activity-log${suffix ? `?${suffix}` : ''}`);
+  }
+
+  /**
+   * Staff case search by partial reference, client name or words in the
+   * title or description (at least 3 characters), best matches first.
+   */
+  async searchCases(q: string, params: { status?: string; limit?: number; offset?: number; fields?: string[] } = {}) {
+    const query = new URLSearchParams({ q });
+    if (params.status) query.append('status', params.status);
+    if (params.limit) query.append('limit', String(params.limit));
+    if (params.offset) query.append('offset', String(params.offset));
+    if (params.fields?.length) query.append('fields', params.fields.join(','));
+    return this.get(`/cases/admin/search?${query.toString()}`);
+  }
+
   async getAdminCases(status?: string) {
     const endpoint = status ? `/cases/admin?status=${status}` : '/cases/admin';
     return this.get(endpoint);
   }
 
+  /**
+   * Fetch one page of the staff case table.
+   * Pass the previous page's next_cursor to continue; fields selects a
+   * sparse fieldset (e.g. ['id', 'case_id', 'title', 'status']).
+   */
+  async getAdminCasePage(params: {
+    status?: string;
+    limit?: number;
+    cursor?: number | null;
+    sort?: 'created_at' | '-created_at' | 'case_id' | '-case_id' | 'id' | '-id';
+    fields?: string[];
+    includeTotal?: boolean;
+  } = {}) {
+    const query = new URLSearchParams();
+    query.append('limit', String(params.limit ?? 50));
+    if (params.status) query.append('status', params.status);
+    if (params.cursor) query.append('cursor', String(params.cursor));
+    if (params.sort) query.append('sort', params.sort);
+    if (params.fields?.length) query.append('fields', params.fields.join(','));
+    if (params.includeTotal) query.append('include_total', 'true');
+
+    return this.get<{
+      cases: any[];
+      has_more: boolean;
+      next_cursor: number | null;
+      limit: number;
+      total?: number;
+    }>(`/cases/admin?${query.toString()}`);
+  }
+
   async getAdminCase(caseId: number) {
     return this.get(`/cases/admin/${caseId}`);
   }
@@ -284,10 +382,76 @@ class ApiService {
     return this.get('/admin/case-managers');
   }
 
+  /**
+   * Fetch one page of the admin user directory.
+   * search matches names and emails; pass the previous page's
+   * next_cursor to continue.
+   */
+  async getAdminUserPage(params: {
+    search?: string;
+    role?: string;
+    status?: 'active' | 'inactive';
+    limit?: number;
+    cursor?: number | null;
+    sort?: 'name' | '-name' | 'email' | '-email' | 'created_at' | '-created_at' | 'id' | '-id';
+    includeTotal?: boolean;
+  } = {}) {
+    const query = new URLSearchParams();
+    query.append('limit', String(params.limit ?? 50));
+    if (params.search) query.append('search', params.search);
+    if (params.role) query.append('role', params.role);
+    if (params.status) query.append('status', params.status);
+    if (params.cursor) query.append('cursor', String(params.cursor));
+    if (params.sort) query.append('sort', params.sort);
+    if (params.includeTotal) query.append('include_total', 'true');
+
+    return this.get<{
+      users: any[];
+      has_more: boolean;
+      next_cursor: number | null;
+      limit: number;
+      total?: number;
+    }>(`/admin/users?${query.toString()}`);
+  }
+
+  /**
+   * Create users in bulk from a CSV or NDJSON file.
+   * The file is sent as the request body; the report lists rejected rows.
+   */
+  async importUsers(file: File) {
+    const ndjson = /\.(ndjson|jsonl)$/i.test(file.name);
+    return this.request<{
+      format: 'csv' | 'ndjson';
+      rows: number;
+      created: number;
+      failed: number;
+      errors: { row: number | null; email: string | null; error: string }[];
+      errors_truncated: boolean;
+      seconds: number;
+      users_per_minute: number;
+    }>('/admin/users/import', {
+      method: 'POST',
+      body: file,
+      headers: { 'Content-Type': ndjson ? 'application/x-ndjson' : 'text/csv' },
+    });
+  }
+
   // --- Message Endpoints ---
 
-  async getCaseMessages(caseId: number) {
-    return this.get(`/cases/${caseId}/messages`);
+  async getCaseMessages(caseId: number, params?: {
+    before?: number;
+    after?: number;
+    limit?: number;
+  }) {
+    const query = new URLSearchParams();
+    if (params?.before) query.append('before', params.before.toString());
+    if (params?.after) query.append('after', params.after.toString());
+    if (params?.limit) query.append('limit', params.limit.toString());
+    
+    const endpoint = query.toString()
+      ? `/cases/${caseId}/messages?${query.toString()}`
+      : `/cases/${caseId}/messages`;
+    return this.get(endpoint);
   }
 
   async sendMessage(caseId: number, messageData: {
@@ -301,6 +465,10 @@ class ApiService {
     return this.put(`/messages/${messageId}/read`, {});
   }
 
+  async markCaseMessagesRead(caseId: number, upToMessageId?: number) {
+    return this.post(`/cases/${caseId}/messages/read`, upToMessageId ? { up_to_message_id: upToMessageId } : {});
+  }
+
   async getMessages() {
     return this.get('/messages/');
   }
@@ -43,6 +43,7 @@ export interface User {
   phone?: string;
   role: Role;
   email_verified: boolean;
+  is_active: boolean;
   created_at: string;
 }
 
@@ -34,12 +34,8 @@ export function useMessageNotifications() {
   }, [user]);
 
   useEffect(() => {
+    // Initial load only; later changes are pushed over the WebSocket
     fetchUnreadCount();
-    
-    // Set up interval to refresh every 30 seconds
-    const interval = setInterval(fetchUnreadCount, 30000);
-    
-    return () => clearInterval(interval);
   }, [fetchUnreadCount]);
 
   // Set up WebSocket listener for new messages
@@ -54,18 +50,13 @@ export function useMessageNotifications() {
       webSocketService.connect(token);
     }
 
-    // Listen for new messages
-    const handleNewMessage = (data: any) => {
-      // Only increment if the current user is the recipient
-      if (data.recipient_id === user.id) {
-        setUnreadCount(prev => prev + 1);
-      }
-    };
-
-    webSocketService.onNewMessage(handleNewMessage);
+    // The server pushes the authoritative count whenever it changes
+    webSocketService.onUnreadCount((data) => {
+      setUnreadCount(data.unread_count || 0);
+    });
 
     return () => {
-      webSocketService.offNewMessage();
+      webSocketService.offUnreadCount();
     };
   }, [user]);
 
@@ -6,6 +6,8 @@
 import { io, Socket } from 'socket.io-client';
 
 const SOCKET_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5001';
+// Set to "websocket" when the API runs several workers without sticky sessions
+const SOCKET_TRANSPORTS = (process.env.NEXT_PUBLIC_WS_TRANSPORTS || 'websocket,polling').split(',');
 
 interface MessageData {
   id: number;
@@ -16,9 +18,16 @@ interface MessageData {
   created_at: string;
 }
 
-interface CaseUpdateData {
+interface CaseUpdate {
   case_id: number;
   status: string;
+  priority?: string;
+  assigned_to_id?: number | null;
+}
+
+// Updates are batched per room; only the latest state of each case is sent
+interface CaseUpdateData {
+  updates: CaseUpdate[];
 }
 
 interface NotificationData {
@@ -27,6 +36,11 @@ interface NotificationData {
   data?: any;
 }
 
+interface UnreadCountData {
+  unread_count: number;
+  by_case: Record<string, number>;
+}
+
 class WebSocketService {
   private socket: Socket | null = null;
   private token: string | null = null;
@@ -49,7 +63,7 @@ class WebSocketService {
       auth: {
         token: token
       },
-      transports: ['websocket', 'polling'],
+      transports: SOCKET_TRANSPORTS,
       reconnection: true,
       reconnectionDelay: 1000,
       reconnectionDelayMax: 5000,
@@ -59,6 +73,21 @@ class WebSocketService {
     this.setupEventListeners();
   }
 
+  /**
+   * Rebind the connection to a refreshed token.
+   * The server checks the token once per connection, so call this after
+   * a token refresh instead of reconnecting.
+   */
+  reauthenticate(token: string) {
+    this.token = token;
+    if (this.socket) {
+      this.socket.auth = { token };
+      if (this.connected) {
+        this.socket.emit('reauthenticate', { token });
+      }
+    }
+  }
+
   /**
    * Setup socket event listeners
    */
@@ -100,7 +129,6 @@ class WebSocketService {
 
     console.log('[WebSocket] Joining case room:', caseId);
     this.socket.emit('join_case', {
-      token: this.token,
       case_id: caseId
     });
   }
@@ -130,7 +158,6 @@ class WebSocketService {
 
     console.log('[WebSocket] Sending message to case:', caseId);
     this.socket.emit('send_message', {
-      token: this.token,
       case_id: caseId,
       content: content
     });
@@ -174,6 +201,25 @@ class WebSocketService {
     });
   }
 
+  /**
+   * Listen for unread message count changes
+   */
+  onUnreadCount(callback: (data: UnreadCountData) => void) {
+    if (!this.socket) return;
+
+    this.socket.on('unread_count', (data: UnreadCountData) => {
+      callback(data);
+    });
+  }
+
+  /**
+   * Remove unread count listener
+   */
+  offUnreadCount() {
+    if (!this.socket) return;
+    this.socket.off('unread_count');
+  }
+
   /**
    * Remove message listener
    */